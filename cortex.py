@@ -1,70 +1,1977 @@
 # cortex.py (v1.0 - A Edição Definitiva)
 # Criador, Arquiteto e Mente Mestra: Carlos Henrique Tourinho Santana
-# ATENÇÃO: Requer 'sudo apt install lm-sensors strace' e 'sudo sensors-detect'
+# ATENÇÃO: Requer 'sudo apt install lm-sensors strace' e 'sudo sensors-detect' (para carregar os módulos hwmon)
 
 import tkinter as tk
-from tkinter import ttk, messagebox, Toplevel, scrolledtext
+from tkinter import ttk, messagebox, simpledialog, Toplevel, scrolledtext
 import psutil
 import os
 import subprocess
-from collections import deque
+from collections import deque, namedtuple, Counter
 import time
 import json
 import threading
+import bisect
+import re
+import signal
+import codecs
+import cProfile
+import pstats
+import io
+import functools
+import itertools
+import contextlib
+import traceback
+import socket
+import asyncio
+import heapq
+import hmac
+import ipaddress
 from queue import Queue
 import webbrowser
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import argparse
+import sys
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+# matplotlib só é importado quando a aba Desempenho é aberta pela primeira vez (ver import_matplotlib).
+Figure = Polygon = FigureCanvasTkAgg = mpl_style = None
+
+def import_matplotlib():
+    global Figure, Polygon, FigureCanvasTkAgg, mpl_style
+    if Figure is None:
+        from matplotlib import style as mpl_style
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Polygon
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+# Marcas de tempo da inicialização para --profile-startup; a primeira fase vai da criação do processo ao fim dos imports.
+class StartupProfile:
+    def __init__(self):
+        try: self.start = psutil.Process().create_time()
+        except psutil.Error: self.start = time.time()
+        self.enabled, self.reported, self.marks = False, False, []
+        self.mark("interpretador e imports")
+
+    def mark(self, phase): self.marks.append((phase, time.time()))
+
+    def report(self, out=None):
+        if not self.enabled or self.reported: return
+        self.reported, out, previous = True, out or sys.stderr, self.start
+        out.write(f"Cortex — perfil de inicialização\n  {'fase':<36}{'duração (ms)':>14}{'acumulado (ms)':>16}\n")
+        for phase, t in self.marks: out.write(f"  {phase:<36}{(t - previous) * 1000:>14.1f}{(t - self.start) * 1000:>16.1f}\n"); previous = t
+        out.flush()
+
+STARTUP = StartupProfile()
 
 # ===================================================================
 # GERENCIADOR DE CONFIGURAÇÕES
 # ===================================================================
 CONFIG_FILE = "cortex_config.json"
-DEFAULT_SETTINGS = {"theme": "light"}
+DEFAULT_SETTINGS = {
+    "theme": "light", "process_interval": 3.0, "perf_interval": 1.0, "perf_history": 3600, "perf_points": 600, "perf_per_core": True,
+    # Amostras guardadas por processo para os sparklines do painel de detalhes.
+    "process_history": 120,
+    # Intervalos (s) de atualização de cada aba quando visível e, quando oculta; fontes ausentes em "hidden_refresh_intervals" só atualizam ao serem exibidas.
+    "refresh_intervals": {"proc": 0.5, "perf": 1.0, "net": 5.0, "svc": None, "hw": 5.0, "pkg": None, "disk": 5.0},
+    "hidden_refresh_intervals": {"hw": 30.0},
+    "net_max_rows": 5000,
+    # Prazo (s) do statvfs de cada ponto de montagem; montagens que não respondem (NFS/CIFS travados) aparecem como "sem resposta".
+    "disk_timeout": 2.0,
+    # Limites de alerta dos sensores: temp/in_max disparam acima do valor, fan_min abaixo; "sensors" ajusta por chave de sensor.
+    "sensor_alerts": {"temp": 85.0, "fan_min": None, "in_max": None, "sensors": {}},
+    "recorder": {"enabled": False, "dir": "~/.local/share/cortex/timeseries", "top_n": 5, "fsync_interval": 10.0, "segment_mb": 64,
+                 # Segmentos de cada resolução são apagados quando a última gravação neles fica mais velha que esses dias.
+                 "retention_days": {"1s": 2, "1m": 30, "1h": 730}},
+    # Painel de tarefas: linhas mantidas na tela por tarefa e quantos logs completos (em ~/.cache/cortex/jobs) guardar.
+    "jobs": {"scrollback_lines": 5000, "keep_logs": 50},
+    # Serviços acompanham os sinais do systemd pelo D-Bus (requer o pacote python3-jeepney); sem ele, consulta o systemctl a cada poll_interval s.
+    "services": {"dbus": True, "poll_interval": 30.0},
+    # Spans de latência por etapa, contagem de leituras de /proc, subprocessos e chamadas Tk; "profile_ticks" é o padrão da captura cProfile.
+    "instrumentation": {"enabled": True, "profile_ticks": 50},
+    # --agent: segredo exigido no hello (vazio = sem token; o agente escuta em 127.0.0.1 salvo se outro endereço for dado) e amostras de CPU/memória/swap guardadas.
+    "agent": {"token": "", "series_points": 300},
+    # Aba Frota: agentes "host:porta", intervalo entre polls, prazo (s) para marcar um host como lento, tamanho do top-N e token enviado aos agentes.
+    "fleet": {"hosts": [], "interval": 2.0, "timeout": 3.0, "top_n": 50, "token": ""},
+}
 
 def load_settings():
     try:
         with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return DEFAULT_SETTINGS
+            user = json.load(f)
+        if not isinstance(user, dict): raise ValueError("configuração não é um objeto JSON")
+        # Seções com null ou outro tipo no arquivo ficam com os valores padrão.
+        return {**DEFAULT_SETTINGS, **user, **{k: {**v, **(user.get(k) if isinstance(user.get(k), dict) else {})} for k, v in DEFAULT_SETTINGS.items() if isinstance(v, dict)}}
+    except (FileNotFoundError, ValueError):
+        return json.loads(json.dumps(DEFAULT_SETTINGS))
 
 def save_settings(settings):
     with open(CONFIG_FILE, 'w') as f:
         json.dump(settings, f, indent=4)
 
 # ===================================================================
-# CLASSES DAS JANELAS AUXILIARES
+# INSTRUMENTAÇÃO (custo do próprio Cortex)
 # ===================================================================
-class CommandRunnerWindow(Toplevel):
-    def __init__(self, parent, command):
-        super().__init__(parent)
-        self.title("Executando Comando..."); self.geometry("750x450"); self.command = command
-        self.text_area = scrolledtext.ScrolledText(self, wrap=tk.WORD, font=("Courier", 9), background="#1C1C1C", foreground="#FFFFFF")
-        self.text_area.pack(expand=True, fill='both'); self.text_area.insert(tk.END, f"Executando: {' '.join(command)}\n\n"); self.text_area.config(state='disabled')
-        self.queue = Queue(); self.thread = threading.Thread(target=self.run_command_thread, daemon=True); self.thread.start()
-        self.after(100, self.process_queue); self.protocol("WM_DELETE_WINDOW", self.on_closing); self.grab_set()
+# Cada etapa de coleta e de renderização roda num span que acumula a latência num histograma log2 de µs (o mesmo do
+# strace) e quantas leituras de /proc e /sys, subprocessos e comandos Tcl/Tk ela fez. Os dois primeiros vêm de um audit
+# hook (PEP 578) com contadores por thread; os comandos Tk, de um proxy em volta do interpretador Tcl da janela principal.
+class Instrumentation:
+    BUCKETS, COUNTERS = 24, ("proc", "subprocess", "tk")
+    PROC_EVENTS = frozenset(("open", "os.listdir", "os.scandir"))
+
+    def __init__(self):
+        self.enabled, self.hooked, self.started, self.ticks = False, False, time.time(), 0
+        self.lock, self.local, self.threads, self.retired = threading.Lock(), threading.local(), [], [0, 0, 0]
+        self.spans = {}  # etapa -> [chamadas, tempo total, maior, última, histograma, contadores somados]
+        self.profiler, self.profile_left, self.on_profile = None, 0, None
+
+    def enable(self):
+        self.enabled = True
+        if not self.hooked: self.hooked = True; sys.addaudithook(self._audit)  # audit hooks não podem ser removidos
+
+    def _audit(self, event, args):
+        if event in self.PROC_EVENTS:
+            path = args[0]
+            if isinstance(path, bytes): path = os.fsdecode(path)
+            if isinstance(path, str) and path.startswith((psutil.PROCFS_PATH, "/sys")): self.counters()[0] += 1
+        elif event == "subprocess.Popen": self.counters()[1] += 1
+
+    def counters(self):
+        try: return self.local.counts
+        except AttributeError:
+            counts = self.local.counts = [0, 0, 0]
+            with self.lock:
+                if len(self.threads) > 64: self._prune()
+                self.threads.append((threading.current_thread(), counts))
+            return counts
+
+    def _prune(self):
+        # Threads encerradas (leitores de descritores, tarefas, requisições HTTP) somam seus contadores em "retired".
+        alive = []
+        for thread, counts in self.threads:
+            if thread.is_alive(): alive.append((thread, counts))
+            else: self.retired = [a + b for a, b in zip(self.retired, counts)]
+        self.threads = alive
+
+    @contextlib.contextmanager
+    def span(self, name):
+        if not self.enabled: yield; return
+        counts = self.counters(); before = counts[:]; started = time.perf_counter()
+        try: yield
+        finally: self.record(name, time.perf_counter() - started, [a - b for a, b in zip(counts, before)])
+
+    def timed(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(func.__qualname__): return func(*args, **kwargs)
+        return wrapper
+
+    def record(self, name, elapsed, deltas):
+        bucket = min(self.BUCKETS - 1, int(elapsed * 1e6).bit_length())
+        with self.lock:
+            entry = self.spans.get(name)
+            if entry is None: entry = self.spans[name] = [0, 0.0, 0.0, 0.0, np.zeros(self.BUCKETS, dtype=np.int64), [0, 0, 0]]
+            entry[0] += 1; entry[1] += elapsed; entry[2] = max(entry[2], elapsed); entry[3] = elapsed; entry[4][bucket] += 1
+            entry[5] = [a + b for a, b in zip(entry[5], deltas)]
+
+    def reset(self):
+        with self.lock: self.spans = {}
+
+    def tick(self):
+        # Chamado a cada tick do agendador da GUI: conta os ticks e encerra a captura do cProfile depois de N deles.
+        self.ticks += 1
+        if self.profiler is None: return
+        self.profile_left -= 1
+        if self.profile_left > 0: return
+        profiler, callback, self.profiler = self.profiler, self.on_profile, None; profiler.disable()
+        path = os.path.join(CACHE_DIR, "profiles", time.strftime("cortex-%Y%m%d-%H%M%S.pstats"))
+        try: os.makedirs(os.path.dirname(path), exist_ok=True); profiler.dump_stats(path)
+        except OSError: path = None
+        out = io.StringIO(); pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        if callback: callback(path, out.getvalue())
+
+    def profile(self, ticks, on_done=None):
+        # cProfile só vê a thread que o ativou: aqui, a da interface (agendador, renderizações e eventos do Tk).
+        if self.profiler is not None: return False
+        profiler = cProfile.Profile(); profiler.enable()  # ValueError se outro profiler já estiver ativo
+        self.profiler, self.profile_left, self.on_profile = profiler, max(1, int(ticks)), on_done; return True
+
+    def totals(self):
+        with self.lock:
+            self._prune(); return [sum(values) for values in zip(self.retired, *(counts for _, counts in self.threads))]
+
+    @staticmethod
+    def quantile(hist, q):
+        # Limite superior do bucket que contém o quantil q; [0] < 1 µs, [b] em [2^(b-1), 2^b) µs.
+        total = hist.sum()
+        return 0.0 if not total else float(2 ** int(np.searchsorted(np.cumsum(hist), q * total))) / 1e6
+
+    def process_usage(self):
+        proc, names = psutil.Process(), {t.native_id: t.name for t in threading.enumerate()}
+        with proc.oneshot():
+            cpu, mem = proc.cpu_times(), proc.memory_info()
+            threads = [{"tid": t.id, "name": names.get(t.id, f"tid {t.id}"), "user_s": t.user_time, "system_s": t.system_time} for t in proc.threads()]
+        return {"cpu_user_s": cpu.user, "cpu_system_s": cpu.system, "rss_bytes": mem.rss, "threads": threads}
+
+    def snapshot(self):
+        with self.lock: spans = {name: (e[0], e[1], e[2], e[3], e[4].copy(), list(e[5])) for name, e in self.spans.items()}
+        totals, usage, uptime = self.totals(), self.process_usage(), max(1e-9, time.time() - self.started)
+        return {"timestamp": time.time(), "uptime_s": uptime, "ticks": self.ticks, "totals": dict(zip(self.COUNTERS, totals)),
+                "process": {**usage, "cpu_percent_avg": (usage["cpu_user_s"] + usage["cpu_system_s"]) / uptime * 100},
+                "spans": {name: {"calls": calls, "total_s": total, "mean_s": total / calls, "max_s": peak, "last_s": last,
+                                 "p50_s": self.quantile(hist, 0.5), "p99_s": self.quantile(hist, 0.99), "histogram_log2_us": hist.tolist(),
+                                 **{f"{c}_per_call": n / calls for c, n in zip(self.COUNTERS, counts)}}
+                          for name, (calls, total, peak, last, hist, counts) in spans.items()}}
+
+    def dump(self, path=None):
+        path = path or os.path.join(CACHE_DIR, "selfmon", time.strftime("cortex-%Y%m%d-%H%M%S.json"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f: json.dump(self.snapshot(), f, indent=2)
+        return path
+
+class TkCallCounter:
+    # Envolve o tkapp do Tk principal: widgets criados depois herdam o proxy (widget.tk = master.tk) e cada comando Tcl conta.
+    def __init__(self, tkapp, counts): self._tkapp, self._call, self._counts = tkapp, tkapp.call, counts
+    def call(self, *args): self._counts[2] += 1; return self._call(*args)
+    def __getattr__(self, name): return getattr(self._tkapp, name)
+
+INSTRUMENTS = Instrumentation()
+
+# ===================================================================
+# MOTOR DE COLETA (threads em segundo plano)
+# ===================================================================
+# Cada coletor roda em sua própria thread e publica snapshots imutáveis; a GUI apenas lê o último snapshot pronto.
+Snapshot = namedtuple('Snapshot', 'seq timestamp data')
+ProcessInfo = namedtuple('ProcessInfo', 'pid name user cpu memory disk_read disk_write status threads cmdline parent exe ppid', defaults=(None,))
+
+class Collector(threading.Thread):
+    UNCHANGED = object()  # collect() pode devolvê-lo para não publicar um snapshot novo
+
+    def __init__(self, name, interval):
+        super().__init__(name=f"cortex-{name}", daemon=True)
+        self.interval, self.error = interval, None; self._latest = Snapshot(0, 0.0, None)
+        self._wake, self._stopped = threading.Event(), threading.Event()
+
+    def collect(self): raise NotImplementedError
+
+    def run(self):
+        # interval=None: coletor sob demanda; nem a primeira coleta acontece antes do primeiro wake() (aba aberta).
+        if self.interval is None: self._wake.wait(); self._wake.clear()
+        while not self._stopped.is_set():
+            try:
+                with INSTRUMENTS.span(f"{type(self).__name__}.collect"): data = self.collect()
+                if data is not self.UNCHANGED: self._latest = Snapshot(self._latest.seq + 1, time.time(), data)
+                self.error = None
+            except Exception as e:
+                # Falha de uma coleta não encerra a thread: fica em `error` (a interface mostra) e a próxima tentativa segue.
+                error = f"{type(e).__name__}: {e}"
+                if not isinstance(e, (psutil.Error, OSError, ValueError)) and error != self.error: traceback.print_exc()  # erro de programação
+                self.error = error
+            self._wake.wait(self.interval); self._wake.clear()
+
+    def latest(self): return self._latest
+    def wake(self): self._wake.set()
+    def stop(self): self._stopped.set(); self._wake.set()
+
+# Histórico por processo em colunas NumPy [slot, amostra] de tamanho fixo. Cada (pid, create_time) ocupa um slot,
+# devolvido ao pool assim que o processo some do snapshot; os contadores de I/O anteriores também vivem no slot.
+class ProcessHistory:
+    FIELDS = ("cpu", "rss", "read", "write")
+
+    def __init__(self, length=120, slots=256):
+        self.length, self.tick, self.lock = length, 0, threading.Lock()
+        self.keys, self.pids, self.free = {}, {}, []
+        self.columns = {f: np.zeros((0, length), dtype=np.float32) for f in self.FIELDS}
+        self.prev_io, self.prev_time, self.first_tick = np.zeros((0, 2)), np.zeros(0), np.zeros(0, dtype=np.int64)
+        self._grow(slots)
+
+    def _grow(self, extra):
+        old = len(self.prev_time)
+        for f in self.FIELDS: self.columns[f] = np.concatenate([self.columns[f], np.full((extra, self.length), np.nan, dtype=np.float32)])
+        self.prev_io = np.concatenate([self.prev_io, np.full((extra, 2), np.nan)]); self.prev_time = np.concatenate([self.prev_time, np.zeros(extra)])
+        self.first_tick = np.concatenate([self.first_tick, np.zeros(extra, dtype=np.int64)]); self.free.extend(range(old + extra - 1, old - 1, -1))
+
+    def update(self, samples, now):
+        # samples: [(pid, create_time, cpu, rss, io_counters)]. Grava uma coluna nova, recicla os slots de processos que
+        # sumiram e devolve as taxas de leitura/escrita (B/s) de cada amostra, calculadas em bloco.
+        with self.lock:
+            self.tick += 1; col = self.tick % self.length; seen = set(); slots = []
+            for pid, create_time, _, _, _ in samples:
+                key = (pid, create_time); slot = self.keys.get(key)
+                if slot is None:
+                    if not self.free: self._grow(len(self.prev_time))
+                    slot = self.keys[key] = self.free.pop(); self.first_tick[slot] = self.tick; self.prev_io[slot] = np.nan
+                    for f in self.FIELDS: self.columns[f][slot] = np.nan
+                self.pids[pid] = key; seen.add(key); slots.append(slot)
+            for key in [k for k in self.keys if k not in seen]:
+                self.free.append(self.keys.pop(key))
+                if self.pids.get(key[0]) == key: del self.pids[key[0]]
+            slots = np.array(slots, dtype=np.int64)
+            io = np.array([(s[4].read_bytes, s[4].write_bytes) if s[4] else (np.nan, np.nan) for s in samples], dtype=np.float64).reshape(-1, 2)
+            elapsed = now - self.prev_time[slots]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rates = np.nan_to_num(np.maximum((io - self.prev_io[slots]) / elapsed[:, None], 0.0))
+            has_io = ~np.isnan(io[:, 0]); self.prev_io[slots[has_io]] = io[has_io]; self.prev_time[slots] = now
+            self.columns["cpu"][slots, col] = [s[2] for s in samples]; self.columns["rss"][slots, col] = [s[3] for s in samples]
+            self.columns["read"][slots, col], self.columns["write"][slots, col] = rates[:, 0], rates[:, 1]
+            return rates
+
+    def series(self, pid):
+        # Cópia ordenada (mais antiga -> mais recente) do histórico do processo, ou None se ele não está no histórico.
+        with self.lock:
+            key = self.pids.get(pid); slot = self.keys.get(key)
+            if slot is None: return None
+            count = min(self.tick - int(self.first_tick[slot]) + 1, self.length)
+            order = np.arange(self.tick - count + 1, self.tick + 1) % self.length
+            return {f: self.columns[f][slot, order] for f in self.FIELDS}
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def sparkline(values, width=40):
+    values = values[-width:]; finite = values[np.isfinite(values)]
+    if not len(finite): return ""
+    top = finite.max() or 1.0
+    return "".join(" " if not np.isfinite(v) else SPARK_CHARS[min(len(SPARK_CHARS) - 1, int(v / top * (len(SPARK_CHARS) - 1) + 0.5))] for v in values)
+
+# Índice PID -> PPID mantido entre snapshots: cada coleta só aplica as diferenças (processos novos, encerrados ou
+# reparentados), e o percurso em profundidade dá a ordem e o nível de cada linha do modo árvore.
+class ProcessIndex:
+    def __init__(self): self.parent, self.start, self.children = {}, {}, {}
+
+    def update(self, entries):
+        # entries: [(pid, ppid, create_time)] do snapshot atual.
+        seen = set()
+        for pid, ppid, start in entries:
+            seen.add(pid)
+            if self.parent.get(pid, -1) == ppid and self.start.get(pid) == start: continue
+            if pid in self.parent: self._unlink(pid)
+            self.parent[pid], self.start[pid] = ppid, start; self.children.setdefault(ppid, set()).add(pid)
+        for pid in [p for p in self.parent if p not in seen]: self._unlink(pid); del self.parent[pid], self.start[pid]
+
+    def _unlink(self, pid):
+        siblings = self.children.get(self.parent[pid])
+        if siblings is not None:
+            siblings.discard(pid)
+            if not siblings: del self.children[self.parent[pid]]
+
+    def walk(self):
+        # [(pid, profundidade)] em pré-ordem; raízes são os PIDs cujo pai não está no índice (PID 0, namespaces etc.).
+        out, visited = [], set(); stack = [(pid, 0) for pid in sorted((p for p, pp in self.parent.items() if pp not in self.parent), reverse=True)]
+        while stack:
+            pid, depth = stack.pop()
+            if pid in visited: continue
+            visited.add(pid); out.append((pid, depth))
+            stack.extend((child, depth + 1) for child in sorted(self.children.get(pid, ()), reverse=True))
+        return out
+
+# Ordem em pré-ordem (índices de linha), posição de cada linha nessa ordem, profundidade e tamanho da subárvore por
+# posição, e os totais de CPU/RSS/I-O de cada subárvore (soma por prefixo: subárvore em [pos, pos + tamanho)).
+ProcessTree = namedtuple('ProcessTree', 'order position depth size cpu memory disk_read disk_write')
+
+PROC_FILTER_FIELDS = {"Nome": ("name",), "Usuário": ("user",), "Comando": ("cmdline",), "Todos": ("name", "user", "cmdline", "exe")}
 
-    def run_command_thread(self):
+def format_rate(b): return f"{b/1024**2:.2f} MB/s" if b > 1024**2 else f"{b/1024:.1f} KB/s" if b > 0 else "0 B/s"
+
+class ProcessTable(tuple):
+    # Tupla de ProcessInfo (serializa e itera como antes) com uma cópia colunar: colunas numéricas em arrays NumPy e
+    # colunas de texto como códigos int32 numa tabela de strings internadas, montada uma vez por snapshot na thread de coleta.
+    NUMERIC = {"pid": np.int64, "cpu": np.float64, "memory": np.float64, "disk_read": np.float64, "disk_write": np.float64, "threads": np.float64, "ppid": np.float64}
+
+    def __new__(cls, rows=(), walk=None):
+        self = super().__new__(cls, rows); strings, codes = [], {}
+        def intern(value):
+            code = codes.get(value)
+            if code is None: code = codes[value] = len(strings); strings.append(value)
+            return code
+        self.columns = {}
+        for field, values in zip(ProcessInfo._fields, zip(*self) if self else [()] * len(ProcessInfo._fields)):
+            if field in cls.NUMERIC: self.columns[field] = np.array(values, dtype=cls.NUMERIC[field]).reshape(-1)  # None vira NaN
+            else: self.columns[field] = np.fromiter((intern(v or '') for v in values), dtype=np.int32, count=len(values))
+        self.strings, self._lower, self._rank, self._walk, self._tree = strings, None, None, walk, None
+        return self
+
+    def tree(self):
+        if self._tree is None:
+            walk, pids = self._walk, self.columns["pid"]
+            if walk is None: index = ProcessIndex(); index.update((p.pid, p.ppid, None) for p in self); walk = index.walk()
+            row = {int(pid): i for i, pid in enumerate(pids)}; walk = [(pid, d) for pid, d in walk if pid in row]
+            order = np.fromiter((row[pid] for pid, _ in walk), dtype=np.int64, count=len(walk)); depth = np.fromiter((d for _, d in walk), dtype=np.int64, count=len(walk))
+            size, stack = np.ones(len(walk), dtype=np.int64), []
+            for pos, d in enumerate(depth.tolist()):
+                while stack and depth[stack[-1]] >= d: top = stack.pop(); size[top] = pos - top
+                stack.append(pos)
+            for top in stack: size[top] = len(walk) - top
+            position = np.full(len(self), -1, dtype=np.int64); position[order] = np.arange(len(order)); ends = np.arange(len(order)) + size
+            totals = []
+            for field in ("cpu", "memory", "disk_read", "disk_write"):
+                prefix = np.concatenate([[0.0], np.cumsum(np.nan_to_num(self.columns[field][order]))]); totals.append(prefix[ends] - prefix[:-1])
+            self._tree = ProcessTree(order, position, depth, size, *totals)
+        return self._tree
+
+    def lower(self):
+        if self._lower is None: self._lower = [s.lower() for s in self.strings]
+        return self._lower
+
+    def row(self, pid):
+        hit = np.flatnonzero(self.columns["pid"] == pid)
+        return int(hit[0]) if len(hit) else None
+
+    def find(self, pid):
+        i = self.row(pid)
+        return None if i is None else self[i]
+
+    def order(self, field, reverse=False):
+        # Índices das linhas ordenadas; texto ordena pelo posto da string (sem diferenciar maiúsculas), NaN fica no fim.
+        if field in self.NUMERIC: key = self.columns[field].astype(np.float64)
+        else:
+            if self._rank is None:
+                lower = self.lower(); self._rank = np.empty(len(lower), dtype=np.int64); self._rank[sorted(range(len(lower)), key=lower.__getitem__)] = np.arange(len(lower))
+            key = self._rank[self.columns[field]]
+        return np.argsort(-key if reverse else key, kind="stable")
+
+    def match(self, text, fields=("name",), regex=False):
+        # Máscara das linhas cujo texto em algum dos campos contém o termo (ou casa a regex). O teste roda uma vez por string
+        # distinta e é espalhado para as linhas pelos códigos; re.error sobe para quem chamou.
+        if regex: test = re.compile(text, re.IGNORECASE).search; hits = np.fromiter((test(s) is not None for s in self.strings), dtype=bool, count=len(self.strings))
+        else: text = text.lower(); hits = np.fromiter((text in s for s in self.lower()), dtype=bool, count=len(self.strings))
+        mask = np.zeros(len(self), dtype=bool)
+        for field in fields: mask |= hits[self.columns[field]]
+        return mask
+
+class ProcessCollector(Collector):
+    ATTRS = ['pid', 'name', 'username', 'cpu_percent', 'memory_info', 'status', 'num_threads', 'cmdline', 'exe', 'io_counters', 'create_time', 'ppid']
+
+    def __init__(self, interval, history=120):
+        super().__init__("processos", interval)
+        self.history, self.index = ProcessHistory(history), ProcessIndex()
+
+    def collect(self): return self.get_process_data()
+
+    def get_process_data(self):
+        # O nome do pai sai do próprio snapshot (ppid já vem do /proc/<pid>/stat lido pelo process_iter), sem p.parent().
+        rows, samples, names = [], [], {}
+        for p in psutil.process_iter(self.ATTRS):
+            info = p.info; rss = info['memory_info'].rss / 1024**2 if info.get('memory_info') else 0; cpu = info.get('cpu_percent') or 0.0
+            names[p.pid] = info.get('name') or ''
+            rows.append((p.pid, names[p.pid], info.get('username'), cpu, rss, info.get('status'), info.get('num_threads'), ' '.join(info.get('cmdline') or []), info.get('ppid'), info.get('exe')))
+            samples.append((p.pid, info.get('create_time'), cpu, rss, info.get('io_counters')))
+        rates = self.history.update(samples, time.time()); self.index.update((s[0], r[8], s[1]) for r, s in zip(rows, samples))
+        return ProcessTable((ProcessInfo(*r[:5], float(rate[0]), float(rate[1]), *r[5:8], names.get(r[8], 'N/A'), r[9], r[8]) for r, rate in zip(rows, rates)), self.index.walk())
+
+class PerformanceCollector(Collector):
+    def __init__(self, interval):
+        super().__init__("desempenho", interval)
+
+    def collect(self):
+        return {"cpu": psutil.cpu_percent(interval=None), "percpu": psutil.cpu_percent(interval=None, percpu=True),
+                "mem": psutil.virtual_memory().percent, "swap": psutil.swap_memory().percent}
+
+# Uso das montagens via statvfs num pool de threads daemon com prazo por montagem (um NFS/CIFS travado prende só um
+# worker, nunca o coletor), e vazão/IOPS/utilização por dispositivo a partir de deltas de /proc/diskstats lido de uma vez.
+DiskInfo = namedtuple('DiskInfo', 'device mountpoint fstype total used free percent state', defaults=("ok",))
+DiskIO = namedtuple('DiskIO', 'device read_bps write_bps read_iops write_iops util')
+
+class MountProber:
+    def __init__(self, timeout=2.0, workers=4, max_workers=16):
+        self.timeout, self.base_workers, self.max_workers, self.workers, self.active = timeout, workers, max_workers, 0, 0
+        self.queue, self.lock = Queue(), threading.Lock()
+        self.pending = {}  # ponto de montagem -> [Event, resultado] ainda sem resposta
+        for _ in range(workers): self._spawn()
+
+    def _spawn(self): self.workers += 1; threading.Thread(target=self._work, name="cortex-statvfs", daemon=True).start()
+
+    def _work(self):
+        while True:
+            mountpoint, slot = self.queue.get()
+            with self.lock: self.active += 1
+            try: slot[1] = os.statvfs(mountpoint)
+            except OSError as e: slot[1] = e
+            with self.lock: self.pending.pop(mountpoint, None); self.active -= 1
+            slot[0].set()
+
+    def probe(self, mountpoints):
+        # {ponto: statvfs | OSError | None}; None = sem resposta no prazo. Uma montagem ainda presa desde a rodada anterior
+        # não é enviada de novo, e se todos os workers estão presos com trabalho na fila, outro é criado (até max_workers).
+        slots = {}
+        with self.lock:
+            for mountpoint in mountpoints:
+                if mountpoint in self.pending: slots[mountpoint] = None; continue
+                slot = self.pending[mountpoint] = slots[mountpoint] = [threading.Event(), None]; self.queue.put((mountpoint, slot))
+        deadline = time.monotonic() + self.timeout
+        while True:
+            waiting, remaining = [s for s in slots.values() if s is not None and not s[0].is_set()], deadline - time.monotonic()
+            if not waiting or remaining <= 0: break
+            with self.lock:
+                if self.queue.qsize() and self.active >= self.workers and self.workers < self.max_workers: self._spawn()
+            waiting[0][0].wait(min(remaining, self.timeout / 10))
+        return {mountpoint: slot[1] if slot is not None and slot[0].is_set() else None for mountpoint, slot in slots.items()}
+
+class DiskStatsReader:
+    COLUMNS = slice(3, 14)  # campos 4..14 de /proc/diskstats (kernels novos acrescentam discard/flush depois)
+    READS, SECTORS_READ, WRITES, SECTORS_WRITTEN, IO_MS = 0, 2, 4, 6, 9
+
+    def __init__(self, proc="/proc"): self.path = os.path.join(proc, "diskstats"); self.prev = None
+
+    def read(self):
+        with open(self.path) as f: rows = [line.split() for line in f]
+        rows = [r for r in rows if len(r) >= 14 and not r[2].startswith(("loop", "ram"))]
+        return [r[2] for r in rows], np.array([r[self.COLUMNS] for r in rows], dtype=np.int64).reshape(-1, 11).astype(np.float64)
+
+    def sample(self, now=None):
+        # Taxas desde a leitura anterior para todos os dispositivos de uma vez; a primeira chamada só guarda a base.
+        now = time.monotonic() if now is None else now; names, values = self.read(); prev, self.prev = self.prev, (names, values, now)
+        if prev is None or now <= prev[2]: return ()
+        prev_names, prev_values, prev_time = prev
+        if prev_names != names:
+            index = {name: i for i, name in enumerate(prev_names)}; aligned = np.full_like(values, np.nan)
+            for i, name in enumerate(names):
+                if name in index: aligned[i] = prev_values[index[name]]
+            prev_values = aligned
+        rates = np.nan_to_num(np.maximum(values - prev_values, 0.0)) / (now - prev_time)  # contador zerado/estourado vira 0
+        active = (values[:, self.READS] + values[:, self.WRITES]) > 0
+        util = np.minimum(rates[:, self.IO_MS] / 10.0, 100.0).tolist(); rates = rates.tolist()  # util: ms ocupados por segundo -> %
+        return tuple(DiskIO(names[i], rates[i][self.SECTORS_READ] * 512, rates[i][self.SECTORS_WRITTEN] * 512, rates[i][self.READS], rates[i][self.WRITES], util[i])
+                     for i in np.flatnonzero(active))
+
+class DiskCollector(Collector):
+    PSEUDO_FS = frozenset({"proc", "sysfs", "devtmpfs", "devpts", "cgroup", "cgroup2", "securityfs", "debugfs", "tracefs", "pstore", "bpf", "configfs",
+                           "fusectl", "mqueue", "hugetlbfs", "autofs", "binfmt_misc", "rpc_pipefs", "nsfs", "efivarfs", "selinuxfs", "squashfs", "ramfs"})
+    NETWORK_FS = frozenset({"nfs", "nfs4", "cifs", "smb3", "smbfs", "ceph", "glusterfs", "9p", "afs", "lustre", "fuse.sshfs", "fuse.glusterfs", "fuse.s3fs", "fuse.rclone"})
+
+    def __init__(self, interval=None, timeout=2.0, proc="/proc"):
+        super().__init__("discos", interval)
+        self.proc, self.prober, self.stats = proc, MountProber(timeout), DiskStatsReader(proc)
+
+    def block_filesystems(self):
+        # Tipos sem "nodev" em /proc/filesystems (o critério do disk_partitions() sem all=True); relido a cada coleta
+        # porque um módulo de sistema de arquivos pode ser carregado depois.
         try:
-            process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, errors='replace')
-            for line in iter(process.stdout.readline, ''): self.queue.put(line)
-            process.stdout.close(); return_code = process.wait()
-            self.queue.put(f"\n--- COMANDO CONCLUÍDO (Código de Saída: {return_code}) ---")
-        except Exception as e: self.queue.put(f"\n--- ERRO AO EXECUTAR COMANDO ---\n{e}")
+            with open(os.path.join(self.proc, "filesystems")) as f: return frozenset(line.split()[-1] for line in f if line.strip() and not line.startswith("nodev"))
+        except OSError: return None
 
-    def process_queue(self):
+    def wanted(self, fstype, block):
+        # Discos de verdade mais sistemas de arquivos de rede; tmpfs, overlay de contêineres e fuse de portais ficam de fora.
+        if fstype in self.PSEUDO_FS: return False
+        if fstype in self.NETWORK_FS: return True
+        return fstype in block if block is not None else fstype not in ("tmpfs", "overlay") and not fstype.startswith("fuse.")
+
+    def collect(self):
+        mounts, block = {}, self.block_filesystems()
+        for part in psutil.disk_partitions(all=True):  # só lê a tabela de montagens; nenhum stat aqui
+            if self.wanted(part.fstype, block): mounts[part.mountpoint] = part  # a última montagem no mesmo ponto é a visível
+        disks = []
+        for mountpoint, result in self.prober.probe(mounts).items():
+            part = mounts[mountpoint]
+            if result is None: disks.append(DiskInfo(part.device, mountpoint, part.fstype, None, None, None, None, "sem resposta")); continue
+            if isinstance(result, OSError) or not result.f_blocks: continue
+            total, free = result.f_blocks * result.f_frsize, result.f_bavail * result.f_frsize; used = (result.f_blocks - result.f_bfree) * result.f_frsize
+            disks.append(DiskInfo(part.device, mountpoint, part.fstype, total, used, free, round(used / (used + free) * 100, 1) if used + free else 0.0))
+        try: io = self.stats.sample()
+        except OSError: io = ()
+        return {"mounts": tuple(disks), "io": io}
+
+# ===================================================================
+# MOTOR DE REDE (/proc/net)
+# ===================================================================
+# Lê /proc/net/{tcp,tcp6,udp,udp6} em bloco e resolve inode -> PID com um índice persistente: só PIDs novos são
+# varridos por completo, e PIDs conhecidos só são revisitados quando aparecem inodes de socket sem dono.
+TCP_STATES = {'01': 'ESTABLISHED', '02': 'SYN_SENT', '03': 'SYN_RECV', '04': 'FIN_WAIT1', '05': 'FIN_WAIT2', '06': 'TIME_WAIT', '07': 'CLOSE',
+              '08': 'CLOSE_WAIT', '09': 'LAST_ACK', '0A': 'LISTEN', '0B': 'CLOSING', '0C': 'NEW_SYN_RECV'}
+NetConnection = namedtuple('NetConnection', 'proto laddr lport raddr rport status inode')
+
+class NetworkEngine:
+    TABLES = (("tcp", socket.AF_INET), ("tcp6", socket.AF_INET6), ("udp", socket.AF_INET), ("udp6", socket.AF_INET6))
+    RETRY_UNOWNED_EVERY = 12  # ciclos entre novas tentativas de achar o dono dos inodes órfãos
+
+    def __init__(self, proc="/proc"):
+        self.proc = proc; self._addr_cache = {}
+        self.pid_fds = {}      # pid -> {fd: inode do socket, ou 0 para fds que não são sockets}
+        self.pid_start = {}    # pid -> starttime (detecta reuso de PID)
+        self.inode_pid = {}    # inode -> pid
+        self.names = {}        # pid -> (starttime, nome)
+        self.unowned = set()   # inodes sem dono visível após uma varredura completa
+        self.cycles = 0
+
+    def _addr(self, hexaddr, family):
+        addr = self._addr_cache.get(hexaddr)
+        if addr is None:
+            raw = bytes.fromhex(hexaddr)
+            raw = raw[::-1] if family == socket.AF_INET else b''.join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+            addr = self._addr_cache[hexaddr] = socket.inet_ntop(family, raw)
+            if len(self._addr_cache) > 100000: self._addr_cache.clear()
+        return addr
+
+    def read_sockets(self):
+        conns = []
+        for proto, family in self.TABLES:
+            try:
+                with open(os.path.join(self.proc, "net", proto)) as f: lines = f.read().splitlines()[1:]
+            except OSError: continue
+            udp = proto.startswith("udp")
+            for line in lines:
+                fields = line.split()
+                if len(fields) < 10: continue
+                (lhex, lport), (rhex, rport) = fields[1].split(':'), fields[2].split(':'); rport = int(rport, 16)
+                conns.append(NetConnection(proto, self._addr(lhex, family), int(lport, 16), self._addr(rhex, family) if rport else '*', rport or '*',
+                                           'NONE' if udp else TCP_STATES.get(fields[3], fields[3]), int(fields[9])))
+        return conns
+
+    def _stat(self, pid):
+        # Retorna (starttime, nome) a partir de /proc/<pid>/stat; o nome fica entre o primeiro '(' e o último ')'.
+        with open(os.path.join(self.proc, str(pid), "stat"), 'rb') as f: data = f.read().decode(errors='replace')
+        return int(data[data.rindex(')') + 2:].split()[19]), data[data.index('(') + 1:data.rindex(')')]
+
+    def _scan_fds(self, pid, live=None):
+        # Sem `live`, relê todos os fds do PID. Com o conjunto de inodes vivos, lê só os fds novos e os que eram sockets já
+        # fechados: o kernel reusa o menor número livre, então o mesmo fd pode agora apontar para outro socket.
+        fd_dir = os.path.join(self.proc, str(pid), "fd"); fds = self.pid_fds.setdefault(pid, {})
+        try: entries = set(os.listdir(fd_dir))
+        except OSError: return
+        for fd in [fd for fd, inode in fds.items() if live is None or fd not in entries or (inode and inode not in live)]:
+            inode = fds.pop(fd)
+            if inode and self.inode_pid.get(inode) == pid: del self.inode_pid[inode]
+        for fd in entries - fds.keys():
+            try: target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError: continue
+            fds[fd] = inode = int(target[8:-1]) if target.startswith("socket:[") else 0
+            if inode: self.inode_pid[inode] = pid
+
+    def _forget(self, pid):
+        for inode in self.pid_fds.pop(pid, {}).values():
+            if inode and self.inode_pid.get(inode) == pid: del self.inode_pid[inode]
+        self.pid_start.pop(pid, None); self.names.pop(pid, None)
+
+    def update_index(self, inodes):
+        pids = {int(d) for d in os.listdir(self.proc) if d.isdigit()}
+        for pid in set(self.pid_fds) - pids: self._forget(pid)
+        # PIDs que possuem sockets têm o starttime conferido a cada ciclo; reuso de PID invalida fds e nome.
+        for pid in {self.inode_pid[i] for i in inodes if i in self.inode_pid}:
+            try: start = self._stat(pid)[0]
+            except (OSError, ValueError, IndexError): self._forget(pid); continue
+            if self.pid_start.get(pid, start) != start: self._forget(pid)
+            else: self.pid_start[pid] = start
+        for pid in pids - set(self.pid_fds): self._scan_fds(pid)
+        self.cycles += 1; missing = inodes - self.inode_pid.keys()
+        if self.cycles % self.RETRY_UNOWNED_EVERY: missing -= self.unowned
+        if missing:
+            for pid in pids: self._scan_fds(pid, live=inodes)
+            if inodes - self.inode_pid.keys() - self.unowned:
+                for pid in pids: self._scan_fds(pid)
+                self.unowned = inodes - self.inode_pid.keys()
+        self.unowned &= inodes
+
+    def name(self, pid):
+        cached = self.names.get(pid)
+        if cached and cached[0] == self.pid_start.get(pid): return cached[1]
+        try: start, name = self._stat(pid)
+        except (OSError, ValueError, IndexError): return "N/A"
+        self.pid_start[pid] = start; self.names[pid] = (start, name); return name
+
+    def collect(self):
+        conns = self.read_sockets(); self.update_index({c.inode for c in conns if c.inode})
+        rows, by_state, by_host, names = [], {}, {}, {}
+        for c in conns:
+            by_state[c.status] = by_state.get(c.status, 0) + 1
+            if c.raddr != '*': by_host[c.raddr] = by_host.get(c.raddr, 0) + 1
+            pid = self.inode_pid.get(c.inode) if c.inode else None
+            if pid is None: continue
+            if pid not in names: names[pid] = self.name(pid)
+            rows.append((pid, names[pid], c.laddr, c.lport, c.raddr, c.rport, c.status, c.proto))
+        return {"connections": tuple(rows), "total": len(conns),
+                "by_state": tuple(sorted(by_state.items(), key=lambda kv: -kv[1])), "by_host": tuple(sorted(by_host.items(), key=lambda kv: -kv[1]))}
+
+class NetworkCollector(Collector):
+    def __init__(self, interval=None, proc="/proc"):
+        super().__init__("rede", interval); self.engine = NetworkEngine(proc)
+
+    def collect(self): return self.engine.collect()
+
+# ===================================================================
+# ÍNDICE DE PACOTES (dpkg)
+# ===================================================================
+# Lê /var/lib/dpkg/status e info/*.list diretamente, reconstruindo só quando os mtimes mudam, e guarda o resultado
+# em cache JSON para que a próxima abertura seja instantânea. A busca usa trigramas (ou prefixo, para termos curtos).
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cortex")
+Package = namedtuple('Package', 'name version description')
+
+def read_json_cache(name, signature):
+    try:
+        with open(os.path.join(CACHE_DIR, name)) as f: data = json.load(f)
+        return data["data"] if data.get("signature") == signature else None
+    except (OSError, ValueError, KeyError, TypeError): return None
+
+def write_json_cache(name, signature, payload):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True); tmp = os.path.join(CACHE_DIR, name + ".tmp")
+        with open(tmp, 'w') as f: json.dump({"signature": signature, "data": payload}, f)
+        os.replace(tmp, os.path.join(CACHE_DIR, name))
+    except OSError: pass
+
+class PackageIndex:
+    def __init__(self, admin_dir="/var/lib/dpkg"):
+        self.admin_dir = admin_dir; self.status_file = os.path.join(admin_dir, "status"); self.info_dir = os.path.join(admin_dir, "info")
+        self.packages, self.signature, self.paths, self.paths_signature = [], None, None, None
+        self._haystack, self._trigrams, self._sorted_names = [], {}, []
+        self.lock = threading.Lock()  # load() roda na thread do PackageCollector; search() na da interface
+
+    def _mtime(self, path):
+        try: return os.stat(path).st_mtime_ns
+        except OSError: return 0
+
+    def parse_status(self):
+        # Com multiarch o mesmo pacote aparece uma vez por arquitetura; esses viram "nome:arq", como no dpkg-query.
+        packages = []
+        with open(self.status_file, encoding='utf-8', errors='replace') as f: stanzas = f.read().split("\n\n")
+        for stanza in stanzas:
+            fields = {}
+            for line in stanza.split("\n"):
+                if line[:1] in (" ", "\t", "") or ":" not in line: continue
+                key, _, value = line.partition(":")
+                if key in ("Package", "Status", "Version", "Description", "Architecture"): fields[key] = value.strip()
+            if "Package" in fields and not fields.get("Status", "").endswith("not-installed"):
+                packages.append((fields["Package"], fields.get("Architecture", ""), fields.get("Version", ""), fields.get("Description", "")))
+        counts = Counter(name for name, *_ in packages)
+        return [Package(f"{name}:{arch}" if counts[name] > 1 and arch else name, version, description) for name, arch, version, description in packages]
+
+    def load(self):
+        signature = [self.status_file, self._mtime(self.status_file), "multiarch"]
+        if signature == self.signature: return False
+        cached = read_json_cache("dpkg_status.json", signature)
+        if cached is not None: packages = [Package(*p) for p in cached]
+        else:
+            try: packages = self.parse_status()
+            except OSError: packages = []
+            write_json_cache("dpkg_status.json", signature, packages)
+        search = self._build_search(packages)
+        with self.lock: self.packages, self.signature, (self._haystack, self._trigrams, self._sorted_names) = packages, signature, search
+        return True
+
+    @staticmethod
+    def _build_search(packages):
+        haystack = [f"{p.name}\t{p.description}".lower() for p in packages]; trigrams = {}
+        for i, text in enumerate(haystack):
+            for gram in {text[j:j + 3] for j in range(len(text) - 2)}: trigrams.setdefault(gram, []).append(i)
+        return haystack, trigrams, sorted((p.name.lower(), i) for i, p in enumerate(packages))
+
+    def search(self, query):
+        with self.lock: return self._search(query)
+
+    def _search(self, query):
+        # Índices dos pacotes cujo nome ou descrição contém `query`; os que começam com o termo vêm primeiro.
+        query = query.lower()
+        if not query: return list(range(len(self.packages)))
+        if len(query) >= 3:
+            grams = sorted((self._trigrams.get(query[j:j + 3], ()) for j in range(len(query) - 2)), key=len)
+            candidates = set(grams[0]).intersection(*grams[1:]) if grams[0] else set()
+            hits = sorted(i for i in candidates if query in self._haystack[i])
+        else: hits = [i for i, text in enumerate(self._haystack) if query in text]
+        start = bisect.bisect_left(self._sorted_names, (query,)); prefixed = []
+        for name, i in self._sorted_names[start:]:
+            if not name.startswith(query): break
+            prefixed.append(i)
+        first = set(prefixed); return prefixed + [i for i in hits if i not in first]
+
+    def load_paths(self):
+        signature = [self.info_dir, self._mtime(self.info_dir), self._mtime(self.status_file)]
+        if signature == self.paths_signature: return
+        files = read_json_cache("dpkg_files.json", signature)
+        if files is None:
+            files = {}
+            try: entries = [e for e in os.listdir(self.info_dir) if e.endswith(".list")]
+            except OSError: entries = []
+            for entry in entries:
+                try:
+                    with open(os.path.join(self.info_dir, entry), encoding='utf-8', errors='replace') as f: files[entry[:-5]] = f.read().split("\n")
+                except OSError: continue
+            write_json_cache("dpkg_files.json", signature, files)
+        paths = {}
+        for pkg, pkg_paths in files.items():
+            for path in pkg_paths:
+                if path: paths[path] = f"{paths[path]}, {pkg}" if path in paths else pkg
+        self.paths, self.paths_signature = paths, signature
+
+    def owner(self, path):
+        if self.paths is None: return None
+        real = os.path.realpath(path)
+        for candidate in (path, real, *(p[4:] if p.startswith("/usr/") else "/usr" + p for p in (path, real))):
+            if candidate in self.paths: return self.paths[candidate], candidate
+        return None
+
+class PackageCollector(Collector):
+    # Carrega o índice (e o mapa caminho -> pacote) fora da thread da interface; só publica quando o status do dpkg mudou.
+    def __init__(self, index, interval=None):
+        super().__init__("pacotes", interval); self.index = index
+
+    def collect(self):
+        changed = self.index.load(); self.index.load_paths()
+        return tuple(self.index.packages) if changed or self.latest().data is None else self.UNCHANGED
+
+# ===================================================================
+# SERVIÇOS (systemd)
+# ===================================================================
+# As unidades são carregadas uma vez (ListUnits no D-Bus, ou systemctl --output=json) e depois só os sinais do systemd
+# (UnitNew, UnitRemoved, PropertiesChanged) alteram o estado; cada snapshot diz quais linhas mudaram desde o anterior.
+# Sem jeepney ou sem barramento (contêineres, chroots), volta a consultar o systemctl periodicamente.
+ServiceInfo = namedtuple('ServiceInfo', 'unit load active sub description')
+ServiceUpdate = namedtuple('ServiceUpdate', 'units changed since mode')  # changed=None: o conjunto de unidades mudou, redesenhar tudo
+
+class DBusCallError(Exception):
+    # Erro devolvido pelo systemd a uma chamada (unidade que sumiu, acesso negado); a conexão continua válida.
+    pass
+
+class SystemdBus:
+    # systemd pelo barramento do sistema via jeepney (dependência opcional). Só a thread de escuta do ServiceCollector
+    # usa a conexão: respostas e sinais chegam pelo mesmo socket bloqueante.
+    NAME, PATH, MANAGER, UNIT = 'org.freedesktop.systemd1', '/org/freedesktop/systemd1', 'org.freedesktop.systemd1.Manager', 'org.freedesktop.systemd1.Unit'
+    FIELDS = {"LoadState": "load", "ActiveState": "active", "SubState": "sub", "Description": "description"}
+
+    def __init__(self, bus="SYSTEM"):
+        import jeepney
+        from jeepney.io.blocking import open_dbus_connection
+        self.jeepney, self.paths, self.queue = jeepney, {}, deque()
+        self.conn = open_dbus_connection(bus=bus); self.manager = jeepney.DBusAddress(self.PATH, bus_name=self.NAME, interface=self.MANAGER)
+        signals = [dict(interface=self.MANAGER, member="UnitNew"), dict(interface=self.MANAGER, member="UnitRemoved"),
+                   dict(interface="org.freedesktop.DBus.Properties", member="PropertiesChanged", path_namespace=self.PATH + "/unit")]
+        # O barramento filtra pelo nome conhecido; o filtro local compara o remetente único (":1.x"), então vai sem sender.
+        self.filters = [self.conn.filter(jeepney.MatchRule(type="signal", **rule), queue=self.queue) for rule in signals]
+        for rule in signals: self.call(jeepney.message_bus.AddMatch(jeepney.MatchRule(type="signal", sender=self.NAME, **rule)))
+        self.call(jeepney.new_method_call(self.manager, "Subscribe"))
+
+    def call(self, message):
+        try: return self.jeepney.wrappers.unwrap_msg(self.conn.send_and_get_reply(message, timeout=10))
+        except self.jeepney.DBusErrorResponse as e: raise DBusCallError(f"D-Bus: {e.name}: {' '.join(map(str, e.data))}")
+
+    def list_units(self):
+        units, = self.call(self.jeepney.new_method_call(self.manager, "ListUnits")); self.paths = {}; services = []
+        for name, description, load, active, sub, _following, path, *_job in units:
+            if name.endswith(".service"): self.paths[path] = name; services.append(ServiceInfo(name, load, active, sub, description))
+        return services
+
+    def properties(self, path):
+        props, = self.call(self.jeepney.Properties(self.jeepney.DBusAddress(path, bus_name=self.NAME, interface=self.UNIT)).get_all())
+        return {field: props[key][1] for key, field in self.FIELDS.items() if key in props}
+
+    def next_events(self, timeout):
+        # Eventos normalizados: ("new", ServiceInfo), ("removed", unidade) e ("changed", unidade, {campo: valor}).
+        try: messages = [self.conn.recv_until_filtered(self.queue, timeout=timeout)]
+        except TimeoutError: return []
+        while self.queue: messages.append(self.queue.popleft())
+        events, fields = [], self.jeepney.HeaderFields
+        for msg in messages:
+            try: events.extend(self._event(msg, fields))
+            except DBusCallError: continue  # a unidade sumiu ou negou o GetAll: ignora só este sinal
+        return events
+
+    def _event(self, msg, fields):
+        member, path = msg.header.fields.get(fields.member), msg.header.fields.get(fields.path)
+        if member == "UnitNew":
+            name, unit_path = msg.body
+            if name.endswith(".service") and unit_path not in self.paths:
+                info = ServiceInfo(name, "", "", "", "")._replace(**self.properties(unit_path)); self.paths[unit_path] = name; return [("new", info)]
+        elif member == "UnitRemoved":
+            name, unit_path = msg.body
+            if self.paths.pop(unit_path, None): return [("removed", name)]
+        elif member == "PropertiesChanged" and path in self.paths and msg.body[0] == self.UNIT:
+            _, changed, invalidated = msg.body
+            values = self.properties(path) if any(key in invalidated for key in self.FIELDS) else {field: changed[key][1] for key, field in self.FIELDS.items() if key in changed}
+            if values: return [("changed", self.paths[path], values)]
+        return []
+
+    def close(self): self.conn.close()
+
+class ServiceCollector(Collector):
+    # bus: fábrica da conexão de sinais (SystemdBus ou um barramento falso com list_units/next_events/close); None, ou uma
+    # falha ao conectar, deixa o coletor consultando `command` a cada poll_interval segundos.
+    def __init__(self, interval=None, command=("systemctl",), bus=SystemdBus, poll_interval=30.0):
+        super().__init__("servicos", interval); self.command, self.bus_factory, self.poll_interval = list(command), bus, poll_interval
+        self.units, self.events, self.mode, self.status, self._reload, self._json = {}, Queue(), None, "", False, True
+
+    def reload(self):
+        if self.mode == "dbus": self._reload = True
+        self.wake()
+
+    def collect(self):
+        if self.mode is None: self._start()
+        if self.mode == "dbus": return self._apply_events()
+        return self._poll()
+
+    def _start(self):
+        if self.bus_factory is not None:
+            try: bus = self.bus_factory()
+            except (ImportError, OSError, ValueError, DBusCallError) as e: self._fallback(e)
+            else: self.mode, self.status = "dbus", "sinais do systemd (D-Bus)"; threading.Thread(target=self._listen, args=(bus,), name="cortex-servicos-dbus", daemon=True).start(); return
+        else: self._fallback(None)
+
+    def _fallback(self, error):
+        self.mode, self.interval = "poll", self.poll_interval
+        self.status = f"consulta a cada {self.poll_interval:.0f} s" + (f" (D-Bus indisponível: {error})" if error else "")
+
+    def _listen(self, bus):
+        try:
+            self.events.put(("all", bus.list_units())); self.wake()
+            while not self._stopped.is_set():
+                if self._reload: self._reload = False; self.events.put(("all", bus.list_units())); self.wake()
+                events = bus.next_events(1.0)
+                for event in events: self.events.put(event)
+                if events: self.wake()  # uma rajada de sinais vira um único snapshot
+        except (OSError, ValueError, DBusCallError) as e: self._fallback(e); self.wake()  # conexão perdida ou ListUnits recusado
+        finally: bus.close()
+
+    def _apply_events(self):
+        changed, full = set(), False
+        while not self.events.empty():
+            event = self.events.get()
+            if event[0] == "all": self.units = {s.unit: s for s in event[1]}; full = True
+            elif event[0] == "new":
+                full |= event[1].unit not in self.units; self.units[event[1].unit] = event[1]; changed.add(event[1].unit)
+            elif event[0] == "removed": full |= self.units.pop(event[1], None) is not None
+            elif event[1] in self.units:
+                old = self.units[event[1]]; new = old._replace(**event[2])
+                if new != old: self.units[event[1]] = new; changed.add(event[1])
+        if not full and not changed: return self.UNCHANGED
+        return ServiceUpdate(dict(self.units), None if full else frozenset(changed), self.latest().seq, self.status)
+
+    def _poll(self):
+        units = {s.unit: s for s in self.list_units()}
+        if self.latest().data is None or units.keys() != self.units.keys(): changed = None
+        else:
+            changed = frozenset(name for name, s in units.items() if self.units[name] != s)
+            if not changed: return self.UNCHANGED
+        self.units = units; return ServiceUpdate(dict(units), changed, self.latest().seq, self.status)
+
+    def list_units(self):
+        base = [*self.command, 'list-units', '--type=service', '--all', '--no-pager']
+        try: out = subprocess.check_output(base + ['--output=json'] if self._json else base, text=True, errors='replace', stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            if not self._json: return ()
+            self._json = False; return self.list_units()  # systemctl antigo que recusa --output=json
+        except FileNotFoundError: return ()  # sem systemd
+        try: return tuple(ServiceInfo(u["unit"], u["load"], u["active"], u["sub"], u.get("description", "")) for u in json.loads(out))
+        except (ValueError, KeyError, TypeError): return self.parse_units(out)  # systemd < 246 ignora --output=json e imprime texto
+
+    @staticmethod
+    def parse_units(out):
+        # Texto de list-units: cabeçalho, uma linha por unidade ("●" marca as com falha) e, após uma linha em branco, a legenda.
+        services = []
+        for line in out.split('\n')[1:]:
+            if not line.strip(): break
+            parts = line.lstrip(' ●*').split(maxsplit=4)
+            if len(parts) < 4: continue
+            services.append(ServiceInfo(parts[0], parts[1], parts[2], parts[3], parts[4] if len(parts) > 4 else ""))
+        return tuple(services)
+
+# ===================================================================
+# SENSORES DE HARDWARE (hwmon / thermal)
+# ===================================================================
+# Enumera /sys/class/hwmon e /sys/class/thermal uma única vez e mantém um descritor aberto por sensor;
+# cada leitura é só um pread() de poucos bytes. `root` permite apontar para uma árvore sysfs falsa.
+Sensor = namedtuple('Sensor', 'key chip label kind unit scale limit')
+SENSOR_KINDS = {"temp": ("°C", 1000.0), "fan": ("RPM", 1.0), "in": ("V", 1000.0)}
+
+class SensorBackend:
+    def __init__(self, root="/sys"):
+        self.root = root; self.sensors, self._fds, self.stats = [], [], {}
+        self.enumerate()
+
+    def _read_text(self, path):
+        try:
+            with open(path) as f: return f.read().strip()
+        except OSError: return None
+
+    def _add(self, key, chip, label, kind, path, limit=None):
+        try: fd = os.open(path, os.O_RDONLY)
+        except OSError: return
+        unit, scale = SENSOR_KINDS[kind]; self.sensors.append(Sensor(key, chip, label, kind, unit, scale, limit)); self._fds.append(fd)
+
+    def enumerate(self):
+        self.close(); hwmon_root, thermal_root = os.path.join(self.root, "class", "hwmon"), os.path.join(self.root, "class", "thermal")
+        for hwmon in sorted(os.listdir(hwmon_root)) if os.path.isdir(hwmon_root) else []:
+            base, seen = os.path.join(hwmon_root, hwmon), set()
+            for directory in (base, os.path.join(base, "device")):
+                chip = self._read_text(os.path.join(directory, "name")) or self._read_text(os.path.join(base, "name")) or hwmon
+                try: entries = sorted(os.listdir(directory))
+                except OSError: continue
+                for entry in entries:
+                    prefix, _, suffix = entry.partition("_")
+                    kind = prefix.rstrip("0123456789")
+                    if suffix != "input" or kind not in SENSOR_KINDS or prefix in seen: continue
+                    seen.add(prefix); label = self._read_text(os.path.join(directory, f"{prefix}_label")) or prefix
+                    limit = None
+                    for name in ("crit", "max"):
+                        raw = self._read_text(os.path.join(directory, f"{prefix}_{name}")) if kind == "temp" else None
+                        if raw and raw.lstrip("-").isdigit() and int(raw) > 0: limit = int(raw) / SENSOR_KINDS[kind][1]; break
+                    # A chave usa o prefixo do sysfs (temp1, fan1): drivers repetem o mesmo rótulo em entradas de tipos diferentes.
+                    self._add(f"{chip}/{hwmon}/{prefix}", chip, label, kind, os.path.join(directory, entry), limit)
+        for zone in sorted(os.listdir(thermal_root)) if os.path.isdir(thermal_root) else []:
+            if not zone.startswith("thermal_zone"): continue
+            base = os.path.join(thermal_root, zone); kind = self._read_text(os.path.join(base, "type")) or zone
+            self._add(f"thermal/{zone}", "thermal", kind, "temp", os.path.join(base, "temp"))
+
+    def read(self):
+        values = []
+        for sensor, fd in zip(self.sensors, self._fds):
+            try: value = int(os.pread(fd, 32, 0)) / sensor.scale
+            except (OSError, ValueError): value = None
+            if value is not None:
+                low, high, total, count = self.stats.get(sensor.key, (value, value, 0.0, 0))
+                self.stats[sensor.key] = (min(low, value), max(high, value), total + value, count + 1)
+            values.append((sensor, value))
+        return values
+
+    def close(self):
+        for fd in self._fds:
+            try: os.close(fd)
+            except OSError: pass
+        self.sensors, self._fds = [], []
+
+SensorReading = namedtuple('SensorReading', 'key chip label kind unit value min max avg limit')
+
+class SensorCollector(Collector):
+    def __init__(self, interval=None, root="/sys"):
+        super().__init__("sensores", interval); self.root, self.backend, self._redetect = root, None, False
+
+    def redetect(self): self._redetect = True; self.wake()
+
+    def collect(self):
+        # O backend (e seus descritores) vive só nesta thread; a redetecção é pedida por flag.
+        if self.backend is None: self.backend = SensorBackend(self.root)
+        elif self._redetect: self._redetect = False; self.backend.enumerate()
+        readings = []
+        for sensor, value in self.backend.read():
+            low, high, total, count = self.backend.stats.get(sensor.key, (None, None, 0.0, 0))
+            readings.append(SensorReading(sensor.key, sensor.chip, sensor.label, sensor.kind, sensor.unit, value, low, high, total / count if count else None, sensor.limit))
+        return tuple(readings)
+
+def sensor_threshold(sensor, alerts):
+    # Limite de alerta: ajuste específico do sensor, senão o da configuração (temp/in: máximo; fan: mínimo), senão o crit/max do hwmon.
+    specific = alerts.get("sensors", {}).get(sensor.key)
+    if specific is not None: return specific
+    if sensor.kind == "temp":
+        limits = [x for x in (alerts.get("temp"), sensor.limit) if x is not None]
+        return min(limits) if limits else None
+    return alerts.get("fan_min") if sensor.kind == "fan" else alerts.get("in_max")
+
+def format_sensor(sensor, value):
+    if value is None: return "—"
+    return f"{value:.0f} {sensor.unit}" if sensor.kind == "fan" else f"{value:.2f} {sensor.unit}" if sensor.kind == "in" else f"{value:.1f} {sensor.unit}"
+
+def sensor_alert(sensor, value, threshold):
+    if value is None or threshold is None: return False
+    return value < threshold if sensor.kind == "fan" else value >= threshold
+
+# ===================================================================
+# DIAGNÓSTICO (strace em fluxo e descritores abertos)
+# ===================================================================
+# O strace roda com -f -T numa thread que lê stderr em blocos e alimenta um parser incremental de linhas; a janela só lê
+# as contagens agregadas. SIGINT faz o strace se desanexar do processo (PTRACE_DETACH) e sair limpo.
+class SyscallStats:
+    BUCKETS = 24  # histograma em potências de 2 de µs: [0] < 1 µs, [b] em [2^(b-1), 2^b) µs, o último acumula o resto
+    HEAD = re.compile(r'(?:\[pid\s+(\d+)\]\s+)?(?:<\.\.\. (\w+) resumed>|(\w+)\()')
+    TAIL = re.compile(r'\)\s+= (-?\w+|\?)(?: (E[A-Z0-9_]+))?.*<(\d+\.\d+)>\s*$')
+
+    def __init__(self):
+        self.lock = threading.Lock(); self._partial = b""
+        self.calls = {}  # syscall -> [chamadas, erros, tempo total, maior latência]
+        self.hist = {}   # syscall -> contagens do histograma de latência
+        self.total_hist = np.zeros(self.BUCKETS, dtype=np.int64); self.total_calls = self.signals = 0
+        self.pids, self.messages = set(), deque(maxlen=20)
+
+    def feed(self, chunk):
+        lines = (self._partial + chunk).split(b"\n"); self._partial = lines.pop()
+        with self.lock:
+            for line in lines: self.parse(line.decode(errors='replace'))
+
+    def flush(self):
+        if self._partial: self._partial, rest = b"", self._partial; self.feed(rest + b"\n")
+
+    def parse(self, line):
+        # Linhas "<unfinished ...>" são ignoradas: a latência (-T) da chamada inteira vem na linha "<... x resumed>".
+        if line.startswith("strace: ") or line.startswith("+++ "): self.messages.append(line); return
+        if line.startswith("--- ") or (line.startswith("[pid") and " --- " in line): self.signals += 1; return
+        head = self.HEAD.match(line)
+        if not head or line.endswith("<unfinished ...>"): return
+        tail = self.TAIL.search(line)
+        if not tail: return
+        name, latency = head.group(2) or head.group(3), float(tail.group(3))
+        if head.group(1): self.pids.add(int(head.group(1)))
+        entry = self.calls.get(name)
+        if entry is None: entry = self.calls[name] = [0, 0, 0.0, 0.0]; self.hist[name] = np.zeros(self.BUCKETS, dtype=np.int64)
+        entry[0] += 1; entry[2] += latency; entry[3] = max(entry[3], latency)
+        if tail.group(2): entry[1] += 1
+        bucket = min(self.BUCKETS - 1, int(latency * 1e6).bit_length()); self.hist[name][bucket] += 1; self.total_hist[bucket] += 1; self.total_calls += 1
+
+    def summary(self):
+        # Cópia consistente para a GUI: linhas (syscall, chamadas, erros, total, máx.) ordenadas por tempo total.
+        with self.lock: return sorted(((n, *e) for n, e in self.calls.items()), key=lambda r: r[3], reverse=True), self.total_calls, len(self.pids)
+
+    def histogram(self, name=None):
+        with self.lock:
+            hist = self.total_hist if name is None else self.hist.get(name)
+            return np.zeros(self.BUCKETS, dtype=np.int64) if hist is None else hist.copy()
+
+def format_latency(seconds): return f"{seconds * 1e6:.0f} µs" if seconds < 1e-3 else f"{seconds * 1e3:.2f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+def format_histogram(hist, width=40):
+    used = np.flatnonzero(hist)
+    if not len(used): return "(sem chamadas)"
+    top = hist.max(); lines = []
+    for b in range(used[0], used[-1] + 1):
+        label = "< 1 µs" if b == 0 else f"≥ {format_latency(2 ** (b - 1) / 1e6)}"
+        lines.append(f"{label:>11} |{'█' * int(round(hist[b] / top * width)):<{width}}| {hist[b]}")
+    return "\n".join(lines)
+
+class StraceSession(threading.Thread):
+    def __init__(self, pid, duration=None, command=("strace",)):
+        super().__init__(name=f"cortex-strace-{pid}", daemon=True)
+        self.pid, self.duration, self.command = pid, duration, list(command)
+        self.stats = SyscallStats(); self.process = self.error = self.returncode = None; self.started = time.monotonic()
+        self._detach = threading.Event()
+
+    def run(self):
+        try: self.process = subprocess.Popen([*self.command, '-f', '-T', '-s', '0', '-p', str(self.pid)], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e: self.error = e; return
+        if self._detach.is_set(): self.detach()
+        timer = threading.Timer(self.duration, self.detach) if self.duration else None
+        if timer: timer.daemon = True; timer.start()
+        fd = self.process.stderr.fileno()
         try:
-            while not self.queue.empty():
-                line = self.queue.get_nowait()
-                self.text_area.config(state='normal'); self.text_area.insert(tk.END, line); self.text_area.see(tk.END); self.text_area.config(state='disabled')
+            for chunk in iter(lambda: os.read(fd, 65536), b''): self.stats.feed(chunk)
+            self.stats.flush()
         finally:
-            if self.thread.is_alive() or not self.queue.empty(): self.after(100, self.process_queue)
-            else: self.title("Comando Concluído")
+            if timer: timer.cancel()
+            self.process.stderr.close(); self.returncode = self.process.wait()
+
+    def elapsed(self): return time.monotonic() - self.started
+
+    def detach(self):
+        # Pede ao strace que solte o processo; se ele não sair em 2 s, é morto (o kernel desanexa o tracee de qualquer forma).
+        self._detach.set(); process = self.process
+        if process is None or process.poll() is not None: return
+        try: process.send_signal(signal.SIGINT)
+        except OSError: return
+        killer = threading.Timer(2.0, lambda: process.poll() is None and process.kill()); killer.daemon = True; killer.start()
 
-    def on_closing(self):
-        if self.thread.is_alive(): messagebox.showwarning("Atenção", "O comando ainda está em execução em segundo plano."); return
-        self.destroy()
+FD_KINDS = (("socket:[", "socket"), ("pipe:[", "pipe"), ("anon_inode:", "anon"), ("/dev/", "dispositivo"), ("/", "arquivo"))
+
+def iter_open_fds(pid, proc="/proc", batch=256):
+    # Lotes de (fd, tipo, alvo) lidos de /proc/<pid>/fd; descritores fechados durante a leitura são ignorados. Sockets
+    # TCP/UDP são descritos a partir de /proc/net, lido uma única vez e só se o processo tiver algum socket.
+    out, sockets = [], None
+    with os.scandir(os.path.join(proc, str(pid), "fd")) as entries:
+        for entry in entries:
+            try: target = os.readlink(entry.path)
+            except OSError: continue
+            kind = next((k for prefix, k in FD_KINDS if target.startswith(prefix)), "outro")
+            if kind == "socket":
+                if sockets is None: sockets = {c.inode: c for c in NetworkEngine(proc).read_sockets()}
+                conn = sockets.get(int(target[8:-1])) if target[8:-1].isdigit() else None
+                if conn: target = f"{target} {conn.proto} {conn.laddr}:{conn.lport} -> {conn.raddr}:{conn.rport} {conn.status}"
+            out.append((int(entry.name), kind, target))
+            if len(out) >= batch: yield out; out = []
+    if out: yield out
+
+# ===================================================================
+# TAREFAS EM SEGUNDO PLANO (comandos apt/systemctl)
+# ===================================================================
+# Cada tarefa lê a saída do comando em blocos (os.read) numa thread, grava tudo num log em disco e acumula o texto
+# novo até a interface drená-lo; a tela recebe um único insert por tick e guarda só as últimas linhas.
+class Job(threading.Thread):
+    def __init__(self, job_id, command, log_dir, scrollback=5000, on_done=None):
+        super().__init__(name=f"cortex-job-{job_id}", daemon=True)
+        self.id, self.command, self.on_done = job_id, list(command), on_done
+        self.state, self.returncode, self.process, self.started, self.finished = "iniciando", None, None, time.time(), None
+        self.log_path = os.path.join(log_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{job_id:04d}.log")
+        self.lines, self.partial = deque(maxlen=scrollback), ""  # últimas linhas já drenadas (para reexibir a tarefa)
+        self._pending, self._lock, self._signal = [], threading.Lock(), None
+
+    def _emit(self, text):
+        if text:
+            with self._lock: self._pending.append(text)
+
+    def run(self):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace'); header = f"$ {' '.join(self.command)}\n"; self._emit(header)
+        try: os.makedirs(os.path.dirname(self.log_path), exist_ok=True); log = open(self.log_path, 'wb')
+        except OSError: log = None
+        try:
+            if log: log.write(header.encode())
+            try: self.process = subprocess.Popen(self.command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+            except OSError as e: self.state = "erro"; self._emit(f"\n--- ERRO AO EXECUTAR COMANDO ---\n{e}\n"); return
+            self.state = "executando"
+            if self._signal: self.send(self._signal)
+            fd = self.process.stdout.fileno()
+            for chunk in iter(lambda: os.read(fd, 65536), b''):
+                if log: log.write(chunk)
+                self._emit(decoder.decode(chunk))
+            self._emit(decoder.decode(b'', final=True)); self.process.stdout.close(); self.returncode = self.process.wait()
+            self.state = "concluído" if self.returncode == 0 else "cancelado" if self._signal else "falhou"
+            footer = f"\n--- COMANDO CONCLUÍDO (Código de Saída: {self.returncode}) ---\n"; self._emit(footer)
+            if log: log.write(footer.encode())
+        finally:
+            self.finished = time.time()
+            if log: log.close()
+
+    def drain(self):
+        # Texto novo desde a última chamada (thread da interface); também alimenta o histórico limitado de linhas.
+        with self._lock: text, self._pending = "".join(self._pending), []
+        if text:
+            lines = (self.partial + text).split("\n"); self.partial = lines.pop(); self.lines.extend(lines)
+        return text
+
+    def send(self, sig):
+        # O comando roda em sessão própria: o sinal vai para o grupo inteiro (apt-get -> dpkg -> scripts de manutenção).
+        self._signal = self._signal or sig
+        if self.process is None or self.process.poll() is not None: return
+        try: os.killpg(self.process.pid, sig)
+        except (ProcessLookupError, PermissionError): pass
+
+    def cancel(self): self.send(signal.SIGTERM)
+    def kill(self): self.send(signal.SIGKILL)
+
+class JobManager:
+    def __init__(self, log_dir=os.path.join(CACHE_DIR, "jobs"), scrollback=5000, keep_logs=50):
+        self.log_dir, self.scrollback, self.keep_logs, self.jobs, self._next = log_dir, scrollback, keep_logs, [], 1
+
+    def start(self, command, on_done=None):
+        self.prune_logs(); job = Job(self._next, command, self.log_dir, self.scrollback, on_done); self._next += 1
+        self.jobs.append(job); job.start(); return job
+
+    def prune_logs(self):
+        try: logs = sorted(f for f in os.listdir(self.log_dir) if f.endswith(".log"))
+        except OSError: return
+        for name in logs[:max(0, len(logs) - self.keep_logs + 1)]:
+            try: os.remove(os.path.join(self.log_dir, name))
+            except OSError: pass
+
+    def running(self): return [job for job in self.jobs if job.is_alive()]
+
+    def clear_finished(self): self.jobs = [job for job in self.jobs if job.is_alive() or job.on_done]
+
+# ===================================================================
+# AGENDADOR DE ATUALIZAÇÕES
+# ===================================================================
+# Um único laço after() no lugar de um laço por aba: roda no máximo uma tarefa por tick (espalhando o trabalho),
+# prioriza a aba visível, atualiza abas ocultas em ritmo reduzido (ou só quando exibidas) e recua quando uma
+# atualização demora mais que o seu intervalo.
+class RefreshScheduler:
+    TICK_MS, MAX_BACKOFF = 100, 8.0
+
+    def __init__(self, root, visible_tab):
+        self.root, self.visible_tab, self.tasks = root, visible_tab, {}
+
+    def register(self, name, func, interval, tab=None, hidden_interval=None):
+        # interval=None: tarefa única, executada na primeira vez em que a aba for exibida.
+        self.tasks[name] = {"func": func, "interval": interval, "tab": tab, "hidden": hidden_interval, "backoff": 1.0, "done": False,
+                            "due": time.monotonic() + len(self.tasks) * self.TICK_MS / 1000, "duration": 0.0}
+
+    def start(self): self.root.after(self.TICK_MS, self.tick)
+
+    def trigger(self, name):
+        if name in self.tasks: self.tasks[name]["due"] = time.monotonic()
+
+    def trigger_tab(self, tab):
+        for name, task in self.tasks.items():
+            if task["tab"] == tab: self.trigger(name)
+
+    def _interval(self, task, visible):
+        if task["interval"] is None: return None if task["done"] else 0.0
+        if task["tab"] is None or visible: return task["interval"]
+        return task["hidden"]
+
+    def tick(self):
+        self.root.after(self.TICK_MS, self.tick); INSTRUMENTS.tick(); now, visible = time.monotonic(), self.visible_tab(); best = None
+        for task in self.tasks.values():
+            shown = task["tab"] == visible
+            if self._interval(task, shown) is None or task["due"] > now: continue
+            if task["tab"] is not None and not shown and task["hidden"] is None: continue
+            key = (not shown, task["due"])
+            if best is None or key < best[0]: best = (key, task, shown)
+        if best:
+            _, task, shown = best; started = time.monotonic()
+            try:
+                with INSTRUMENTS.span(task["func"].__qualname__): task["func"]()
+            finally:
+                task["duration"] = elapsed = time.monotonic() - started; task["done"] = True; interval = self._interval(task, shown) or 0.0
+                if interval and elapsed > interval * task["backoff"]: task["backoff"] = min(task["backoff"] * 2, self.MAX_BACKOFF)
+                elif elapsed < interval / 2: task["backoff"] = max(1.0, task["backoff"] / 2)
+                task["due"] = time.monotonic() + interval * task["backoff"]
+
+# ===================================================================
+# RECONCILIADOR INCREMENTAL DE TREEVIEW
+# ===================================================================
+# Aplica uma lista de linhas (iid, valores) a um Treeview com o mínimo de chamadas Tcl: insere só iids novos,
+# remove só os que sumiram, atualiza só valores alterados e move apenas as linhas fora da maior subsequência já ordenada.
+class TreeReconciler:
+    def __init__(self, tree):
+        self.tree = tree; self.values = {}; self.order = []
+
+    def reconcile(self, rows):
+        tree, values = self.tree, self.values
+        rows = [(str(iid), vals) for iid, vals in rows]; position = {iid: i for i, (iid, _) in enumerate(rows)}
+        if len(position) != len(rows):
+            seen = set(); rows = [r for r in rows if r[0] not in seen and not seen.add(r[0])]; position = {iid: i for i, (iid, _) in enumerate(rows)}
+        gone = [iid for iid in self.order if iid not in position]
+        if gone:
+            tree.delete(*gone)
+            for iid in gone: del values[iid]
+        kept = [iid for iid in self.order if iid in position]; stable = self._longest_ordered(kept, position)
+        misplaced = [iid for iid in kept if iid not in stable]
+        if misplaced: tree.detach(*misplaced)
+        cursor = -1  # índice da linha anterior, quando conhecido sem consultar o Tk
+        for i, (iid, vals) in enumerate(rows):
+            if iid in stable: cursor = None
+            else:
+                if cursor is None: cursor = tree.index(rows[i - 1][0])
+                cursor += 1
+                if iid in values: tree.move(iid, "", cursor)
+                else: tree.insert("", cursor, iid=iid, values=vals); values[iid] = vals
+            if values[iid] != vals: tree.item(iid, values=vals); values[iid] = vals
+        self.order = [iid for iid, _ in rows]
+
+    def update(self, iid, vals):
+        # Atualiza uma linha já exibida sem percorrer as demais; False se ela não está na árvore (o chamador reconcilia tudo).
+        iid = str(iid)
+        if iid not in self.values: return False
+        if self.values[iid] != vals: self.tree.item(iid, values=vals); self.values[iid] = vals
+        return True
+
+    @staticmethod
+    def _longest_ordered(items, position):
+        # Maior subsequência crescente (por posição desejada) em O(n log n); essas linhas não precisam ser movidas.
+        tails, tails_idx, parent = [], [], [None] * len(items)
+        for i, iid in enumerate(items):
+            k = bisect.bisect_left(tails, position[iid])
+            if k == len(tails): tails.append(position[iid]); tails_idx.append(i)
+            else: tails[k] = position[iid]; tails_idx[k] = i
+            parent[i] = tails_idx[k - 1] if k else None
+        stable, i = set(), tails_idx[-1] if tails_idx else None
+        while i is not None: stable.add(items[i]); i = parent[i]
+        return stable
+
+    def clear(self):
+        if self.order: self.tree.delete(*self.order)
+        self.values.clear(); self.order = []
+
+# ===================================================================
+# SÉRIES DOS GRÁFICOS DE DESEMPENHO
+# ===================================================================
+# Buffer circular pré-alocado: cada amostra é gravada em i e em i+capacidade, então a janela ordenada
+# (da mais antiga para a mais recente) é sempre uma fatia contígua, sem cópias.
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity; self._buf = np.full(2 * capacity, np.nan, dtype=np.float32); self._head = 0
+
+    def append(self, value):
+        self._buf[self._head] = self._buf[self._head + self.capacity] = value; self._head = (self._head + 1) % self.capacity
+
+    def load(self, values): self._buf[:self.capacity] = self._buf[self.capacity:] = values; self._head = 0
+
+    def view(self): return self._buf[self._head:self._head + self.capacity]
+    def last(self): return float(self._buf[self._head + self.capacity - 1])
+
+    def decimate(self, out):
+        # Reduz a janela a len(out) pontos pelo máximo de cada bloco: o custo de desenho não cresce com o histórico.
+        np.fmax.reduce(self.view().reshape(len(out), -1), axis=1, out=out); return out
+
+# Linha (e preenchimento opcional) persistentes de um eixo, atualizados no lugar a partir de um RingBuffer.
+class GraphSeries:
+    def __init__(self, ax, x, live, color, fill=False, label_fmt=None, **line_kw):
+        self.buffer = self.live = live; self.display = np.full(len(x), np.nan, dtype=np.float32); self.fill_path, self.fill_y, self.label = None, None, None
+        self.line, = ax.plot(x, self.display, color=color, animated=True, **line_kw); self.artists = [self.line]
+        if fill:
+            verts = np.zeros((len(x) + 2, 2)); verts[1:-1, 0] = x; verts[0, 0], verts[-1, 0] = x[0], x[-1]
+            poly = Polygon(verts, closed=True, color=color, alpha=0.3, animated=True); ax.add_patch(poly)
+            self.fill_path = poly.get_path(); self.fill_y = self.fill_path.vertices[1:len(x) + 1, 1]; self.artists.append(poly)
+        if label_fmt:
+            self.label_fmt = label_fmt; self.label = ax.text(0.99, 0.85, "", transform=ax.transAxes, ha='right', fontsize='small', color=color, animated=True); self.artists.append(self.label)
+
+    def show(self, values=None):
+        # Exibe uma série gravada (já reamostrada para a capacidade do buffer) ou, sem argumentos, volta ao buffer ao vivo.
+        if values is None: self.buffer = self.live
+        else: self.buffer = RingBuffer(self.live.capacity); self.buffer.load(values)
+
+    def set_x(self, x):
+        self.line.set_xdata(x)
+        if self.fill_path is not None:
+            verts = self.fill_path.vertices; verts[1:len(x) + 1, 0] = x; verts[0, 0] = verts[-1, 0] = x[0]; verts[len(x) + 1, 0] = x[-1]
+
+    def refresh(self):
+        self.line.set_ydata(self.buffer.decimate(self.display))
+        if self.fill_y is not None: np.fmax(self.display, 0, out=self.fill_y)
+        if self.label: self.label.set_text(self.label_fmt.format(self.buffer.last()))
+
+# ===================================================================
+# GRAVADOR DE SÉRIES TEMPORAIS (segmentos binários)
+# ===================================================================
+# Segmentos só-de-acréscimo com registros de tamanho fixo: um cabeçalho de 4 KiB (magic + layout em JSON) seguido de
+# registros NumPy estruturados. A resolução de 1 s é consolidada em 1 min e 1 h; a leitura usa memmap + searchsorted.
+SEGMENT_MAGIC, SEGMENT_HEADER = b"CTXSEG01", 4096
+ROLLUPS = (("1s", 1), ("1m", 60), ("1h", 3600))
+# Interfaces de contêineres e VMs aparecem e somem o tempo todo; cada mudança de layout abriria segmentos novos.
+VIRTUAL_NICS = ("veth", "docker", "br-", "tap", "virbr")
+
+def record_dtype(layout):
+    n, d, k, t = layout["ncpu"], len(layout["disks"]), len(layout["nics"]), layout["top"]
+    return np.dtype([("ts", "<f8"), ("cpu", "<f4"), ("cores", "<f4", (n,)), ("mem", "<f4"), ("swap", "<f4"),
+                     ("disk_read", "<f4", (d,)), ("disk_write", "<f4", (d,)), ("net_rx", "<f4", (k,)), ("net_tx", "<f4", (k,)),
+                     ("top_pid", "<i4", (t,)), ("top_cpu", "<f4", (t,)), ("top_rss", "<f4", (t,)), ("top_name", "S16", (t,))])
+
+class SegmentWriter:
+    def __init__(self, directory, resolution, layout, start):
+        self.resolution, self.layout, self.dtype = resolution, layout, record_dtype(layout)
+        header = json.dumps({"version": 1, "resolution": resolution, **layout}).encode()
+        # Nunca sobrescreve: um segmento aberto no mesmo instante (troca de layout no meio da hora) ganha um sufixo.
+        for n in itertools.count():
+            self.path = os.path.join(directory, f"{resolution}-{int(start * 1000)}{f'-{n}' if n else ''}.seg")
+            try: self.file = open(self.path, "xb"); break
+            except FileExistsError: continue
+        self.file.write(SEGMENT_MAGIC + header.ljust(SEGMENT_HEADER - len(SEGMENT_MAGIC), b"\0")); self.size = SEGMENT_HEADER
+
+    def write(self, record): self.file.write(record.tobytes()); self.file.flush(); self.size += self.dtype.itemsize
+    def sync(self): self.file.flush(); os.fsync(self.file.fileno())
+    def close(self): self.sync(); self.file.close()
+
+class TimeSeriesStore:
+    def __init__(self, directory): self.directory = directory
+
+    def segments(self, resolution):
+        try: names = [n for n in os.listdir(self.directory) if n.startswith(resolution + "-") and n.endswith(".seg")]
+        except OSError: return []
+        return [os.path.join(self.directory, n) for n in sorted(names, key=lambda n: tuple(map(int, n[len(resolution) + 1:-4].split("-"))))]
+
+    @staticmethod
+    def open_segment(path):
+        with open(path, "rb") as f: header = f.read(SEGMENT_HEADER)
+        if not header.startswith(SEGMENT_MAGIC): raise ValueError(f"Segmento inválido: {path}")
+        layout = json.loads(header[len(SEGMENT_MAGIC):].rstrip(b"\0")); dtype = record_dtype(layout)
+        count = (os.path.getsize(path) - SEGMENT_HEADER) // dtype.itemsize
+        return layout, np.memmap(path, dtype=dtype, mode="r", offset=SEGMENT_HEADER, shape=(count,)) if count else np.zeros(0, dtype)
+
+    def read(self, resolution, start, end):
+        # Fatias (views de memmap, sem parsing) dos registros com start <= ts <= end, segmento a segmento.
+        parts = []
+        for path in self.segments(resolution):
+            try: layout, records = self.open_segment(path)
+            except (OSError, ValueError): continue
+            if not len(records) or records["ts"][-1] < start: continue
+            if records["ts"][0] > end: break
+            ts = records["ts"]; parts.append((layout, records[np.searchsorted(ts, start):np.searchsorted(ts, end, side="right")]))
+        return parts
+
+    def pick_resolution(self, seconds):
+        return "1s" if seconds <= 2 * 3600 else "1m" if seconds <= 7 * 86400 else "1h"
+
+class TimeSeriesRecorder(Collector):
+    def __init__(self, directory, top_source=None, top_n=5, fsync_interval=10.0, segment_bytes=64 * 1024**2, retention_days=None):
+        super().__init__("gravador", 1.0)
+        self.directory, self.top_source, self.top_n = os.path.expanduser(directory), top_source, top_n
+        self.fsync_interval, self.segment_bytes, self.retention_days = fsync_interval, segment_bytes, retention_days or DEFAULT_SETTINGS['recorder']['retention_days']
+        self.layout, self.dtype, self.writers, self.pending, self._prev, self._last_sync, self.count = None, None, {}, {"1m": [], "1h": []}, None, time.monotonic(), 0
+
+    def run(self):
+        try: super().run()
+        finally: self.close()
+
+    def _cpu_percent(self, before, after):
+        total = sum(after) - sum(before); idle = (after.idle + getattr(after, 'iowait', 0)) - (before.idle + getattr(before, 'iowait', 0))
+        return 100.0 * (total - idle) / total if total > 0 else 0.0
+
+    def sample(self):
+        # CPU por núcleo a partir de cpu_times próprios, para não interferir no estado global de psutil.cpu_percent().
+        now, cores = time.time(), psutil.cpu_times(percpu=True)
+        disks = {k: v for k, v in (psutil.disk_io_counters(perdisk=True) or {}).items() if not k.startswith(("loop", "ram"))}
+        nics = {k: v for k, v in (psutil.net_io_counters(pernic=True) or {}).items() if k != "lo" and not k.startswith(VIRTUAL_NICS)}
+        prev, self._prev = self._prev, (now, cores, disks, nics)
+        if prev is None or now <= prev[0] or len(prev[1]) != len(cores): return None
+        layout = {"ncpu": len(cores), "disks": sorted(disks), "nics": sorted(nics), "top": self.top_n}
+        if layout != self.layout: self._rotate(layout, now)
+        rec, dt = np.zeros((), self.dtype), now - prev[0]
+        rec["ts"] = now; rec["cores"] = [self._cpu_percent(a, b) for a, b in zip(prev[1], cores)]; rec["cpu"] = rec["cores"].mean() if len(cores) else 0.0
+        rec["mem"], rec["swap"] = psutil.virtual_memory().percent, psutil.swap_memory().percent
+        for i, name in enumerate(layout["disks"]):
+            if name in prev[2]: rec["disk_read"][i], rec["disk_write"][i] = (disks[name].read_bytes - prev[2][name].read_bytes) / dt, (disks[name].write_bytes - prev[2][name].write_bytes) / dt
+        for i, name in enumerate(layout["nics"]):
+            if name in prev[3]: rec["net_rx"][i], rec["net_tx"][i] = (nics[name].bytes_recv - prev[3][name].bytes_recv) / dt, (nics[name].bytes_sent - prev[3][name].bytes_sent) / dt
+        procs = self.top_source() if self.top_source else None
+        for i, p in enumerate(sorted(procs or (), key=lambda p: p.cpu, reverse=True)[:self.top_n]):
+            rec["top_pid"][i], rec["top_cpu"][i], rec["top_rss"][i], rec["top_name"][i] = p.pid, p.cpu, p.memory, p.name.encode(errors='replace')[:16]
+        return rec
+
+    def _writer(self, resolution, ts):
+        writer = self.writers.get(resolution)
+        if writer and writer.size + self.dtype.itemsize > self.segment_bytes: writer.close(); writer = None
+        if writer is None:
+            os.makedirs(self.directory, exist_ok=True); writer = self.writers[resolution] = SegmentWriter(self.directory, resolution, self.layout, ts)
+            expire = time.time() - float(self.retention_days[resolution]) * 86400
+            for old in TimeSeriesStore(self.directory).segments(resolution)[:-1]:
+                try:
+                    if os.path.getmtime(old) < expire: os.remove(old)
+                except OSError: pass
+        return writer
+
+    def _rollup(self, records, seconds):
+        rec = np.zeros((), self.dtype); stacked = np.stack(records)
+        for name in self.dtype.names:
+            rec[name] = stacked[-1][name] if name.startswith("top_") else stacked[name].mean(axis=0)
+        rec["ts"] = records[0]["ts"] // seconds * seconds; return rec
+
+    def _feed(self, rec, level=1):
+        # Acumula o registro no nível `level` (1 min, 1 h) e grava o consolidado quando o intervalo vira.
+        if level >= len(ROLLUPS): return
+        resolution, seconds = ROLLUPS[level]; pending = self.pending[resolution]
+        if pending and rec["ts"] // seconds != pending[0]["ts"] // seconds: self._flush(level)
+        pending.append(rec)
+
+    def _flush(self, level):
+        resolution, seconds = ROLLUPS[level]; pending = self.pending[resolution]
+        if not pending: return
+        rolled = self._rollup(pending, seconds); pending.clear()
+        self._writer(resolution, rolled["ts"]).write(rolled); self._feed(rolled, level + 1)
+
+    def _rotate(self, layout, now):
+        # Mudou o conjunto de núcleos, discos ou interfaces: fecha os segmentos e começa outros com o layout novo.
+        for level in range(1, len(ROLLUPS)): self._flush(level)
+        for writer in self.writers.values(): writer.close()
+        self.writers.clear(); self.layout, self.dtype = layout, record_dtype(layout)
+
+    def collect(self):
+        rec = self.sample()
+        if rec is None: return self.UNCHANGED
+        writer = self._writer("1s", float(rec["ts"])); writer.write(rec); self._feed(rec); self.count += 1
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            for w in self.writers.values(): w.sync()
+            self._last_sync = time.monotonic()
+        return {"records": self.count, "segment": writer.path}
+
+    def close(self):
+        try:
+            for level in range(1, len(ROLLUPS)): self._flush(level)
+        except (OSError, ValueError): pass
+        for writer in self.writers.values():
+            try: writer.close()
+            except (OSError, ValueError): pass
+        self.writers.clear()
+
+# ===================================================================
+# MODO HEADLESS (daemon, linhas JSON e endpoint HTTP local)
+# ===================================================================
+# Os mesmos coletores da interface, sem Tk: cada fonte tem um construtor e um decodificador do seu JSON,
+# usado quando a interface se conecta a um daemon já em execução (--attach).
+def _decode_network(data):
+    return {**data, "connections": tuple(map(tuple, data["connections"])), "by_state": tuple(map(tuple, data["by_state"])), "by_host": tuple(map(tuple, data["by_host"]))}
+
+SOURCES = {
+    "processes": (lambda s, on_demand: ProcessCollector(float(s['process_interval']), int(s['process_history'])), lambda d: ProcessTable(ProcessInfo(*p) for p in d)),
+    "performance": (lambda s, on_demand: PerformanceCollector(float(s['perf_interval'])), lambda d: d),
+    "network": (lambda s, on_demand: NetworkCollector(None if on_demand else s['refresh_intervals']['net']), _decode_network),
+    "disks": (lambda s, on_demand: DiskCollector(None if on_demand else s['refresh_intervals']['disk'], float(s['disk_timeout'])),
+              lambda d: {"mounts": tuple(DiskInfo(*x) for x in d["mounts"]), "io": tuple(DiskIO(*x) for x in d["io"])}),
+    "sensors": (lambda s, on_demand: SensorCollector(None if on_demand else s['refresh_intervals']['hw']), lambda d: tuple(SensorReading(*x) for x in d)),
+}
+
+def create_collectors(settings, names=None, on_demand=False, attach=None):
+    names = names or list(SOURCES)
+    if attach: return {name: RemoteCollector(attach, name, SOURCES[name][1]) for name in names}
+    return {name: SOURCES[name][0](settings, on_demand) for name in names}
+
+class RemoteCollector(Collector):
+    # Lê snapshots de um daemon Cortex via HTTP; wake() pede ao daemon uma coleta imediata na próxima consulta.
+    def __init__(self, url, name, decode, interval=1.0):
+        super().__init__(f"remoto-{name}", interval); self.url, self.source, self.decode = url.rstrip('/'), name, decode; self._remote_seq, self._want = None, False
+
+    def wake(self): self._want = True; super().wake()
+
+    def collect(self):
+        query = "?wake=1" if self._want else ""; self._want = False
+        with urllib.request.urlopen(f"{self.url}/{self.source}{query}", timeout=5) as response: body = json.load(response)
+        if body["seq"] == self._remote_seq or body["data"] is None: return self.UNCHANGED
+        self._remote_seq = body["seq"]; return self.decode(body["data"])
+
+class CollectorHTTPHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path); name, sources = url.path.strip('/'), self.server.collectors
+        if not name: body = {"sources": list(sources)}
+        elif name == "_self": body = INSTRUMENTS.snapshot()
+        elif name in sources:
+            if "wake" in urllib.parse.parse_qs(url.query): sources[name].wake()
+            snap = sources[name].latest(); body = {"seq": snap.seq, "timestamp": snap.timestamp, "data": snap.data, "error": sources[name].error}
+        else: self.send_error(404, "Fonte desconhecida"); return
+        payload = json.dumps(body, separators=(',', ':')).encode()
+        self.send_response(200); self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(payload))); self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args): pass
+
+class HeadlessDaemon:
+    def __init__(self, settings, names=None, output=None, listen=None, record=None):
+        self.collectors = create_collectors(settings, names); self.output, self.listen, self.server, self.recorder = output, listen, None, None
+        self._seqs = {name: 0 for name in self.collectors}
+        if record:
+            cfg, procs = settings['recorder'], self.collectors.get("processes")
+            self.recorder = TimeSeriesRecorder(record, procs and (lambda: procs.latest().data), int(cfg['top_n']), float(cfg['fsync_interval']), int(cfg['segment_mb']) * 1024**2, cfg['retention_days'])
+
+    def start(self):
+        for collector in self.collectors.values(): collector.start()
+        if self.recorder: self.recorder.start()
+        if self.listen:
+            host, _, port = self.listen.rpartition(':')
+            self.server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), CollectorHTTPHandler); self.server.collectors = self.collectors
+            threading.Thread(target=self.server.serve_forever, name="cortex-http", daemon=True).start()
+
+    def write_new_samples(self):
+        for name, collector in self.collectors.items():
+            snap = collector.latest()
+            if snap.seq == self._seqs[name]: continue
+            self._seqs[name] = snap.seq
+            self.output.write(json.dumps({"source": name, "seq": snap.seq, "timestamp": snap.timestamp, "data": snap.data}, separators=(',', ':')) + "\n")
+        self.output.flush()
+
+    def run(self):
+        self.start()
+        try:
+            while True:
+                if self.output: self.write_new_samples()
+                time.sleep(0.25)
+        except KeyboardInterrupt: pass
+        finally:
+            for collector in self.collectors.values(): collector.stop()
+            if self.recorder: self.recorder.stop(); self.recorder.join(timeout=5)
+            if self.server: self.server.shutdown()
+
+# ===================================================================
+# AGENTE E FROTA (--agent e aba Frota)
+# ===================================================================
+# Uma conexão TCP persistente por host, uma mensagem JSON por linha: o cliente manda {"op": "hello"} e depois
+# {"op": "poll"} a cada ciclo; o agente responde só com as fontes que mudaram desde o que já entregou naquela conexão,
+# codificadas como delta do valor anterior. Cada conexão guarda a sua própria base, então clientes não interferem entre si.
+AGENT_PROTOCOL = 1
+AGENT_READ_LIMIT = 256 * 1024**2  # respostas: a inicial, com dezenas de milhares de conexões, passa de 64 KiB (padrão do asyncio)
+AGENT_REQUEST_LIMIT = 4096  # pedidos são pequenos; um par ainda não autenticado não faz o agente acumular mais que isso
+
+def _is_rows(value): return isinstance(value, (list, tuple)) and len(value) > 0 and isinstance(value[0], (list, tuple))
+
+def delta_encode(prev, cur):
+    # None: sem mudança. {"=": v}: valor inteiro. {"~": {chave: delta}, "-": [chaves]}: dicionário, recursivo.
+    # {"k": [linhas], "-": [chaves]}: lista de linhas cujo 1º campo é único (PID, dispositivo, instante), só as novas/alteradas;
+    # o receptor mantém a ordem antiga e anexa as novas, e "o" (a ordem completa das chaves) só vem quando isso não basta.
+    # {"+": [linhas], "-": [linhas]}: demais listas de linhas, como multiconjunto (conexões); a ordem no receptor pode diferir.
+    if prev == cur: return None
+    if isinstance(prev, dict) and isinstance(cur, dict):
+        changed = {}
+        for key, value in cur.items():
+            delta = delta_encode(prev[key], value) if key in prev else {"=": value}
+            if delta is not None: changed[key] = delta
+        return {"~": changed, "-": [key for key in prev if key not in cur]}
+    if _is_rows(prev) and _is_rows(cur):
+        old, new = {row[0]: row for row in prev}, {row[0]: row for row in cur}
+        if len(old) == len(prev) and len(new) == len(cur):
+            delta = {"k": [row for key, row in new.items() if old.get(key) != row], "-": [key for key in old if key not in new]}
+            if [key for key in old if key in new] + [key for key in new if key not in old] != list(new): delta["o"] = list(new)
+            return delta
+        old, new = Counter(map(tuple, prev)), Counter(map(tuple, cur))
+        return {"+": list((new - old).elements()), "-": list((old - new).elements())}
+    return {"=": cur}
+
+def delta_apply(prev, delta):
+    if "=" in delta: return delta["="]
+    if "~" in delta:
+        removed = set(delta["-"]); out = {key: value for key, value in prev.items() if key not in removed}
+        for key, d in delta["~"].items(): out[key] = delta_apply(out.get(key), d)
+        return out
+    if "k" in delta:
+        removed = set(delta["-"]); rows = {row[0]: row for row in prev if row[0] not in removed}
+        for row in delta["k"]: rows[row[0]] = row
+        return [rows[key] for key in delta["o"]] if "o" in delta else list(rows.values())
+    removed, rows = Counter(map(tuple, delta["-"])), []
+    for row in prev:
+        key = tuple(row)
+        if removed[key]: removed[key] -= 1
+        else: rows.append(row)
+    return rows + delta["+"]
+
+class AgentServer:
+    # Os coletores do modo headless atrás de um servidor asyncio. Além das fontes, "series" guarda as últimas amostras
+    # de CPU/memória/swap (uma linha por instante), para o cliente não perder pontos entre um poll e outro.
+    def __init__(self, settings, listen, names=None):
+        self.collectors = create_collectors(settings, names); self.listen, self.host = listen, socket.gethostname()
+        self.token = settings['agent']['token'].encode(); self.series, self.series_seq, self._perf_seq = deque(maxlen=int(settings['agent']['series_points'])), 0, 0
+
+    def sources(self):
+        snaps = {name: collector.latest() for name, collector in self.collectors.items()}
+        if "performance" in self.collectors: snaps["series"] = Snapshot(self.series_seq, 0.0, tuple(self.series))
+        return snaps
+
+    def encode(self, sent):
+        # Roda fora do laço de eventos (asyncio.to_thread); "sent" é a base da conexão: fonte -> (seq, dados já entregues).
+        data = {}
+        for name, snap in self.sources().items():
+            if snap.data is None or snap.seq == sent.get(name, (None,))[0]: continue
+            delta = delta_encode(sent[name][1], snap.data) if name in sent else {"=": snap.data}
+            sent[name] = (snap.seq, snap.data)
+            if delta is not None: data[name] = delta
+        return {"t": time.time(), "d": data}
+
+    async def sample_series(self):
+        perf = self.collectors.get("performance")
+        while perf:
+            snap = perf.latest()
+            if snap.seq != self._perf_seq and snap.data is not None:
+                self._perf_seq = snap.seq; self.series.append((round(snap.timestamp, 3), snap.data["cpu"], snap.data["mem"], snap.data["swap"])); self.series_seq += 1
+            await asyncio.sleep(0.25)
+
+    async def handle(self, reader, writer):
+        sent, hello = {}, False
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                if not isinstance(request, dict): raise ValueError("pedido não é um objeto JSON")
+                op = request.get("op")
+                if op == "hello":
+                    hello = not self.token or hmac.compare_digest(str(request.get("token", "")).encode(), self.token)
+                    reply = {"host": self.host, "protocol": AGENT_PROTOCOL, "sources": list(self.sources())} if hello else {"error": "token inválido"}
+                elif op == "poll" and hello: reply = await asyncio.to_thread(self.encode, sent)
+                else: reply = {"error": "envie hello primeiro" if op == "poll" else f"operação desconhecida: {op}"}
+                writer.write(json.dumps(reply, separators=(',', ':')).encode() + b"\n"); await writer.drain()
+                if "error" in reply: break
+        except (ConnectionError, ValueError): pass
+        finally: writer.close()
+
+    async def serve(self):
+        host, _, port = self.listen.rpartition(':')
+        server = await asyncio.start_server(self.handle, host or "127.0.0.1", int(port), limit=AGENT_REQUEST_LIMIT)
+        async with server: await asyncio.gather(server.serve_forever(), self.sample_series())
+
+    def run(self):
+        for collector in self.collectors.values(): collector.start()
+        try: asyncio.run(self.serve())
+        except KeyboardInterrupt: pass
+        finally:
+            for collector in self.collectors.values(): collector.stop()
+
+FleetHost = namedtuple('FleetHost', 'address name status latency updated cpu mem swap cpu_history processes disk connections top')
+FLEET_TOP_FIELDS = ("pid", "name", "user", "cpu", "memory", "disk_read", "disk_write")
+FLEET_TOP_KEYS = {"CPU": "cpu", "Memória": "memory", "Leitura": "disk_read", "Escrita": "disk_write"}
+
+class FleetPoller(Collector):
+    # Consulta os agentes em paralelo num laço asyncio próprio. Cada host tem uma conexão persistente e só pede o próximo
+    # delta depois de receber o anterior: um host lento atrasa só a si mesmo, aparece como "lento" (com os últimos dados)
+    # depois de "timeout" s e, se passar de stall_timeout sem responder, a conexão é refeita com espera exponencial.
+    def __init__(self, hosts=(), interval=2.0, timeout=3.0, top_n=50, token=""):
+        super().__init__("frota", interval)
+        self.hosts, self.timeout, self.stall_timeout, self.top_n, self.token = list(hosts), timeout, max(10.0, 4 * timeout), top_n, token
+        self.state, self.tasks, self.loop, self._dirty = {}, {}, None, False
+
+    def set_hosts(self, hosts):
+        self.hosts = list(hosts)
+        if self.loop: self.loop.call_soon_threadsafe(self._sync_hosts)
+
+    def run(self):
+        try: asyncio.run(self.main())
+        except Exception as e: self.error = f"{type(e).__name__}: {e}"; traceback.print_exc()
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop(); self._sync_hosts()
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            for st in self.state.values():
+                if st["pending"] and now - st["pending"] > self.timeout and not st["status"].startswith("offline"):
+                    status = f"lento ({now - st['pending']:.0f} s)"
+                    if status != st["status"]: st["status"] = status; self._dirty = True
+            if self._dirty: self.publish()
+            await asyncio.sleep(0.25)
+        for task in self.tasks.values(): task.cancel()
+
+    def _sync_hosts(self):
+        for address in [a for a in self.tasks if a not in self.hosts]: self.tasks.pop(address).cancel(); self.state.pop(address, None)
+        for address in self.hosts:
+            if address not in self.tasks:
+                self.state[address] = {"name": address, "status": "conectando", "pending": None, "latency": None, "updated": None, "data": {}, "summary": None}
+                self.tasks[address] = self.loop.create_task(self.poll_host(address))
+        self._dirty = True
+
+    async def request(self, reader, writer, message):
+        writer.write(json.dumps(message).encode() + b"\n"); await writer.drain()
+        line = await reader.readline()
+        if not line: raise ConnectionError("conexão encerrada pelo agente")
+        reply = json.loads(line)
+        if "error" in reply: raise ConnectionError(reply["error"])
+        return reply
+
+    async def poll_host(self, address):
+        st, backoff = self.state[address], 1.0
+        while True:
+            try:
+                host, _, port = address.rpartition(':')
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host or "127.0.0.1", int(port), limit=AGENT_READ_LIMIT), self.timeout)
+                try:
+                    hello = await asyncio.wait_for(self.request(reader, writer, {"op": "hello", "token": self.token, "protocol": AGENT_PROTOCOL}), self.timeout)
+                    if hello.get("protocol") != AGENT_PROTOCOL: raise ConnectionError(f"protocolo {hello.get('protocol')} não suportado")
+                    st["name"], st["data"] = hello["host"], {}
+                    while True:
+                        started = st["pending"] = time.monotonic()
+                        reply = await asyncio.wait_for(self.request(reader, writer, {"op": "poll"}), self.stall_timeout)
+                        for name, delta in reply["d"].items(): st["data"][name] = delta_apply(st["data"].get(name), delta)
+                        st.update(pending=None, latency=time.monotonic() - started, updated=reply["t"], status="ok"); st["summary"] = self.summarize(address, st)
+                        self._dirty, backoff = True, 1.0
+                        await asyncio.sleep(max(0.0, self.interval - st["latency"]))
+                finally: writer.close()
+            except (OSError, EOFError, ValueError, KeyError, TypeError, asyncio.TimeoutError) as e:
+                st.update(pending=None, status=f"offline: {str(e) or type(e).__name__}"); st["summary"] = self.summarize(address, st); self._dirty = True
+                await asyncio.sleep(backoff); backoff = min(backoff * 2, 30.0)
+
+    def summarize(self, address, st):
+        # Resumo por host e, por chave ordenável, os top_n processos dele: o top-N da frota é o top-N da união desses.
+        data = st["data"]; procs, perf, series = data.get("processes") or [], data.get("performance") or {}, data.get("series") or []
+        mounts = [d[6] for d in (data.get("disks") or {}).get("mounts", []) if d[6] is not None]; index = [ProcessInfo._fields.index(f) for f in FLEET_TOP_FIELDS]
+        top = {key: [tuple(row[i] for i in index) for row in heapq.nlargest(self.top_n, procs, key=lambda row, i=ProcessInfo._fields.index(key): row[i] or 0)]
+               for key in FLEET_TOP_KEYS.values()}
+        return FleetHost(address, st["name"], st["status"], st["latency"], st["updated"], perf.get("cpu"), perf.get("mem"), perf.get("swap"),
+                         np.array([s[1] for s in series], dtype=np.float64), len(procs), max(mounts, default=None), (data.get("network") or {}).get("total"), top)
+
+    def publish(self):
+        self._dirty = False
+        hosts = tuple((st["summary"] or FleetHost(address, st["name"], st["status"], None, None, None, None, None, np.zeros(0), 0, None, None, {})) for address, st in self.state.items())
+        self._latest = Snapshot(self._latest.seq + 1, time.time(), tuple(h._replace(status=self.state[h.address]["status"]) for h in hosts))
+
+def merge_fleet_top(hosts, key, n):
+    # Top-N da frota por uma das chaves de FLEET_TOP_KEYS; hosts offline ficam de fora (seus dados estão velhos).
+    col = FLEET_TOP_FIELDS.index(key)
+    return heapq.nlargest(n, ((h, row) for h in hosts if not h.status.startswith("offline") for row in h.top.get(key, ())), key=lambda item: item[1][col] or 0)
+
+# ===================================================================
+# CLASSES DAS JANELAS AUXILIARES
+# ===================================================================
+class JobsWindow(Toplevel):
+    # Painel não modal com as tarefas em execução e concluídas; fechar só esconde o painel, as tarefas continuam.
+    TICK_MS = 100
+
+    def __init__(self, parent, manager, scrollback=5000):
+        super().__init__(parent); self.title("Tarefas"); self.geometry("900x500"); self.manager, self.scrollback, self.shown, self.ticking = manager, scrollback, None, False
+        panes = ttk.PanedWindow(self, orient=tk.HORIZONTAL); panes.pack(expand=True, fill='both', padx=5, pady=5)
+        left = ttk.Frame(panes); columns = ("id", "command", "state", "time")
+        self.tree = ttk.Treeview(left, columns=columns, show="headings", selectmode="browse")
+        for col, text, width in zip(columns, ("#", "Comando", "Estado", "Tempo"), (40, 200, 90, 60)): self.tree.heading(col, text=text); self.tree.column(col, width=width)
+        self.tree.pack(expand=True, fill='both'); self.tree.bind("<<TreeviewSelect>>", lambda e: self.show_selected()); self.rows = TreeReconciler(self.tree)
+        buttons = ttk.Frame(left); buttons.pack(fill='x', pady=(5, 0))
+        ttk.Button(buttons, text="Cancelar", command=lambda: self.shown and self.shown.cancel()).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Matar", command=lambda: self.shown and self.shown.kill()).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Limpar Concluídas", command=self.clear_finished).pack(side=tk.LEFT); panes.add(left, weight=1)
+        right = ttk.Frame(panes)
+        self.text_area = scrolledtext.ScrolledText(right, wrap=tk.WORD, font=("Courier", 9), background="#1C1C1C", foreground="#FFFFFF", state='disabled'); self.text_area.pack(expand=True, fill='both')
+        self.log_label = ttk.Label(right, text=""); self.log_label.pack(fill='x'); panes.add(right, weight=3)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+    def select(self, job):
+        self.deiconify(); self.lift(); self.refresh(); self.ensure_ticking()
+        if self.tree.exists(job.id): self.tree.selection_set(job.id)
+        self.show_selected()
+
+    def show_selected(self):
+        items = self.tree.selection(); job = next((j for j in self.manager.jobs if str(j.id) in items), None)
+        if job is None or job is self.shown: return
+        self.shown = job; job.drain(); self.log_label.config(text=f"Log completo: {job.log_path}")
+        self.text_area.config(state='normal'); self.text_area.delete(1.0, tk.END); self.text_area.insert(tk.END, "\n".join([*job.lines, job.partial])); self.text_area.see(tk.END); self.text_area.config(state='disabled')
+
+    def ensure_ticking(self):
+        if not self.ticking: self.ticking = True; self.after(self.TICK_MS, self.tick)
+
+    def tick(self):
+        self.ticking = False
+        if self.refresh() and any(job.is_alive() or job.on_done for job in self.manager.jobs): self.ensure_ticking()
+
+    def refresh(self):
+        # Drena todas as tarefas; só a exibida vai para a tela, num único insert seguido do corte das linhas mais antigas.
+        try:
+            text = ""
+            for job in self.manager.jobs:
+                chunk = job.drain()
+                if job is self.shown: text += chunk
+                if not job.is_alive() and job.finished and job.on_done: callback, job.on_done = job.on_done, None; callback(job)
+            if text:
+                area = self.text_area; at_end = area.yview()[1] >= 0.999; area.config(state='normal'); area.insert(tk.END, text)
+                excess = int(area.index('end-1c').split('.')[0]) - self.scrollback
+                if excess > 0: area.delete(1.0, f"{excess + 1}.0")
+                if at_end: area.see(tk.END)
+                area.config(state='disabled')
+            now = time.time()
+            self.rows.reconcile((job.id, (job.id, ' '.join(job.command), job.state, f"{(job.finished or now) - job.started:.0f} s")) for job in reversed(self.manager.jobs))
+        except tk.TclError: return False
+        return True
+
+    def clear_finished(self):
+        self.manager.clear_finished()
+        if self.shown not in self.manager.jobs: self.shown = None; self.text_area.config(state='normal'); self.text_area.delete(1.0, tk.END); self.text_area.config(state='disabled')
+        self.refresh()
+
+class SelfMonitorWindow(Toplevel):
+    # Painel não modal do custo do próprio Cortex: CPU e RSS do processo e por thread, e latência por etapa instrumentada.
+    REFRESH_MS = 1000
+
+    def __init__(self, parent):
+        super().__init__(parent); self.title("Cortex — Automonitoramento"); self.geometry("1100x650"); self.prev, self.ticking, self.spans = None, False, {}
+        self.summary = ttk.Label(self, text="", font=("Courier", 9)); self.summary.pack(fill='x', padx=5, pady=(5, 0))
+        buttons = ttk.Frame(self); buttons.pack(fill='x', padx=5, pady=5)
+        ttk.Button(buttons, text="Salvar JSON", command=self.save_json).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Zerar Etapas", command=lambda: (INSTRUMENTS.reset(), self.refresh(reschedule=False))).pack(side=tk.LEFT, padx=5)
+        ttk.Label(buttons, text="Ticks:").pack(side=tk.RIGHT); self.ticks_var = tk.IntVar(value=int(parent.settings['instrumentation']['profile_ticks']))
+        ttk.Button(buttons, text="Perfilar (cProfile)", command=lambda: parent.profile_ticks(self.ticks_var.get())).pack(side=tk.RIGHT, padx=5)
+        ttk.Spinbox(buttons, from_=1, to=10000, textvariable=self.ticks_var, width=6).pack(side=tk.RIGHT)
+        panes = ttk.PanedWindow(self, orient=tk.VERTICAL); panes.pack(expand=True, fill='both', padx=5, pady=(0, 5))
+        columns = ("step", "calls", "mean", "p50", "p99", "max", "proc", "subprocess", "tk")
+        self.tree = ttk.Treeview(panes, columns=columns, show="headings", selectmode="browse")
+        for col, text, width in zip(columns, ("Etapa", "Chamadas", "Média", "p50", "p99", "Máx.", "/proc por chamada", "Subproc. por chamada", "Tk por chamada"), (300, 70, 80, 80, 80, 80, 110, 120, 100)):
+            self.tree.heading(col, text=text); self.tree.column(col, width=width, anchor='w' if col == "step" else 'e')
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self.show_histogram()); self.rows = TreeReconciler(self.tree); panes.add(self.tree, weight=3)
+        bottom = ttk.PanedWindow(panes, orient=tk.HORIZONTAL)
+        self.tree_threads = ttk.Treeview(bottom, columns=("thread", "cpu", "total"), show="headings")
+        for col, text, width in (("thread", "Thread", 180), ("cpu", "CPU", 70), ("total", "CPU total", 90)): self.tree_threads.heading(col, text=text); self.tree_threads.column(col, width=width, anchor='w' if col == "thread" else 'e')
+        self.thread_rows = TreeReconciler(self.tree_threads); bottom.add(self.tree_threads, weight=1)
+        self.text = scrolledtext.ScrolledText(bottom, wrap=tk.NONE, font=("Courier", 9), height=12, state='disabled'); bottom.add(self.text, weight=2); panes.add(bottom, weight=2)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+    def ensure_ticking(self):
+        if not self.ticking: self.ticking = True; self.refresh()
+
+    def refresh(self, reschedule=True):
+        if reschedule:
+            if self.state() == 'withdrawn': self.ticking = False; return
+            self.after(self.REFRESH_MS, self.refresh)
+        with INSTRUMENTS.span("SelfMonitorWindow.refresh"):
+            try: snap = INSTRUMENTS.snapshot()
+            except psutil.Error: return
+            proc, now, prev = snap["process"], time.monotonic(), self.prev; cpu = proc["cpu_user_s"] + proc["cpu_system_s"]; totals = snap["totals"]
+            threads = {t["tid"]: t["user_s"] + t["system_s"] for t in proc["threads"]}
+            if prev:
+                dt = max(1e-9, now - prev["time"]); ticks = max(1, snap["ticks"] - prev["ticks"])
+                rates = f"CPU: {(cpu - prev['cpu']) / dt * 100:5.1f}% (média {proc['cpu_percent_avg']:.1f}%)  /proc: {(totals['proc'] - prev['totals']['proc']) / dt:.0f}/s  " \
+                        f"subprocessos: {(totals['subprocess'] - prev['totals']['subprocess']) / dt:.1f}/s  Tk: {(totals['tk'] - prev['totals']['tk']) / ticks:.0f}/tick"
+            else: dt, rates = None, f"CPU média: {proc['cpu_percent_avg']:.1f}%"
+            self.summary.config(text=f"{rates}  RSS: {proc['rss_bytes'] / 1024**2:.1f} MB  threads: {len(threads)}  ticks: {snap['ticks']}")
+            self.rows.reconcile((name, (name, e["calls"], format_latency(e["mean_s"]), f"≤ {format_latency(e['p50_s'])}", f"≤ {format_latency(e['p99_s'])}", format_latency(e["max_s"]),
+                                        f"{e['proc_per_call']:.1f}", f"{e['subprocess_per_call']:.2f}", f"{e['tk_per_call']:.1f}"))
+                                for name, e in sorted(snap["spans"].items(), key=lambda item: item[1]["total_s"], reverse=True))
+            rows = []
+            for t in proc["threads"]:
+                total = threads[t["tid"]]; used = (total - prev["threads"].get(t["tid"], total)) / dt * 100 if dt else 0.0
+                rows.append((used, total, t["tid"], (t["name"], f"{used:.1f}%", f"{total:.1f} s")))
+            self.thread_rows.reconcile((tid, values) for _, _, tid, values in sorted(rows, reverse=True))
+            self.prev, self.spans = {"time": now, "cpu": cpu, "totals": totals, "ticks": snap["ticks"], "threads": threads}, snap["spans"]
+            if self.tree.selection(): self.show_histogram()
+
+    def show_text(self, text):
+        self.text.config(state='normal'); self.text.delete(1.0, tk.END); self.text.insert(tk.END, text); self.text.config(state='disabled')
+
+    def show_histogram(self):
+        items = self.tree.selection(); entry = self.spans.get(items[0]) if items else None
+        if entry: self.show_text(f"{items[0]} — {entry['calls']} chamadas, total {format_latency(entry['total_s'])}\n\n{format_histogram(np.array(entry['histogram_log2_us']))}")
+
+    def show_profile(self, path, text):
+        self.tree.selection_remove(*self.tree.selection()); self.show_text(f"Perfil salvo em: {path or '(não foi possível gravar)'}\n\n{text}")
+
+    def save_json(self):
+        try: messagebox.showinfo("Automonitoramento", f"Salvo em {INSTRUMENTS.dump()}", parent=self)
+        except (OSError, psutil.Error) as e: messagebox.showerror("Automonitoramento", f"Não foi possível salvar: {e}", parent=self)
 
 class SettingsWindow(Toplevel):
     def __init__(self, parent):
@@ -77,43 +1984,117 @@ class SettingsWindow(Toplevel):
 
     def save_and_apply(self): self.parent.settings['theme'] = self.theme_var.get(); save_settings(self.parent.settings); self.parent.apply_theme(); self.destroy()
 
+class ReplayWindow(Toplevel):
+    RANGES = {"Última hora": 3600, "Últimas 6 horas": 6 * 3600, "Último dia": 86400, "Última semana": 7 * 86400, "Último mês": 30 * 86400}
+
+    def __init__(self, parent):
+        super().__init__(parent); self.transient(parent); self.parent = parent; self.title("Reproduzir Gravação"); self.geometry("280x140"); self.resizable(False, False)
+        ttk.Label(self, text="Intervalo:").pack(pady=(10, 5))
+        self.range_var = tk.StringVar(value="Última hora")
+        ttk.Combobox(self, textvariable=self.range_var, values=list(self.RANGES), state="readonly").pack(pady=5, padx=10, fill='x')
+        ttk.Button(self, text="Carregar nos Gráficos", command=self.load).pack(pady=10)
+
+    def load(self): self.destroy(); self.parent.replay_recording(self.RANGES[self.range_var.get()])
+
 class OpenFilesWindow(Toplevel):
     def __init__(self, parent, pid):
-        super().__init__(parent); self.title(f"Arquivos Abertos - PID {pid}"); self.geometry("700x500")
-        tree_frame = ttk.Frame(self, padding=5); tree_frame.pack(expand=True, fill='both'); columns = ("path", "fd")
-        tree = ttk.Treeview(tree_frame, columns=columns, show="headings"); tree.heading("path", text="Caminho do Arquivo"); tree.heading("fd", text="File Descriptor")
-        tree.column("path", width=550); tree.column("fd", width=100, anchor='center')
+        super().__init__(parent); self.title(f"Arquivos Abertos - PID {pid}"); self.geometry("800x500"); self.pid = pid
+        tree_frame = ttk.Frame(self, padding=5); tree_frame.pack(expand=True, fill='both'); columns = ("fd", "kind", "path")
+        self.tree = tree = ttk.Treeview(tree_frame, columns=columns, show="headings"); tree.heading("fd", text="File Descriptor"); tree.heading("kind", text="Tipo"); tree.heading("path", text="Alvo")
+        tree.column("fd", width=100, anchor='center'); tree.column("kind", width=100, anchor='center'); tree.column("path", width=580)
         scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview); tree.configure(yscroll=scrollbar.set)
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.status = ttk.Label(self, text="Lendo descritores..."); self.status.pack(fill='x', padx=5, pady=(0, 5))
+        self.queue, self.counts = Queue(), {}; self.thread = threading.Thread(target=self.read_fds_thread, daemon=True); self.thread.start()
+        self.after(50, self.process_queue)
+
+    def read_fds_thread(self):
+        try:
+            for batch in iter_open_fds(self.pid): self.queue.put(batch)
+        except OSError as e: self.queue.put(e)
+
+    def process_queue(self):
+        # Um lote por callback, devolvendo o controle ao Tk entre lotes, para não travar a interface em processos com
+        # dezenas de milhares de descritores; com a fila vazia, volta a olhar em 50 ms.
         try:
-            p = psutil.Process(pid); files = p.open_files()
-            if not files: tree.insert("", "end", values=("Nenhum arquivo aberto por este processo.", ""))
-            for f in files: tree.insert("", "end", values=(f.path, f.fd))
-        except psutil.Error as e: tree.insert("", "end", values=(f"Erro ao acessar processo: {e}", ""))
+            if not self.queue.empty():
+                batch = self.queue.get_nowait()
+                if isinstance(batch, OSError): self.tree.insert("", "end", values=("", "", f"Erro ao acessar processo: {batch}"))
+                else:
+                    for fd, kind, target in batch: self.tree.insert("", "end", values=(fd, kind, target)); self.counts[kind] = self.counts.get(kind, 0) + 1
+                    self.status.config(text=f"Lendo descritores... {sum(self.counts.values())}")
+        except tk.TclError: return
+        alive = self.thread.is_alive()  # antes de olhar a fila: a thread pode enfileirar o último lote e terminar no meio
+        if not self.queue.empty(): self.after(1, self.process_queue); return
+        if alive: self.after(50, self.process_queue); return
+        if not self.counts and not self.tree.get_children(): self.tree.insert("", "end", values=("", "", "Nenhum arquivo aberto por este processo."))
+        self.status.config(text=f"{sum(self.counts.values())} descritores — " + ", ".join(f"{k}: {n}" for k, n in sorted(self.counts.items())))
 
 class StraceWindow(Toplevel):
     def __init__(self, parent, pid):
-        super().__init__(parent); self.title(f"Resumo strace - PID {pid}"); self.geometry("800x600")
-        text_area = scrolledtext.ScrolledText(self, wrap='word', font=("Courier", 9)); text_area.pack(expand=True, fill='both', padx=5, pady=5)
-        text_area.insert('1.0', f"Executando 'strace -c -f -p {pid}'... Por favor, aguarde até 10 segundos...\n\n"); self.update_idletasks()
+        super().__init__(parent); self.title(f"strace ao vivo - PID {pid}"); self.geometry("900x650"); self.pid, self.session = pid, None
+        top = ttk.Frame(self, padding=5); top.pack(fill='x')
+        ttk.Label(top, text="Duração (s, 0 = até parar):").pack(side=tk.LEFT); self.duration = tk.StringVar(value="10")
+        ttk.Spinbox(top, from_=0, to=3600, textvariable=self.duration, width=6).pack(side=tk.LEFT, padx=5)
+        self.start_button = ttk.Button(top, text="▶ Iniciar", command=self.start); self.start_button.pack(side=tk.LEFT, padx=5)
+        self.stop_button = ttk.Button(top, text="⏹ Desanexar", command=self.stop, state="disabled"); self.stop_button.pack(side=tk.LEFT)
+        self.status = ttk.Label(top, text="Parado"); self.status.pack(side=tk.RIGHT)
+        panes = ttk.PanedWindow(self, orient=tk.VERTICAL); panes.pack(expand=True, fill='both', padx=5, pady=5)
+        tree_frame = ttk.Frame(panes); columns = ("syscall", "calls", "errors", "total", "avg", "max")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col, text in zip(columns, ("Syscall", "Chamadas", "Erros", "Tempo Total", "Média", "Máximo")): self.tree.heading(col, text=text); self.tree.column(col, width=120, anchor=tk.E if col != "syscall" else tk.W)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview); self.tree.configure(yscroll=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scrollbar.pack(side=tk.RIGHT, fill=tk.Y); panes.add(tree_frame, weight=3)
+        self.rows = TreeReconciler(self.tree); self.tree.bind("<<TreeviewSelect>>", lambda e: self.refresh(False))
+        hist_frame = ttk.LabelFrame(panes, text="Latência (todas as syscalls; selecione uma linha para filtrar)", padding=5)
+        self.hist_text = tk.Text(hist_frame, height=12, wrap='none', font=("Courier", 9), state="disabled"); self.hist_text.pack(expand=True, fill='both'); panes.add(hist_frame, weight=2)
+        self.protocol("WM_DELETE_WINDOW", self.on_closing); self.start()
+
+    def start(self):
+        try: duration = float(self.duration.get())
+        except ValueError: messagebox.showerror("Duração inválida", "Informe a duração em segundos.", parent=self); return
+        self.session = StraceSession(self.pid, duration or None); self.session.start()
+        self.start_button.config(state="disabled"); self.stop_button.config(state="normal"); self.after(500, self.refresh)
+
+    def stop(self):
+        if self.session: self.session.detach()
+
+    def refresh(self, reschedule=True):
+        session = self.session
+        if session is None: return
         try:
-            cmd = ['strace', '-c', '-f', '-p', str(pid)]; result = subprocess.run(cmd, capture_output=True, text=True, timeout=10, check=True, stderr=subprocess.STDOUT)
-            text_area.insert('end', result.stdout)
-        except FileNotFoundError: text_area.insert('end', "ERRO: O comando 'strace' não foi encontrado.\nPor favor, instale-o com 'sudo apt install strace'.")
-        except subprocess.TimeoutExpired: text_area.insert('end', "ERRO: Timeout. O processo pode estar ocupado ou sem resposta.")
-        except subprocess.CalledProcessError as e: text_area.insert('end', f"ERRO ao executar strace.\n\nOutput:\n{e.stdout}")
+            rows, total, threads = session.stats.summary()
+            self.rows.reconcile((name, (name, calls, errors, format_latency(spent), format_latency(spent / calls), format_latency(peak))) for name, calls, errors, spent, peak in rows)
+            selected = self.tree.selection(); hist = session.stats.histogram(selected[0] if selected else None)
+            self.hist_text.config(state="normal"); self.hist_text.delete(1.0, tk.END); self.hist_text.insert(tk.END, format_histogram(hist)); self.hist_text.config(state="disabled")
+            running = session.is_alive()
+            if isinstance(session.error, FileNotFoundError): state = "ERRO: 'strace' não encontrado (sudo apt install strace)"
+            elif session.error: state = f"Erro: {session.error}"
+            elif running: state = f"Rastreando... {session.elapsed():.1f} s"
+            else: state = f"Concluído ({session.stats.messages[-1] if session.stats.messages else f'código {session.returncode}'})"
+            self.status.config(text=f"{state} — {total} chamadas, {threads or 1} thread(s)")
+            if not reschedule: return
+            if running: self.after(500, self.refresh)
+            else: self.start_button.config(state="normal"); self.stop_button.config(state="disabled")
+        except tk.TclError: pass
+
+    def on_closing(self): self.stop(); self.destroy()
 
 # ===================================================================
 # CLASSE PRINCIPAL DA APLICAÇÃO
 # ===================================================================
 class CortexEdition(tk.Tk):
-    def __init__(self):
+    def __init__(self, attach=None):
         super().__init__()
-        self.settings = load_settings()
-        self.last_io_times, self.last_io_counters, self.all_processes = {}, {}, []
-        self.details_text, self.hw_text_area, self.strace_text, self.credits_text_widget = None, None, None, None
+        self.settings, self.attach = load_settings(), attach
+        if self.settings['instrumentation']['enabled']: INSTRUMENTS.enable(); self.tk = TkCallCounter(self.tk, INSTRUMENTS.counters())
+        self.proc_table, self.proc_seq, self.proc_sort = ProcessTable(), 0, None
+        self.proc_order = self.proc_view = np.zeros(0, dtype=np.int64); self.proc_top, self.proc_visible_rows, self.selected_pid, self.proc_collapsed = 0, 50, None, set()
+        self.details_text, self.strace_text, self.credits_text_widget = None, None, None
+        self.self_monitor, self.jobs, self.jobs_window = None, JobManager(scrollback=int(self.settings['jobs']['scrollback_lines']), keep_logs=int(self.settings['jobs']['keep_logs'])), None
 
-        self.title("🧠 Cortex v1.0")
+        STARTUP.mark("Tk")
+        self.title(f"🧠 Cortex v1.0 — {attach}" if attach else "🧠 Cortex v1.0")
         self.geometry("1200x850")
         
         self.create_main_menu()
@@ -122,41 +2103,150 @@ class CortexEdition(tk.Tk):
         self.tabs = {
             "proc": ttk.Frame(self.notebook), "perf": ttk.Frame(self.notebook), "net": ttk.Frame(self.notebook),
             "svc": ttk.Frame(self.notebook), "hw": ttk.Frame(self.notebook), "pkg": ttk.Frame(self.notebook),
-            "disk": ttk.Frame(self.notebook), "credits": ttk.Frame(self.notebook)
+            "disk": ttk.Frame(self.notebook), "fleet": ttk.Frame(self.notebook), "credits": ttk.Frame(self.notebook)
         }
         self.notebook.add(self.tabs["proc"], text="Processos"); self.notebook.add(self.tabs["perf"], text="Desempenho")
         self.notebook.add(self.tabs["net"], text="Rede"); self.notebook.add(self.tabs["svc"], text="Serviços")
         self.notebook.add(self.tabs["hw"], text="Hardware"); self.notebook.add(self.tabs["pkg"], text="Pacotes (APT)")
-        self.notebook.add(self.tabs["disk"], text="Discos"); self.notebook.add(self.tabs["credits"], text="Créditos")
+        self.notebook.add(self.tabs["disk"], text="Discos"); self.notebook.add(self.tabs["fleet"], text="Frota")
+        self.notebook.add(self.tabs["credits"], text="Créditos")
         self.notebook.pack(expand=True, fill="both", padx=5, pady=5)
+        self.collector_status, self.collector_errors = ttk.Label(self, text="", anchor='w', foreground="#C00000"), ()  # só aparece quando algum coletor falha
         
-        self.create_all_tabs(); self.create_context_menu(); self.apply_theme()
-        self.start_updates()
+        # Cada aba é construída (e populada pela primeira vez) só quando é selecionada; antes do agendador, que a atualiza.
+        self.built_tabs, self.tab_builders = set(), {
+            "proc": self.create_process_tab, "perf": self.create_performance_tab, "net": self.create_network_tab, "svc": self.create_services_tab,
+            "hw": self.create_hardware_tab, "pkg": self.create_packages_tab, "disk": self.create_disks_tab, "fleet": self.create_fleet_tab, "credits": self.create_credits_tab}
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.ensure_tab(self.visible_tab()))
+        self.create_performance_buffers(); self.create_context_menu(); self.apply_theme(); STARTUP.mark("menu e abas vazias")
+        self.start_updates(); STARTUP.mark("coletores e agendador")
+        self.ensure_tab("proc"); STARTUP.mark("aba Processos")
+        if STARTUP.enabled: self.after(0, self.mark_first_paint)
+
+    def ensure_tab(self, tab):
+        if tab is None or tab in self.built_tabs: return
+        self.built_tabs.add(tab); self.tab_builders[tab](); self.color_text_widgets()
 
-    def create_all_tabs(self):
-        self.create_process_tab(); self.create_performance_tab(); self.create_network_tab()
-        self.create_services_tab(); self.create_hardware_tab(); self.create_packages_tab()
-        self.create_disks_tab(); self.create_credits_tab()
+    def mark_first_paint(self):
+        self.update_idletasks(); STARTUP.mark("primeira pintura")
+        if self.proc_seq: STARTUP.report()
         
     def start_updates(self):
-        self.populate_process_list(); self.update_performance_graphs(); self.populate_network_list()
-        self.populate_services_list(); self.update_hardware_sensors(); self.populate_packages_list()
-        self.populate_disks_list()
+        # Coletores locais (rede, discos e sensores sob demanda) ou, com --attach, leitores de um daemon em execução.
+        self.collectors = create_collectors(self.settings, on_demand=True, attach=self.attach)
+        for collector in self.collectors.values(): collector.start()
+        self.proc_collector, self.perf_collector, self.net_collector, self.disk_collector, self.sensor_collector = (self.collectors[n] for n in ("processes", "performance", "network", "disks", "sensors"))
+        # Pacotes e serviços da máquina local, carregados em segundo plano na primeira vez que a aba é aberta.
+        self.pkg_index = PackageIndex(); self.pkg_collector, self.svc_collector = PackageCollector(self.pkg_index), ServiceCollector(
+            bus=SystemdBus if self.settings['services']['dbus'] else None, poll_interval=float(self.settings['services']['poll_interval']))
+        self.pkg_collector.start()
+        if os.geteuid() == 0: self.svc_collector.start()  # sem root a aba só pede sudo; nem o barramento é aberto
+        # Agentes remotos da aba Frota; o laço asyncio só começa quando a aba conecta a algum host.
+        cfg = self.settings['fleet']; self.fleet_poller = FleetPoller(interval=float(cfg['interval']), timeout=float(cfg['timeout']), top_n=int(cfg['top_n']), token=cfg['token'])
+        self.watched = []; self.watch(self.perf_collector, None, self.sample_performance); self.watch(self.net_collector, "net", self.render_network)
+        self.watch(self.disk_collector, "disk", self.render_disks); self.watch(self.sensor_collector, None, self.render_sensors)
+        self.watch(self.pkg_collector, "pkg", self.render_packages); self.watch(self.svc_collector, "svc", self.render_services)
+        self.watch(self.fleet_poller, "fleet", self.render_fleet)
+        self.all_collectors = [*self.collectors.values(), self.pkg_collector, self.svc_collector, self.fleet_poller]
+        self.scheduler = RefreshScheduler(self, self.visible_tab); intervals, hidden = self.settings['refresh_intervals'], self.settings['hidden_refresh_intervals']
+        self.scheduler.register("collectors", self.poll_collectors, 0.25)
+        if self.settings['recorder']['enabled'] and not self.attach: self.start_recording()
+        for tab, func in [("proc", self.populate_process_list), ("perf", self.update_performance_graphs), ("net", self.populate_network_list), ("svc", self.populate_services_list),
+                          ("hw", self.update_hardware_sensors), ("pkg", self.populate_packages_list), ("disk", self.populate_disks_list)]:
+            self.scheduler.register(tab, func, intervals.get(tab), tab=tab, hidden_interval=hidden.get(tab))
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.scheduler.trigger_tab(self.visible_tab()), add='+'); self.scheduler.start()
+
+    def watch(self, collector, tab, render): self.watched.append([collector, tab, render, 0])
+
+    def poll_collectors(self):
+        # Coletores publicam em segundo plano; aqui só se aplica o snapshot novo (das abas visíveis, ou sempre se tab=None).
+        visible = self.visible_tab()
+        for entry in self.watched:
+            collector, tab, render, seq = entry; snap = collector.latest()
+            if snap.seq != seq and snap.data is not None and tab in (None, visible):
+                entry[3] = snap.seq
+                with INSTRUMENTS.span(render.__qualname__): render(snap.data)
+        errors = tuple(f"{c.name.removeprefix('cortex-')}: {c.error}" for c in self.all_collectors if c.error)
+        if errors != self.collector_errors:
+            self.collector_errors = errors
+            if errors: self.collector_status.config(text="Falha na coleta — " + " | ".join(errors)); self.collector_status.pack(side=tk.BOTTOM, fill='x', padx=5, before=self.notebook)
+            else: self.collector_status.pack_forget()
+
+    def visible_tab(self):
+        selected = self.notebook.select()
+        return next((key for key, frame in self.tabs.items() if str(frame) == selected), None)
 
     def create_main_menu(self):
         self.main_menu = tk.Menu(self); self.config(menu=self.main_menu)
         file_menu = tk.Menu(self.main_menu, tearoff=0); self.main_menu.add_cascade(label="Arquivo", menu=file_menu)
-        file_menu.add_command(label="Salvar Snapshot de Desempenho", command=self.log_performance_snapshot)
+        self.recording_var = tk.BooleanVar(value=False)
+        file_menu.add_checkbutton(label="Gravação Contínua de Desempenho", variable=self.recording_var, command=self.toggle_recording)
+        file_menu.add_command(label="Reproduzir Gravação...", command=lambda: ReplayWindow(self))
+        file_menu.add_command(label="Voltar ao Vivo", command=self.show_live_graphs); file_menu.add_separator()
+        file_menu.add_command(label="Tarefas...", command=self.show_jobs)
+        file_menu.add_command(label="Automonitoramento...", command=self.show_self_monitor)
+        file_menu.add_command(label="Perfilar Ticks (cProfile)...", command=self.ask_profile_ticks); file_menu.add_separator()
         file_menu.add_command(label="Configurações...", command=lambda: SettingsWindow(self))
         file_menu.add_separator(); file_menu.add_command(label="Sair", command=self.quit)
         
-    def log_performance_snapshot(self):
-        try:
-            with open("cortex_performance_log.csv", "a") as f:
-                if f.tell() == 0: f.write("timestamp,cpu_percent,memory_percent\n")
-                ts, cpu, mem = time.strftime("%Y-%m-%d %H:%M:%S"), psutil.cpu_percent(interval=None), psutil.virtual_memory().percent
-                f.write(f"{ts},{cpu},{mem}\n"); messagebox.showinfo("Log Salvo", "Snapshot salvo em 'cortex_performance_log.csv'.")
-        except IOError as e: messagebox.showerror("Erro de Log", f"Não foi possível escrever no arquivo: {e}")
+    def show_jobs(self):
+        if self.jobs_window is None: self.jobs_window = JobsWindow(self, self.jobs, int(self.settings['jobs']['scrollback_lines']))
+        self.jobs_window.deiconify(); self.jobs_window.lift(); return self.jobs_window
+
+    def show_self_monitor(self):
+        if self.self_monitor is None: self.self_monitor = SelfMonitorWindow(self)
+        self.self_monitor.deiconify(); self.self_monitor.lift(); self.self_monitor.ensure_ticking(); return self.self_monitor
+
+    def ask_profile_ticks(self):
+        ticks = simpledialog.askinteger("Perfilar", "Capturar quantos ticks do agendador com cProfile?", parent=self, minvalue=1, maxvalue=10000,
+                                        initialvalue=int(self.settings['instrumentation']['profile_ticks']))
+        if ticks: self.profile_ticks(ticks)
+
+    def profile_ticks(self, ticks):
+        try: started = INSTRUMENTS.profile(ticks, lambda path, text: self.show_self_monitor().show_profile(path, text))
+        except ValueError as e: messagebox.showerror("Perfilar", f"Não foi possível iniciar o cProfile: {e}"); return
+        if not started: messagebox.showinfo("Perfilar", "Já há uma captura em andamento.")
+        else: self.show_self_monitor().show_text(f"Capturando {ticks} ticks com cProfile...")
+
+    def run_job(self, command, on_done=None):
+        job = self.jobs.start(command, on_done); self.show_jobs().select(job); return job
+
+    def start_recording(self):
+        cfg = self.settings['recorder']
+        self.recorder = TimeSeriesRecorder(cfg['dir'], lambda: self.proc_collector.latest().data, int(cfg['top_n']), float(cfg['fsync_interval']), int(cfg['segment_mb']) * 1024**2, cfg['retention_days'])
+        self.recorder.start(); self.recording_var.set(True)
+
+    def toggle_recording(self):
+        if self.attach: messagebox.showwarning("Gravação", "Use 'cortex.py --headless --record' no daemon para gravar."); self.recording_var.set(False); return
+        if self.recording_var.get(): self.start_recording()
+        elif getattr(self, 'recorder', None): self.recorder.stop(); self.recorder = None
+        self.settings['recorder']['enabled'] = self.recording_var.get(); save_settings(self.settings)
+
+    def replay_recording(self, seconds):
+        self.ensure_tab("perf"); store = TimeSeriesStore(os.path.expanduser(self.settings['recorder']['dir'])); end = time.time(); start = end - seconds
+        resolution = store.pick_resolution(seconds); step = dict(ROLLUPS)[resolution]; parts = [p for _, p in store.read(resolution, start, end) if len(p)]
+        ts = np.concatenate([p["ts"] for p in parts]) if parts else np.zeros(0)
+        if len(ts) < 2: messagebox.showinfo("Reproduzir Gravação", "Não há dados gravados suficientes nesse intervalo."); return
+        # Reamostra na grade uniforme dos gráficos; pontos longe de qualquer registro (lacunas na gravação) ficam vazios.
+        grid = np.linspace(start, end, self.cpu_series.live.capacity); idx = np.clip(np.searchsorted(ts, grid), 1, len(ts) - 1)
+        gap = np.minimum(grid - ts[idx - 1], ts[idx] - grid) > 2 * step
+        def resample(values): out = np.interp(grid, ts, values, left=np.nan, right=np.nan); out[gap] = np.nan; return out
+        for series, field in ((self.cpu_series, "cpu"), (self.mem_series, "mem"), (self.swap_series, "swap")): series.show(resample(np.concatenate([p[field] for p in parts])))
+        same_cores = all(p["cores"].shape[1] == len(self.core_series) for p in parts)
+        for i, series in enumerate(self.core_series): series.show(resample(np.concatenate([p["cores"][:, i] for p in parts])) if same_cores else np.full(len(grid), np.nan))
+        self.set_graph_span(seconds, f"Gravação: {time.strftime('%d/%m %H:%M', time.localtime(start))} → {time.strftime('%d/%m %H:%M', time.localtime(end))} ({resolution})")
+        self.notebook.select(self.tabs["perf"])
+
+    def show_live_graphs(self):
+        if "perf" not in self.built_tabs: return
+        for series in self.graph_series: series.show()
+        self.set_graph_span(self.live_span, "Segundos atrás")
+
+    def set_graph_span(self, span, label):
+        x = np.linspace(-span, 0, len(self.cpu_series.display))
+        for series in self.graph_series: series.set_x(x); series.refresh()
+        for ax in (self.ax_cpu, self.ax_mem, self.ax_swap): ax.set_xlim(-span, 0)
+        self.ax_swap.set_xlabel(label, fontsize='small'); self.graph_bg = None; self.canvas.draw_idle()
 
     def apply_theme(self):
         theme = self.settings['theme']
@@ -165,9 +2255,12 @@ class CortexEdition(tk.Tk):
         self.style.configure('.', background=colors['bg'], foreground=colors['fg'], fieldbackground=colors['base'], font=('Calibri', 10))
         self.style.configure('TNotebook', background=colors['bg']); self.style.configure('TNotebook.Tab', background=colors['alt'], foreground=colors['fg'], padding=[5, 2])
         self.style.map('TNotebook.Tab', background=[('selected', colors['bg'])]); self.style.configure('Treeview', background=colors['base'], fieldbackground=colors['base'])
-        self.style.map('Treeview', background=[('selected', '#0078D7')]); self.configure(background=colors['bg'])
-        for widget in [self.details_text, self.hw_text_area, self.credits_text_widget]:
-            if widget: widget.config(bg=colors['bg'], fg=colors['fg'])
+        self.style.map('Treeview', background=[('selected', '#0078D7')]); self.configure(background=colors['bg']); self.theme_colors = colors
+        self.color_text_widgets()
+
+    def color_text_widgets(self):
+        for widget in [self.details_text, self.credits_text_widget]:
+            if widget: widget.config(bg=self.theme_colors['bg'], fg=self.theme_colors['fg'])
 
     def create_process_tab(self):
         tab = self.tabs["proc"]
@@ -175,6 +2268,10 @@ class CortexEdition(tk.Tk):
         ttk.Label(top_frame, text="Buscar:").pack(side=tk.LEFT, padx=(0,5))
         self.search_var = tk.StringVar(); self.search_var.trace_add("write", lambda n, i, m: self.filter_process_list())
         ttk.Entry(top_frame, textvariable=self.search_var, width=40).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_field = ttk.Combobox(top_frame, values=list(PROC_FILTER_FIELDS), state="readonly", width=10); self.search_field.current(0); self.search_field.pack(side=tk.LEFT, padx=5)
+        self.search_field.bind("<<ComboboxSelected>>", lambda e: self.filter_process_list())
+        self.search_regex = tk.BooleanVar(value=False); ttk.Checkbutton(top_frame, text="Regex", variable=self.search_regex, command=self.filter_process_list).pack(side=tk.LEFT)
+        self.proc_tree_mode = tk.BooleanVar(value=False); ttk.Checkbutton(top_frame, text="Árvore", variable=self.proc_tree_mode, command=self.filter_process_list).pack(side=tk.LEFT, padx=5)
         self.process_count_label = ttk.Label(top_frame, text="Processos: 0"); self.process_count_label.pack(side=tk.RIGHT, padx=5)
         main_frame = ttk.PanedWindow(tab, orient=tk.VERTICAL); main_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         tree_frame = ttk.Frame(main_frame)
@@ -182,146 +2279,270 @@ class CortexEdition(tk.Tk):
         self.tree_procs = ttk.Treeview(tree_frame, columns=columns, show="headings")
         for col in columns: self.tree_procs.heading(col, text=col.replace("_", " ").title(), command=lambda _c=col: self.sort_column(_c, False)); self.tree_procs.column(col, anchor=tk.W, width=110)
         self.tree_procs.column("name", width=220); self.tree_procs.column("cpu", anchor=tk.CENTER, width=70)
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree_procs.yview); self.tree_procs.configure(yscroll=scrollbar.set)
-        self.tree_procs.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree_procs.bind("<<TreeviewSelect>>", self.show_process_details); self.tree_procs.bind("<Button-3>", self.show_context_menu)
+        # Tabela virtualizada: só a janela visível de linhas existe no Tk; a barra de rolagem move self.proc_top sobre self.proc_view.
+        self.proc_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.scroll_processes)
+        self.tree_procs.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); self.proc_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.proc_rows = TreeReconciler(self.tree_procs)
+        self.tree_procs.bind("<<TreeviewSelect>>", self.on_process_select); self.tree_procs.bind("<Button-3>", self.show_context_menu)
+        self.tree_procs.bind("<Configure>", lambda e: self.measure_process_rows()); self.tree_procs.bind("<Double-1>", self.toggle_process_subtree)
+        self.tree_procs.bind("<MouseWheel>", lambda e: self.scroll_processes("scroll", -3 if e.delta > 0 else 3, "units"))
+        self.tree_procs.bind("<Button-4>", lambda e: self.scroll_processes("scroll", -3, "units")); self.tree_procs.bind("<Button-5>", lambda e: self.scroll_processes("scroll", 3, "units"))
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"), ("<Home>", "-all"), ("<End>", "all")): self.tree_procs.bind(key, lambda e, s=step: self.move_process_selection(s))
         main_frame.add(tree_frame, weight=3)
         details_frame = ttk.LabelFrame(main_frame, text="Detalhes do Processo Selecionado", padding=10)
-        self.details_text = tk.Text(details_frame, height=5, wrap=tk.WORD, state="disabled", font=("Courier", 9)); self.details_text.pack(fill=tk.BOTH, expand=True)
+        self.details_text = tk.Text(details_frame, height=9, wrap=tk.WORD, state="disabled", font=("Courier", 9)); self.details_text.pack(fill=tk.BOTH, expand=True)
         main_frame.add(details_frame, weight=1)
 
-    def populate_process_list(self): self.all_processes = self.get_process_data(); self.filter_process_list(); self.after(3000, self.populate_process_list)
-    
-    def get_process_data(self):
-        procs = []
-        attrs = ['pid', 'name', 'username', 'cpu_percent', 'memory_info', 'status', 'num_threads', 'cmdline', 'exe', 'io_counters']
-        for p in psutil.process_iter(attrs):
-            try:
-                read_speed, write_speed = 0, 0; current_time = time.time(); last_time = self.last_io_times.get(p.pid, 0)
-                if last_time > 0 and p.info.get('io_counters'):
-                    elapsed = current_time - last_time; last_io = self.last_io_counters.get(p.pid)
-                    if elapsed > 0 and last_io:
-                        read_speed = (p.info['io_counters'].read_bytes - last_io.read_bytes) / elapsed
-                        write_speed = (p.info['io_counters'].write_bytes - last_io.write_bytes) / elapsed
-                self.last_io_times[p.pid] = current_time; self.last_io_counters[p.pid] = p.info.get('io_counters')
-                parent_name = 'N/A'
-                try: 
-                    parent = p.parent()
-                    if parent: parent_name = parent.name()
-                except psutil.Error: pass
-                procs.append({"pid": p.pid, "name": p.info.get('name'), "user": p.info.get('username'), "cpu": p.info.get('cpu_percent'),"memory": p.info.get('memory_info').rss / 1024**2 if p.info.get('memory_info') else 0, "disk_read": read_speed, "disk_write": write_speed, "status": p.info.get('status'),"threads": p.info.get('num_threads'), "cmdline": ' '.join(p.info.get('cmdline') or []),"parent": parent_name, "exe": p.info.get('exe')})
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess): 
-                self.last_io_times.pop(p.pid, None); self.last_io_counters.pop(p.pid, None)
-        return procs
+    def populate_process_list(self):
+        snap = self.proc_collector.latest()
+        if snap.seq != self.proc_seq and snap.data is not None:
+            self.proc_seq = snap.seq; self.proc_table = snap.data if isinstance(snap.data, ProcessTable) else ProcessTable(snap.data)
+            self.sort_processes(*(self.proc_sort or (None, False)))
+            self.filter_process_list()
+            if self.selected_pid is not None: self.show_process_details(None)
+            if STARTUP.enabled and not STARTUP.reported:
+                STARTUP.mark("primeiros processos na tabela")
+                if any(phase == "primeira pintura" for phase, _ in STARTUP.marks): STARTUP.report()
 
+    @INSTRUMENTS.timed
     def filter_process_list(self):
-        search = self.search_var.get().lower()
+        # Por tecla: uma máscara vetorizada sobre a ordenação já calculada; só a janela visível é formatada e reconciliada.
+        search, table = self.search_var.get(), self.proc_table
+        try: mask = table.match(search, PROC_FILTER_FIELDS[self.search_field.get()], self.search_regex.get()) if search else None
+        except re.error: self.process_count_label.config(text="Regex inválida"); return
+        if not self.proc_tree_mode.get(): self.proc_view = self.proc_order[mask[self.proc_order]] if mask is not None else self.proc_order
+        else:
+            # Modo árvore (sempre em pré-ordem): mantém subárvores com alguma linha que casa com a busca e esconde
+            # os descendentes dos nós recolhidos, ambos por soma de prefixos sobre os intervalos [pos, pos + tamanho).
+            tree = table.tree(); n = len(tree.order); keep = np.ones(n, dtype=bool)
+            if mask is not None: prefix = np.concatenate([[0], np.cumsum(mask[tree.order])]); keep = prefix[np.arange(n) + tree.size] > prefix[:-1]
+            collapsed = np.flatnonzero(np.isin(table.columns["pid"][tree.order], list(self.proc_collapsed)) & (tree.size > 1))
+            if len(collapsed):
+                delta = np.zeros(n + 1, dtype=np.int64); np.add.at(delta, collapsed + 1, 1); np.add.at(delta, collapsed + tree.size[collapsed], -1); keep &= np.cumsum(delta)[:n] == 0
+            self.proc_view = tree.order[keep]
+        self.process_count_label.config(text=f"Processos: {len(self.proc_view)}"); self.render_process_window()
+
+    @INSTRUMENTS.timed
+    def render_process_window(self):
+        view, table, rows = self.proc_view, self.proc_table, self.proc_visible_rows
+        self.proc_top = top = max(0, min(self.proc_top, len(view) - rows + 1))  # a última linha da janela pode estar cortada
+        tree = table.tree() if self.proc_tree_mode.get() else None
+        def values(i):
+            p = table[i]
+            if tree is None: return (p.pid, p.name, p.user, f"{p.cpu:.1f}%", f"{p.memory:.2f} MB", format_rate(p.disk_read), format_rate(p.disk_write))
+            pos = tree.position[i]; marker = ("▸ " if p.pid in self.proc_collapsed else "▾ ") if tree.size[pos] > 1 else "  "; sigma = "Σ " if tree.size[pos] > 1 else ""
+            return (p.pid, "   " * tree.depth[pos] + marker + p.name, p.user, f"{sigma}{tree.cpu[pos]:.1f}%", f"{sigma}{tree.memory[pos]:.2f} MB", sigma + format_rate(tree.disk_read[pos]), sigma + format_rate(tree.disk_write[pos]))
         try:
-            self.tree_procs.delete(*self.tree_procs.get_children())
-            filtered = [p for p in self.all_processes if p and search in p.get('name', '').lower()]
-            for p in filtered:
-                def fs(b): return f"{b/1024**2:.2f} MB/s" if b > 1024**2 else f"{b/1024:.1f} KB/s" if b > 0 else "0 B/s"
-                vals = (p['pid'], p['name'], p['user'], f"{p.get('cpu', 0):.1f}%", f"{p.get('memory', 0):.2f} MB", fs(p.get('disk_read', 0)), fs(p.get('disk_write', 0)))
-                self.tree_procs.insert("", tk.END, values=vals, iid=p['pid'])
-            self.process_count_label.config(text=f"Processos: {len(filtered)}")
+            self.proc_rows.reconcile((table[i].pid, values(i)) for i in view[top:top + rows])
+            self.proc_scroll.set(top / len(view), min(1.0, (top + rows - 1) / len(view))) if len(view) else self.proc_scroll.set(0.0, 1.0)
+            pid = self.selected_pid
+            if pid is not None and self.tree_procs.exists(pid) and str(pid) not in self.tree_procs.selection(): self.tree_procs.selection_set(pid)
         except tk.TclError: pass
 
+    def measure_process_rows(self):
+        # Quantas linhas cabem na árvore, medido pela primeira linha desenhada (altura do cabeçalho e da linha variam com o tema).
+        children = self.tree_procs.get_children(); box = self.tree_procs.bbox(children[0]) if children else None
+        if not box: return
+        rows = max(1, (self.tree_procs.winfo_height() - box[1]) // max(1, box[3]) + 1)
+        if rows != self.proc_visible_rows: self.proc_visible_rows = rows; self.render_process_window()
+
+    def scroll_processes(self, *args):
+        if args[0] == "moveto": self.proc_top = int(float(args[1]) * len(self.proc_view))
+        else: self.proc_top += int(args[1]) * (max(1, self.proc_visible_rows - 1) if args[2] == "pages" else 1)
+        self.render_process_window(); return "break"
+
+    def move_process_selection(self, step):
+        view = self.proc_view
+        if not len(view): return "break"
+        page = max(1, self.proc_visible_rows - 1); step = {"page": page, "-page": -page, "all": len(view), "-all": -len(view)}.get(step, step)
+        hit = np.flatnonzero(self.proc_table.columns["pid"][view] == self.selected_pid) if self.selected_pid is not None else ()
+        pos = max(0, min(len(view) - 1, (hit[0] + step) if len(hit) else self.proc_top))
+        if pos < self.proc_top: self.proc_top = pos
+        elif pos >= self.proc_top + self.proc_visible_rows - 1: self.proc_top = pos - self.proc_visible_rows + 2
+        self.selected_pid = int(self.proc_table.columns["pid"][view[pos]]); self.render_process_window(); self.show_process_details(None); return "break"
+
+    def toggle_process_subtree(self, event):
+        item = self.tree_procs.identify_row(event.y)
+        if not item or not self.proc_tree_mode.get(): return
+        self.proc_collapsed ^= {int(item)}; self.filter_process_list(); return "break"
+
+    def on_process_select(self, event):
+        # Linhas que saem da janela somem da seleção do Tk; o PID escolhido continua em self.selected_pid.
+        items = self.tree_procs.selection()
+        if items: self.selected_pid = int(items[0]); self.show_process_details(event)
+
+    def create_performance_buffers(self):
+        # Os buffers recebem amostras desde a partida; os gráficos (e o matplotlib) só existem depois que a aba é aberta.
+        points = int(self.settings['perf_points']); capacity = -(-max(int(self.settings['perf_history']), points) // points) * points
+        self.live_span = capacity * float(self.settings['perf_interval'])
+        self.perf_buffers = {"cpu": RingBuffer(capacity), "mem": RingBuffer(capacity), "swap": RingBuffer(capacity),
+                             "percpu": [RingBuffer(capacity) for _ in range(psutil.cpu_count() or 1)] if self.settings['perf_per_core'] else []}
+
     def create_performance_tab(self):
-        tab = self.tabs["perf"]
-        plt.style.use('ggplot')
-        self.fig = plt.Figure(figsize=(5, 4), dpi=100); self.fig.tight_layout(pad=3.0)
+        tab = self.tabs["perf"]; points = int(self.settings['perf_points']); span, buffers = self.live_span, self.perf_buffers
+        import_matplotlib(); mpl_style.use('ggplot')
+        self.fig = Figure(figsize=(5, 4), dpi=100); self.fig.subplots_adjust(top=0.95, bottom=0.08, hspace=0.45)
         self.ax_cpu = self.fig.add_subplot(3, 1, 1); self.ax_mem = self.fig.add_subplot(3, 1, 2); self.ax_swap = self.fig.add_subplot(3, 1, 3)
-        self.canvas = FigureCanvasTkAgg(self.fig, master=tab); self.canvas.draw(); self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        self.cpu_data, self.mem_data, self.swap_data = deque(maxlen=50), deque(maxlen=50), deque(maxlen=50)
+        for ax, title in [(self.ax_cpu, "Uso de CPU (%)"), (self.ax_mem, "Uso de Memória RAM (%)"), (self.ax_swap, "Uso de Memória Swap (%)")]:
+            ax.set_title(title, fontsize='medium'); ax.set_ylim(0, 100); ax.set_xlim(-span, 0); ax.tick_params(labelbottom=ax is self.ax_swap, labelsize='small')
+        self.ax_swap.set_xlabel("Segundos atrás", fontsize='small')
+        x = np.linspace(-span, 0, points)
+        self.core_series = [GraphSeries(self.ax_cpu, x, live, 'gray', linewidth=0.6, alpha=0.5) for live in buffers["percpu"]]
+        self.cpu_series = GraphSeries(self.ax_cpu, x, buffers["cpu"], 'C0', fill=True, label_fmt="Uso CPU: {:.1f}%")
+        self.mem_series = GraphSeries(self.ax_mem, x, buffers["mem"], 'C1', fill=True, label_fmt="Uso RAM: {:.1f}%")
+        self.swap_series = GraphSeries(self.ax_swap, x, buffers["swap"], 'C3', fill=True, label_fmt="Uso Swap: {:.1f}%")
+        self.graph_series = self.core_series + [self.cpu_series, self.mem_series, self.swap_series]; self.graph_bg = None
+        self.canvas = FigureCanvasTkAgg(self.fig, master=tab); self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect('draw_event', self.on_graphs_drawn); self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed, add='+')
+
+    def perf_tab_visible(self): return self.visible_tab() == "perf"
+
+    def on_tab_changed(self, event):
+        if self.perf_tab_visible():
+            for series in self.graph_series: series.refresh()
+            self.canvas.draw_idle()
+
+    def on_graphs_drawn(self, event):
+        # Redesenho completo (primeira exibição, redimensionamento): guarda o fundo estático e repinta as séries por cima.
+        self.graph_bg = self.canvas.copy_from_bbox(self.fig.bbox); self.draw_graph_series(); self.canvas.blit(self.fig.bbox)
+
+    def draw_graph_series(self):
+        for series in self.graph_series:
+            for artist in series.artists: artist.axes.draw_artist(artist)
+
+    def sample_performance(self, sample):
+        # Em reprodução, as séries exibem a gravação, mas as amostras ao vivo continuam indo para o buffer ao vivo.
+        buffers = self.perf_buffers
+        for key in ("cpu", "mem", "swap"): buffers[key].append(sample[key])
+        for buffer, value in zip(buffers["percpu"], sample["percpu"]): buffer.append(value)
 
     def update_performance_graphs(self):
         try:
-            self.cpu_data.append(psutil.cpu_percent(interval=None)); mem_info = psutil.virtual_memory(); self.mem_data.append(mem_info.percent); self.swap_data.append(psutil.swap_memory().percent)
-            for ax, data, title, color, label in [(self.ax_cpu, self.cpu_data, "Uso de CPU (%)", 'C0', f'Uso CPU: {self.cpu_data[-1]:.1f}%'),(self.ax_mem, self.mem_data, "Uso de Memória RAM (%)", 'C1', f'Uso RAM: {self.mem_data[-1]:.1f}%'),(self.ax_swap, self.swap_data, "Uso de Memória Swap (%)", 'C3', f'Uso Swap: {self.swap_data[-1]:.1f}%')]:
-                ax.clear(); ax.plot(data, label=label, color=color); ax.fill_between(range(len(data)), data, alpha=0.3, color=color); ax.set_ylim(0, 100); ax.legend(loc='upper right', fontsize='small'); ax.set_title(title, fontsize='medium')
-            self.canvas.draw()
+            if self.perf_tab_visible():
+                for series in self.graph_series: series.refresh()
+                if self.graph_bg is None: self.canvas.draw()
+                else:
+                    self.canvas.restore_region(self.graph_bg); self.draw_graph_series()
+                    for ax in (self.ax_cpu, self.ax_mem, self.ax_swap): self.canvas.blit(ax.bbox)
         except (RuntimeError, tk.TclError, AttributeError): pass
-        self.after(1500, self.update_performance_graphs)
 
     def create_network_tab(self):
         tab = self.tabs["net"]
-        tree_frame = ttk.Frame(tab, padding=5); tree_frame.pack(expand=True, fill='both')
+        top_frame = ttk.Frame(tab, padding=5); top_frame.pack(fill=tk.X)
+        self.net_count_label = ttk.Label(top_frame, text="Conexões: 0"); self.net_count_label.pack(side=tk.LEFT)
+        self.net_view_var = tk.StringVar(value="Por Estado")
+        view = ttk.Combobox(top_frame, textvariable=self.net_view_var, values=["Por Estado", "Por Host Remoto"], state="readonly", width=18); view.pack(side=tk.RIGHT)
+        view.bind("<<ComboboxSelected>>", lambda e: self.rerender_network())
+        ttk.Label(top_frame, text="Agregar:").pack(side=tk.RIGHT, padx=5)
+        panes = ttk.PanedWindow(tab, orient=tk.HORIZONTAL); panes.pack(expand=True, fill='both', padx=5, pady=5)
+        tree_frame = ttk.Frame(panes)
         cols = ("pid", "process", "local_addr", "local_port", "remote_addr", "remote_port", "status")
         self.tree_net = ttk.Treeview(tree_frame, columns=cols, show="headings")
         for c in cols: self.tree_net.heading(c, text=c.replace("_", " ").title()); self.tree_net.column(c, width=120)
         self.tree_net.column("process", width=180)
         scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree_net.yview); self.tree_net.configure(yscroll=scroll.set)
-        self.tree_net.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_net.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.net_rows = TreeReconciler(self.tree_net)
+        panes.add(tree_frame, weight=3)
+        agg_frame = ttk.Frame(panes)
+        self.tree_net_agg = ttk.Treeview(agg_frame, columns=("key", "count"), show="headings"); self.tree_net_agg.heading("key", text="Chave"); self.tree_net_agg.heading("count", text="Conexões")
+        self.tree_net_agg.column("key", width=200); self.tree_net_agg.column("count", width=80, anchor='e')
+        scroll = ttk.Scrollbar(agg_frame, orient=tk.VERTICAL, command=self.tree_net_agg.yview); self.tree_net_agg.configure(yscroll=scroll.set)
+        self.tree_net_agg.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.net_agg_rows = TreeReconciler(self.tree_net_agg)
+        panes.add(agg_frame, weight=1)
+
+    def populate_network_list(self): self.net_collector.wake()
 
-    def populate_network_list(self):
+    def rerender_network(self):
+        data = self.net_collector.latest().data
+        if data is not None: self.render_network(data)
+
+    def render_network(self, data):
         try:
-            self.tree_net.delete(*self.tree_net.get_children()); cache = {}
-            for c in psutil.net_connections(kind='inet'):
-                if not c.pid: continue
-                if c.pid not in cache:
-                    try: cache[c.pid] = psutil.Process(c.pid).name()
-                    except psutil.Error: cache[c.pid] = "N/A"
-                vals = (c.pid, cache[c.pid], c.laddr.ip, c.laddr.port, c.raddr.ip if c.raddr else '*', c.raddr.port if c.raddr else '*', c.status)
-                self.tree_net.insert("", tk.END, values=vals)
-        except (psutil.AccessDenied, tk.TclError): pass
-        self.after(5000, self.populate_network_list)
+            limit, conns = int(self.settings['net_max_rows']), data["connections"]
+            self.net_rows.reconcile((f"{c[0]}|{c[7]}|{c[2]}|{c[3]}|{c[4]}|{c[5]}", c[:7]) for c in conns[:limit])
+            self.net_count_label.config(text=f"Conexões: {data['total']} ({len(conns)} com processo identificado, exibindo {min(limit, len(conns))})")
+            agg = data["by_state"] if self.net_view_var.get() == "Por Estado" else data["by_host"]
+            self.net_agg_rows.reconcile((key, (key, count)) for key, count in agg[:limit])
+        except tk.TclError: pass
 
     def create_services_tab(self):
         tab = self.tabs["svc"]
         top_frame = ttk.Frame(tab, padding=5); top_frame.pack(fill=tk.X)
         for action, color in [("start", "green"), ("stop", "red"), ("restart", "blue")]: tk.Button(top_frame, text=action.title(), fg="white", bg=color, command=lambda a=action: self.perform_service_action(a)).pack(side=tk.LEFT, padx=5, pady=5)
-        ttk.Button(top_frame, text="Recarregar Lista", command=self.populate_services_list).pack(side=tk.RIGHT)
+        ttk.Button(top_frame, text="Recarregar Lista", command=self.reload_services).pack(side=tk.RIGHT)
+        self.svc_status_label = ttk.Label(top_frame, text=""); self.svc_status_label.pack(side=tk.LEFT, padx=10)
         tree_frame = ttk.Frame(tab, padding=5); tree_frame.pack(expand=True, fill='both')
         cols = ("service", "loaded", "active", "description"); self.tree_svc = ttk.Treeview(tree_frame, columns=cols, show="headings")
         for c in cols: self.tree_svc.heading(c, text=c.title()); self.tree_svc.column(c, width=150)
         self.tree_svc.column("description", width=450)
         scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree_svc.yview); self.tree_svc.configure(yscroll=scroll.set)
-        self.tree_svc.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_svc.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.svc_rows, self.svc_seq = TreeReconciler(self.tree_svc), None
+        if os.geteuid() != 0: self.svc_rows.reconcile([("root", ("Execute como root (sudo) para ver serviços", "", "", ""))])
+        else: self.svc_rows.reconcile([("loading", ("Carregando serviços...", "", "", ""))])
 
     def populate_services_list(self):
-        if os.geteuid() != 0:
-            if not getattr(self, '_svc_error_shown', False): self.tree_svc.insert("", tk.END, values=("Execute como root (sudo) para ver serviços", "", "", "")); self._svc_error_shown = True
-            return
+        if os.geteuid() == 0: self.svc_collector.wake()
+
+    def reload_services(self):
+        if os.geteuid() == 0: self.svc_collector.reload()
+
+    def render_services(self, update):
+        # Só as linhas que mudaram, quando o snapshot anterior foi o último desenhado; senão (ou se o conjunto mudou), tudo.
+        units, values = update.units, lambda s: (s.unit, s.load, s.active, s.description)
         try:
-            self.tree_svc.delete(*self.tree_svc.get_children()); self._svc_error_shown = False
-            out = subprocess.check_output(['systemctl', 'list-units', '--type=service', '--all', '--no-pager'], text=True, errors='replace')
-            for line in out.strip().split('\n')[1:-5]:
-                parts = line.strip().split(maxsplit=4);
-                if len(parts) < 4: continue
-                unit, load, active, sub, desc = parts[0], parts[1], parts[2], parts[3], parts[4] if len(parts) > 4 else ""
-                self.tree_svc.insert("", tk.END, values=(unit, load, active, desc))
-        except (subprocess.CalledProcessError, FileNotFoundError, tk.TclError): pass
-        self.after(30000, self.populate_services_list)
+            if update.changed is None or update.since != self.svc_seq or not all(self.svc_rows.update(name, values(units[name])) for name in update.changed):
+                self.svc_rows.reconcile([(name, values(units[name])) for name in sorted(units)] or [("none", ("Nenhum serviço (systemctl indisponível)", "", "", ""))])
+            self.svc_status_label.config(text=f"Unidades: {len(units)} — {update.mode}")
+        except tk.TclError: pass
+        self.svc_seq = update.since + 1
 
     def perform_service_action(self, action):
         items = self.tree_svc.selection()
         if not items: messagebox.showwarning("Nenhum Serviço", "Selecione um serviço."); return
         svc = self.tree_svc.item(items[0])['values'][0]
         if messagebox.askyesno("Confirmação", f"Tem certeza que deseja '{action}' o serviço '{svc}'?", icon='warning'):
-            CommandRunnerWindow(self, ['systemctl', action, svc])
-            self.after(2000, self.populate_services_list)
+            self.run_job(['systemctl', action, svc], on_done=lambda job: self.svc_collector.wake())
 
     def create_hardware_tab(self):
-        self.hw_text_area = scrolledtext.ScrolledText(self.tabs["hw"], wrap='word', font=("Courier", 10), relief='flat')
-        self.hw_text_area.pack(expand=True, fill='both', padx=5, pady=5); self.hw_text_area.config(state='disabled')
-        
-    def update_hardware_sensors(self):
+        tab = self.tabs["hw"]
+        top_frame = ttk.Frame(tab, padding=5); top_frame.pack(fill=tk.X)
+        self.hw_status_label = ttk.Label(top_frame, text=""); self.hw_status_label.pack(side=tk.LEFT)
+        ttk.Button(top_frame, text="Redetectar Sensores", command=self.redetect_sensors).pack(side=tk.RIGHT)
+        tree_frame = ttk.Frame(tab, padding=5); tree_frame.pack(expand=True, fill='both')
+        cols = ("sensor", "chip", "kind", "value", "min", "max", "avg", "limit", "status")
+        self.tree_hw = ttk.Treeview(tree_frame, columns=cols, show="headings")
+        for c, title in zip(cols, ("Sensor", "Chip", "Tipo", "Atual", "Mín", "Máx", "Média", "Limite", "Estado")): self.tree_hw.heading(c, text=title); self.tree_hw.column(c, width=90, anchor='e')
+        for c in ("sensor", "chip"): self.tree_hw.column(c, width=200, anchor='w')
+        self.tree_hw.column("kind", anchor='center'); self.tree_hw.column("status", anchor='center'); self.tree_hw.tag_configure('alert', background='#F4B6B6', foreground='#000000')
+        scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree_hw.yview); self.tree_hw.configure(yscroll=scroll.set)
+        self.tree_hw.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.hw_rows = TreeReconciler(self.tree_hw)
+
+    def redetect_sensors(self):
+        if isinstance(self.sensor_collector, SensorCollector): self.sensor_collector.redetect()
+
+    def update_hardware_sensors(self): self.sensor_collector.wake()
+
+    def render_sensors(self, readings):
         try:
-            full_hw_text = "--- SENSORES DO SISTEMA (lm-sensors) ---\n"
-            try:
-                output = subprocess.check_output(['sensors'], text=True, stderr=subprocess.DEVNULL, errors='replace')
-                full_hw_text += ''.join([line + "\n" for line in output.split('\n') if line.strip() and "Adapter:" not in line])
-            except (FileNotFoundError, subprocess.CalledProcessError): full_hw_text += "Comando 'sensors' não encontrado ou falhou.\n(Verifique se 'lm-sensors' está instalado e configurado via 'sudo sensors-detect')\n"
-            full_hw_text += "\n--- GPU (Exemplo) ---\nPara monitorar GPUs, seria necessário código adicional.\n"
-            self.hw_text_area.config(state='normal'); self.hw_text_area.delete('1.0', tk.END)
-            self.hw_text_area.insert('1.0', full_hw_text); self.hw_text_area.config(state='disabled')
+            alerts, rows, alerting = self.settings['sensor_alerts'], [], set()
+            for sensor in readings:
+                threshold = sensor_threshold(sensor, alerts); alert = sensor_alert(sensor, sensor.value, threshold)
+                if alert: alerting.add(sensor.key)
+                fmt = [format_sensor(sensor, v) for v in (sensor.value, sensor.min, sensor.max, sensor.avg, threshold)]
+                rows.append((sensor.key, (sensor.label, sensor.chip, sensor.kind, *fmt, "ALERTA" if alert else "OK" if sensor.value is not None else "Sem leitura")))
+            if not rows: rows = [("none", ("Nenhum sensor encontrado em /sys/class/hwmon ou /sys/class/thermal", "", "", "", "", "", "", "", ""))]
+            if "hw" in self.built_tabs:  # com a aba ainda não aberta, só o alerta no título da aba é atualizado
+                self.hw_rows.reconcile(rows); previous = getattr(self, 'hw_alerting', set())
+                for key in (alerting ^ previous) & set(self.hw_rows.values): self.tree_hw.item(key, tags=('alert',) if key in alerting else ())
+                self.hw_alerting = alerting
+                self.hw_status_label.config(text=f"Sensores: {len(readings)} | Em alerta: {len(alerting)}")
+            self.notebook.tab(self.tabs["hw"], text="Hardware ⚠" if alerting else "Hardware")
         except (RuntimeError, tk.TclError): pass
-        self.after(5000, self.update_hardware_sensors)
 
     def create_packages_tab(self):
         tab = self.tabs["pkg"]
         top_frame = ttk.Frame(tab, padding=5); top_frame.pack(fill=tk.X)
-        ttk.Button(top_frame, text="Atualizar Listas", command=lambda: CommandRunnerWindow(self, ['apt-get', 'update'])).pack(side=tk.LEFT, padx=5)
+        ttk.Button(top_frame, text="Atualizar Listas", command=lambda: self.run_job(['apt-get', 'update'])).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_frame, text="Atualizar Pacote", command=self.upgrade_selected_package).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_frame, text="Remover Pacote", command=self.remove_selected_package).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_frame, text="Recarregar", command=self.populate_packages_list).pack(side=tk.RIGHT)
@@ -334,25 +2555,18 @@ class CortexEdition(tk.Tk):
         for c in cols: self.tree_pkg.heading(c, text=c.title()); self.tree_pkg.column(c, width=200)
         self.tree_pkg.column("description", width=600)
         scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree_pkg.yview); self.tree_pkg.configure(yscroll=scroll.set)
-        self.tree_pkg.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_pkg.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.pkg_rows = TreeReconciler(self.tree_pkg)
+        self.pkg_rows.reconcile([("loading", ("Carregando pacotes...", "", ""))])
 
-    def populate_packages_list(self):
-        self.all_packages = []
-        try:
-            cmd = ['dpkg-query', '-W', '-f=${Package}\t${Version}\t${description}\n']
-            output = subprocess.check_output(cmd, text=True, errors='replace')
-            for line in output.strip().split('\n'):
-                parts = line.split('\t');
-                if len(parts) == 3: self.all_packages.append({"package": parts[0], "version": parts[1], "description": parts[2]})
-            self.filter_package_list()
-        except (subprocess.CalledProcessError, FileNotFoundError, tk.TclError): pass
+    def populate_packages_list(self): self.pkg_collector.wake()
+
+    def render_packages(self, packages): self.filter_package_list()
 
     def filter_package_list(self):
-        search = self.pkg_search_var.get().lower()
+        if self.pkg_collector.latest().data is None: return  # ainda carregando: mantém o aviso
         try:
-            self.tree_pkg.delete(*self.tree_pkg.get_children())
-            filtered = [p for p in self.all_packages if search in p['package'].lower() or search in p['description'].lower()]
-            for p in filtered: self.tree_pkg.insert("", 'end', values=(p['package'], p['version'], p['description']))
+            packages = self.pkg_index.packages
+            self.pkg_rows.reconcile((packages[i].name, packages[i]) for i in self.pkg_index.search(self.pkg_search_var.get()))
         except tk.TclError: pass
         
     def upgrade_selected_package(self):
@@ -361,7 +2575,7 @@ class CortexEdition(tk.Tk):
         if not items: messagebox.showwarning("Nenhum Pacote", "Selecione um pacote."); return
         pkg_name = self.tree_pkg.item(items[0])['values'][0]
         if messagebox.askyesno("Confirmação", f"Deseja tentar atualizar '{pkg_name}'?", icon='question'):
-             CommandRunnerWindow(self, ['apt-get', 'install', '--only-upgrade', '-y', pkg_name])
+             self.run_job(['apt-get', 'install', '--only-upgrade', '-y', pkg_name], on_done=lambda job: self.pkg_collector.wake())
 
     def remove_selected_package(self):
         if os.geteuid() != 0: messagebox.showerror("Requer Root", "Esta ação precisa de 'sudo'."); return
@@ -369,30 +2583,93 @@ class CortexEdition(tk.Tk):
         if not items: messagebox.showwarning("Nenhum Pacote", "Selecione um pacote."); return
         pkg_name = self.tree_pkg.item(items[0])['values'][0]
         if messagebox.askyesno("Confirmação", f"TEM CERTEZA que deseja remover '{pkg_name}'?", icon='warning'):
-            CommandRunnerWindow(self, ['apt-get', 'remove', '-y', pkg_name])
+            self.run_job(['apt-get', 'remove', '-y', pkg_name], on_done=lambda job: self.pkg_collector.wake())
 
     def create_disks_tab(self):
         tab = self.tabs["disk"]
-        tree_frame = ttk.Frame(tab, padding=5); tree_frame.pack(expand=True, fill='both')
-        cols = ("device", "mountpoint", "fstype", "total", "used", "free", "percent")
+        panes = ttk.PanedWindow(tab, orient=tk.VERTICAL); panes.pack(expand=True, fill='both', padx=5, pady=5)
+        tree_frame = ttk.Frame(panes)
+        cols = ("device", "mountpoint", "fstype", "total", "used", "free", "percent", "state")
         self.tree_disk = ttk.Treeview(tree_frame, columns=cols, show="headings")
-        for c in cols: self.tree_disk.heading(c, text=c.replace("_", " ").title()); self.tree_disk.column(c, width=120, anchor='center')
+        for c in cols: self.tree_disk.heading(c, text=c.replace("_", " ").title()); self.tree_disk.column(c, width=110, anchor='center')
         self.tree_disk.column("device", width=200, anchor='w'); self.tree_disk.column("mountpoint", width=200, anchor='w')
         scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree_disk.yview); self.tree_disk.configure(yscroll=scroll.set)
-        self.tree_disk.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_disk.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.disk_rows = TreeReconciler(self.tree_disk); panes.add(tree_frame, weight=3)
+        io_frame = ttk.LabelFrame(panes, text="E/S por Dispositivo (/proc/diskstats)", padding=5)
+        cols = ("device", "read", "write", "read_iops", "write_iops", "util")
+        self.tree_diskio = ttk.Treeview(io_frame, columns=cols, show="headings", height=6)
+        for c, text in zip(cols, ("Dispositivo", "Leitura", "Escrita", "IOPS Leitura", "IOPS Escrita", "Utilização")): self.tree_diskio.heading(c, text=text); self.tree_diskio.column(c, width=120, anchor='center')
+        self.tree_diskio.column("device", anchor='w'); self.tree_diskio.pack(expand=True, fill='both'); self.diskio_rows = TreeReconciler(self.tree_diskio); panes.add(io_frame, weight=1)
 
-    def populate_disks_list(self):
+    def populate_disks_list(self): self.disk_collector.wake()
+
+    def render_disks(self, data):
+        def gb(val): return "—" if val is None else f"{val / (1024**3):.2f} GB"
         try:
-            self.tree_disk.delete(*self.tree_disk.get_children())
-            for part in psutil.disk_partitions():
-                try:
-                    usage = psutil.disk_usage(part.mountpoint)
-                    def gb(val): return f"{val / (1024**3):.2f} GB"
-                    vals = (part.device, part.mountpoint, part.fstype, gb(usage.total), gb(usage.used), gb(usage.free), f"{usage.percent}%")
-                    self.tree_disk.insert("", 'end', values=vals)
-                except (FileNotFoundError, PermissionError): continue
+            self.disk_rows.reconcile((d.mountpoint, (d.device, d.mountpoint, d.fstype, gb(d.total), gb(d.used), gb(d.free), "—" if d.percent is None else f"{d.percent}%", d.state)) for d in data["mounts"])
+            self.diskio_rows.reconcile((d.device, (d.device, format_rate(d.read_bps), format_rate(d.write_bps), f"{d.read_iops:.1f}", f"{d.write_iops:.1f}", f"{d.util:.1f}%")) for d in data["io"])
         except (tk.TclError): pass
-        self.after(20000, self.populate_disks_list)
+
+    def create_fleet_tab(self):
+        tab, cfg = self.tabs["fleet"], self.settings['fleet']
+        top_frame = ttk.Frame(tab, padding=5); top_frame.pack(fill=tk.X)
+        ttk.Label(top_frame, text="Agentes (host:porta, separados por vírgula):").pack(side=tk.LEFT)
+        self.fleet_hosts_var = tk.StringVar(value=", ".join(cfg['hosts'])); entry = ttk.Entry(top_frame, textvariable=self.fleet_hosts_var, width=60)
+        entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True); entry.bind("<Return>", lambda e: self.connect_fleet())
+        ttk.Button(top_frame, text="Conectar", command=self.connect_fleet).pack(side=tk.LEFT)
+        self.fleet_key_var = tk.StringVar(value="CPU"); key_box = ttk.Combobox(top_frame, textvariable=self.fleet_key_var, values=list(FLEET_TOP_KEYS), state="readonly", width=10)
+        key_box.pack(side=tk.RIGHT); key_box.bind("<<ComboboxSelected>>", lambda e: self.render_fleet_top()); ttk.Label(top_frame, text=f"Top {cfg['top_n']} por:").pack(side=tk.RIGHT, padx=5)
+        panes = ttk.PanedWindow(tab, orient=tk.VERTICAL); panes.pack(expand=True, fill='both', padx=5, pady=5)
+        hosts_frame = ttk.LabelFrame(panes, text="Hosts", padding=5)
+        cols = ("address", "name", "status", "latency", "cpu", "cpu_history", "mem", "swap", "processes", "disk", "connections")
+        self.tree_fleet = ttk.Treeview(hosts_frame, columns=cols, show="headings", height=8)
+        for c, text, width in zip(cols, ("Agente", "Host", "Estado", "Latência", "CPU", "CPU (histórico)", "Memória", "Swap", "Processos", "Disco Mais Cheio", "Conexões"), (150, 130, 130, 80, 60, 170, 70, 60, 80, 110, 80)):
+            self.tree_fleet.heading(c, text=text, command=lambda c=c: self.sort_fleet_hosts(c)); self.tree_fleet.column(c, width=width, anchor='w' if c in ("address", "name", "status", "cpu_history") else 'e')
+        self.tree_fleet.pack(expand=True, fill='both'); self.fleet_rows = TreeReconciler(self.tree_fleet); panes.add(hosts_frame, weight=1)
+        procs_frame = ttk.LabelFrame(panes, text="Processos da Frota (clique em CPU, Memória, Leitura ou Escrita para ordenar)", padding=5)
+        cols = ("host",) + FLEET_TOP_FIELDS
+        self.tree_fleet_top = ttk.Treeview(procs_frame, columns=cols, show="headings")
+        for c, text in zip(cols, ("Host", "PID", "Nome", "Usuário", "CPU", "Memória", "Leitura", "Escrita")):
+            label = next((k for k, v in FLEET_TOP_KEYS.items() if v == c), None)
+            self.tree_fleet_top.heading(c, text=text, command=(lambda label=label: (self.fleet_key_var.set(label), self.render_fleet_top())) if label else ""); self.tree_fleet_top.column(c, width=100, anchor='w' if c in ("host", "name", "user") else 'e')
+        scroll = ttk.Scrollbar(procs_frame, orient=tk.VERTICAL, command=self.tree_fleet_top.yview); self.tree_fleet_top.configure(yscroll=scroll.set)
+        self.tree_fleet_top.pack(side=tk.LEFT, fill=tk.BOTH, expand=True); scroll.pack(side=tk.RIGHT, fill=tk.Y); self.fleet_top_rows = TreeReconciler(self.tree_fleet_top); panes.add(procs_frame, weight=3)
+        self.fleet_hosts, self.fleet_sort = (), ("address", False)
+        if cfg['hosts']: self.connect_fleet(save=False)
+
+    def connect_fleet(self, save=True):
+        hosts = [h.strip() for h in self.fleet_hosts_var.get().split(",") if h.strip()]
+        invalid = [h for h in hosts if not h.rpartition(':')[2].isdigit()]
+        if invalid: messagebox.showerror("Frota", f"Endereço inválido (use host:porta): {', '.join(invalid)}"); return
+        self.fleet_poller.set_hosts(hosts)
+        if not self.fleet_poller.is_alive(): self.fleet_poller.start()
+        if save: self.settings['fleet']['hosts'] = hosts; save_settings(self.settings)
+
+    def sort_fleet_hosts(self, col):
+        self.fleet_sort = (col, not self.fleet_sort[1] if self.fleet_sort[0] == col else col not in ("address", "name", "status")); self.render_fleet_hosts()
+
+    def render_fleet(self, hosts):
+        self.fleet_hosts = hosts; self.render_fleet_hosts(); self.render_fleet_top()
+
+    def render_fleet_hosts(self):
+        col, reverse = self.fleet_sort; field = "cpu" if col == "cpu_history" else col
+        known = [h for h in self.fleet_hosts if getattr(h, field) is not None]
+        hosts = sorted(known, key=lambda h: getattr(h, field), reverse=reverse) + [h for h in self.fleet_hosts if getattr(h, field) is None]
+        def pct(v): return "—" if v is None else f"{v:.1f}%"
+        try:
+            self.fleet_rows.reconcile((h.address, (h.address, h.name, h.status, "—" if h.latency is None else f"{h.latency * 1000:.0f} ms", pct(h.cpu), sparkline(h.cpu_history, 24),
+                                                   pct(h.mem), pct(h.swap), h.processes, pct(h.disk), "—" if h.connections is None else h.connections)) for h in hosts)
+        except tk.TclError: pass
+
+    def render_fleet_top(self):
+        if "fleet" not in self.built_tabs: return
+        top = merge_fleet_top(self.fleet_hosts, FLEET_TOP_KEYS[self.fleet_key_var.get()], self.fleet_poller.top_n)
+        names = Counter(h.name for h in self.fleet_hosts)  # vários agentes na mesma máquina (ou com o mesmo hostname) levam o endereço
+        def label(h): name = h.name if names[h.name] == 1 else f"{h.name} @ {h.address}"; return name if h.status == "ok" else f"{name} ({h.status})"
+        try:
+            self.fleet_top_rows.reconcile((f"{h.address}|{pid}", (label(h), pid, name, user or "", f"{cpu:.1f}%", f"{memory:.1f} MB", format_rate(read), format_rate(write)))
+                                          for h, (pid, name, user, cpu, memory, read, write) in top)
+        except tk.TclError: pass
 
     def create_credits_tab(self):
         tab = self.tabs["credits"]
@@ -452,60 +2729,113 @@ class CortexEdition(tk.Tk):
         self.context_menu.add_command(label="▶️ Continuar", command=lambda: self.perform_proc_action('resume'))
         self.context_menu.add_separator(); self.context_menu.add_command(label="📦 Pacote do Processo", command=self.get_package_info)
         self.context_menu.add_command(label="📂 Arquivos Abertos", command=self.show_open_files)
-        self.context_menu.add_command(label="🔬 Rastrear (Resumo)", command=self.show_strace_summary)
+        self.context_menu.add_command(label="🔬 Rastrear (ao vivo)", command=self.show_strace_summary)
 
     def show_context_menu(self, event):
         item = self.tree_procs.identify_row(event.y);
-        if item: self.tree_procs.selection_set(item); self.context_menu.post(event.x_root, event.y_root)
+        if item: self.selected_pid = int(item); self.tree_procs.selection_set(item); self.context_menu.post(event.x_root, event.y_root)
 
     def perform_proc_action(self, action):
-        items = self.tree_procs.selection()
-        if not items: messagebox.showwarning("Nenhum Processo", "Selecione um processo."); return
-        pid = int(items[0]); pname = self.tree_procs.item(pid)['values'][1]
+        pid = self.selected_pid; proc = self.proc_table.find(pid) if pid is not None else None
+        if not proc: messagebox.showwarning("Nenhum Processo", "Selecione um processo."); return
+        pname = proc.name
         if messagebox.askyesno("Confirmação", f"Executar '{action}' em '{pname}' (PID: {pid})?", icon='warning'):
             try: p = psutil.Process(pid); getattr(p, action)(); messagebox.showinfo("Sucesso", f"Ação '{action}' executada.")
             except (psutil.Error, AttributeError) as e: messagebox.showerror("Erro", f"Falha na ação: {e}")
             self.filter_process_list()
 
     def get_package_info(self):
-        items = self.tree_procs.selection()
-        if not items: return
-        pid = int(items[0]); proc = next((p for p in self.all_processes if p['pid'] == pid), None)
-        if not proc or not proc.get('exe'): messagebox.showerror("Erro", "Não foi possível encontrar o executável."); return
+        proc = self.proc_table.find(self.selected_pid) if self.selected_pid is not None else None
+        if not proc or not proc.exe: messagebox.showerror("Erro", "Não foi possível encontrar o executável."); return
+        # O mapa caminho -> pacote é carregado pelo PackageCollector; até lá, "Pacote do Processo" recorre ao 'dpkg -S'.
+        owner = self.pkg_index.owner(proc.exe); self.pkg_collector.wake()
+        if owner: messagebox.showinfo("Informação de Pacote", f"'{proc.exe}' pertence a:\n\n{owner[0]}: {owner[1]}"); return
         try:
-            out = subprocess.check_output(['dpkg', '-S', proc['exe']], text=True, stderr=subprocess.DEVNULL, errors='replace')
-            messagebox.showinfo("Informação de Pacote", f"'{proc['exe']}' pertence a:\n\n{out.strip()}")
+            out = subprocess.check_output(['dpkg', '-S', proc.exe], text=True, stderr=subprocess.DEVNULL, errors='replace')
+            messagebox.showinfo("Informação de Pacote", f"'{proc.exe}' pertence a:\n\n{out.strip()}")
         except (subprocess.CalledProcessError, FileNotFoundError): messagebox.showinfo("Informação de Pacote", "Não foi possível determinar o pacote.")
         
     def show_open_files(self):
-        items = self.tree_procs.selection()
-        if not items: return
-        OpenFilesWindow(self, int(items[0]))
+        if self.selected_pid is None: return
+        OpenFilesWindow(self, self.selected_pid)
 
     def show_strace_summary(self):
         if os.geteuid() != 0: messagebox.showerror("Requer Root", "'strace' precisa de 'sudo'."); return
-        items = self.tree_procs.selection()
-        if not items: return
-        StraceWindow(self, int(items[0]))
+        if self.selected_pid is None: return
+        StraceWindow(self, self.selected_pid)
         
     def show_process_details(self, event):
-        items = self.tree_procs.selection()
-        if not items: self.details_text.config(state="normal"); self.details_text.delete(1.0, tk.END); self.details_text.config(state="disabled"); return
-        pid = int(items[0]); proc = next((p for p in self.all_processes if p['pid'] == pid), None)
+        pid = self.selected_pid
+        if pid is None: self.details_text.config(state="normal"); self.details_text.delete(1.0, tk.END); self.details_text.config(state="disabled"); return
+        proc = self.proc_table.find(pid)
         if proc:
-            details = (f"Pai: {proc.get('parent', 'N/A')}\nThreads: {proc.get('threads', 'N/A')}\nComando: {proc.get('cmdline', 'N/A')}")
+            details = f"Pai: {proc.parent} (PID {proc.ppid})\nThreads: {proc.threads}\nComando: {proc.cmdline}"
+            if self.proc_tree_mode.get():
+                tree = self.proc_table.tree(); pos = tree.position[self.proc_table.row(pid)]
+                if pos >= 0: details += f"\nSubárvore: {tree.size[pos]} processos, CPU {tree.cpu[pos]:.1f}%, RSS {tree.memory[pos]:.1f} MB, E/S {format_rate(tree.disk_read[pos])} / {format_rate(tree.disk_write[pos])}"
+            history = getattr(self.proc_collector, 'history', None); series = history.series(pid) if history else None
+            if series is not None:
+                def peak(v): return float(np.nanmax(v)) if np.isfinite(v).any() else 0.0
+                for label, key, unit, scale in (("CPU", "cpu", "%", 1), ("RSS", "rss", "MB", 1), ("Leit.", "read", "KB/s", 1024), ("Escr.", "write", "KB/s", 1024)):
+                    values = series[key] / scale; details += f"\n{label:<6}{sparkline(values):<40} pico {peak(values):.1f} {unit}"
             self.details_text.config(state="normal"); self.details_text.delete(1.0, tk.END); self.details_text.insert(tk.END, details); self.details_text.config(state="disabled")
 
+    @INSTRUMENTS.timed
+    def sort_processes(self, col, reverse):
+        self.proc_order = self.proc_table.order(col, reverse) if col else np.arange(len(self.proc_table))
+
     def sort_column(self, col, reverse):
-        try: self.all_processes.sort(key=lambda p: p.get(col, 0) if isinstance(p.get(col), (int, float)) else str(p.get(col, '')).lower(), reverse=reverse)
-        except (TypeError, KeyError): pass 
+        self.proc_sort = (col, reverse); self.sort_processes(col, reverse)
         self.tree_procs.heading(col, command=lambda: self.sort_column(col, not reverse)); self.filter_process_list()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cortex - gerenciamento e monitoramento de sistemas Debian")
+    parser.add_argument("--headless", action="store_true", help="executa só os coletores, sem interface gráfica")
+    parser.add_argument("--sources", default=",".join(SOURCES), help=f"fontes coletadas no modo headless (padrão: {','.join(SOURCES)})")
+    parser.add_argument("--output", metavar="ARQUIVO", help="grava cada amostra como uma linha JSON ('-' para a saída padrão)")
+    parser.add_argument("--listen", metavar="[HOST:]PORTA", help="expõe os snapshots via HTTP (ex.: 127.0.0.1:8765)")
+    parser.add_argument("--record", metavar="DIR", nargs="?", const=DEFAULT_SETTINGS['recorder']['dir'], help="grava séries temporais contínuas em segmentos binários (modo headless)")
+    parser.add_argument("--agent", metavar="[HOST:]PORTA", help="modo agente: serve snapshots em delta para a aba Frota (ex.: 127.0.0.1:8766; fora do loopback exige agent.token)")
+    parser.add_argument("--attach", metavar="URL", help="a interface lê os dados de um daemon em execução (ex.: http://127.0.0.1:8765)")
+    parser.add_argument("--profile-startup", action="store_true", help="mostra na saída de erro o tempo de cada fase até a primeira pintura")
+    return parser.parse_args(argv)
+
+def parse_sources(args):
+    names = [n.strip() for n in args.sources.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SOURCES]
+    if unknown: sys.exit(f"Fontes desconhecidas: {', '.join(unknown)}")
+    return names
+
+def is_loopback(host):
+    if host in ("", "localhost"): return True
+    try: return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError: return False
+
+def run_agent(args):
+    settings = load_settings()
+    # Sem token, qualquer um que alcance a porta lê processos, usuários, conexões e montagens: só no loopback.
+    if not settings['agent']['token'] and not is_loopback(args.agent.rpartition(':')[0]):
+        sys.exit(f"Recusando --agent {args.agent} sem agent.token em {CONFIG_FILE}: defina um token ou escute em 127.0.0.1 (e use um túnel SSH).")
+    if settings['instrumentation']['enabled']: INSTRUMENTS.enable()
+    AgentServer(settings, args.agent, parse_sources(args)).run()
+
+def run_headless(args):
+    names = parse_sources(args)
+    output = sys.stdout if args.output == "-" or not (args.output or args.listen or args.record) else open(args.output, "a") if args.output else None
+    settings = load_settings()
+    if settings['instrumentation']['enabled']: INSTRUMENTS.enable()
+    try: HeadlessDaemon(settings, names, output, args.listen, args.record).run()
+    finally:
+        if output not in (None, sys.stdout): output.close()
+
 if __name__ == "__main__":
-    if os.geteuid() != 0:
+    args = parse_args(); STARTUP.enabled = args.profile_startup
+    if args.agent: run_agent(args); sys.exit(0)
+    if args.headless: run_headless(args); sys.exit(0)
+    if os.geteuid() != 0 and not args.attach:
         root_check = tk.Tk(); root_check.withdraw()
         messagebox.showwarning("Aviso de Permissão", "Execute com 'sudo' para acesso completo a todas as funcionalidades.")
         root_check.destroy()
     
-    app = CortexEdition()
+    app = CortexEdition(attach=args.attach)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,329 @@
+# cortex_bench.py - bancada de desempenho do Cortex
+# Roda os coletores e os renderizadores de tabela reais do cortex.py sem Tk, contra fixtures geradas de forma
+# reprodutível (semente fixa): um /proc falso com 1k/10k/100k processos (psutil.PROCFS_PATH), 100k sockets em
+# /proc/net, um status do dpkg grande e a saída de um systemctl falso com milhares de unidades.
+# Uso: python3 cortex_bench.py [--sizes 1000,10000] [--only processos,rede] [--save-baseline] [--output resultados.json]
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from queue import Queue, Empty
+import numpy as np
+import psutil
+import cortex
+from cortex import (CortexEdition, NetworkEngine, PackageIndex, ProcessCollector, ProcessTable, ServiceCollector, ServiceUpdate, Snapshot,
+                    TreeReconciler, DEFAULT_SETTINGS)
+
+BOOT_TIME, FIXTURES_VERSION = 1700000000, "2"
+COMMS = ["systemd", "bash", "python3", "nginx", "postgres", "java", "node", "sshd", "kworker/0:1", "containerd-shim", "chrome", "firefox",
+         "dockerd", "redis-server", "cron", "rsyslogd", "gunicorn", "php-fpm8.2", "Xorg", "pipewire"]
+WORDS = ["library", "daemon", "utilities", "python", "module", "server", "client", "development", "files", "runtime", "documentation", "GNU",
+         "support", "plugin", "network", "shared", "data", "tools", "kernel", "graphics", "audio", "perl", "interface", "bindings"]
+
+# ===================================================================
+# FIXTURES
+# ===================================================================
+def write(path, text):
+    with open(path, 'w') as f: f.write(text)
+
+def complete(root):
+    try:
+        with open(os.path.join(root, ".completo")) as f: return f.read() == FIXTURES_VERSION
+    except OSError: return False
+
+def hex4(rng): return f"{rng.randrange(1 << 32):08X}"
+
+def make_proc(root, rng, n, sockets=0):
+    # /proc/<pid>/{stat,status,statm,io,cmdline,exe,fd} com os campos que psutil e NetworkEngine leem; pais escolhidos entre
+    # PIDs anteriores próximos (árvore profunda como a de um host real) e sockets espalhados pelos fds dos processos.
+    os.makedirs(os.path.join(root, "net"), exist_ok=True)
+    write(os.path.join(root, "stat"), f"cpu  1000 0 1000 100000 100 0 10 0 0 0\ncpu0 1000 0 1000 100000 100 0 10 0 0 0\nbtime {BOOT_TIME}\nprocesses {n}\n")
+    write(os.path.join(root, "diskstats"), "   8       0 sda 1000 0 80000 500 2000 0 160000 900 0 1200 1400 0 0 0 0 0 0\n")
+    owners = {}
+    for pid in range(1, n + 1):
+        comm, ppid = rng.choice(COMMS), 0 if pid == 1 else 1 if rng.random() < 0.05 else rng.randrange(max(1, pid - 500), pid)
+        utime, stime, threads, rss = rng.randrange(100000), rng.randrange(50000), rng.choice((1, 1, 1, 2, 4, 16, 64)), rng.randrange(100, 200000)
+        stat = [pid, f"({comm})", rng.choice("SSSSRDI"), ppid, pid, pid, 0, -1, 4194560, 100, 0, 0, 0, utime, stime, 0, 0, 20, 0, threads, 0,
+                rng.randrange(1, 10**7), rss * 16384, rss, 18446744073709551615, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 17, pid % 8, 0, 0, rng.randrange(100), 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        uid = rng.choice((0, 0, 33, 1000, 1000, 1000, 65534))
+        d = os.path.join(root, str(pid)); os.makedirs(os.path.join(d, "fd"))
+        write(os.path.join(d, "stat"), " ".join(map(str, stat)) + "\n")
+        write(os.path.join(d, "status"), f"Name:\t{comm}\nUmask:\t0022\nState:\tS (sleeping)\nTgid:\t{pid}\nNgid:\t0\nPid:\t{pid}\nPPid:\t{ppid}\nTracerPid:\t0\n"
+                                         f"Uid:\t{uid}\t{uid}\t{uid}\t{uid}\nGid:\t{uid}\t{uid}\t{uid}\t{uid}\nFDSize:\t64\nVmRSS:\t{rss * 4} kB\nThreads:\t{threads}\n"
+                                         f"voluntary_ctxt_switches:\t{rng.randrange(10**6)}\nnonvoluntary_ctxt_switches:\t{rng.randrange(10**4)}\n")
+        write(os.path.join(d, "statm"), f"{rss * 4} {rss} {rss // 4} 100 0 {rss // 2} 0\n")
+        write(os.path.join(d, "io"), f"rchar: {rng.randrange(10**10)}\nwchar: {rng.randrange(10**10)}\nsyscr: 1000\nsyscw: 1000\n"
+                                     f"read_bytes: {rng.randrange(10**9)}\nwrite_bytes: {rng.randrange(10**9)}\ncancelled_write_bytes: 0\n")
+        write(os.path.join(d, "cmdline"), "\0".join([f"/usr/bin/{comm.split('/')[0]}", f"--worker={pid}", rng.choice(WORDS)]) + "\0")
+        os.symlink(f"/usr/bin/{comm.split('/')[0]}", os.path.join(d, "exe"))
+        for fd in range(3): os.symlink("/dev/null", os.path.join(d, "fd", str(fd)))
+        owners[pid] = 3
+    pids, tables = list(owners), {"tcp": [], "tcp6": [], "udp": [], "udp6": []}
+    for i in range(sockets):
+        proto, inode = rng.choices(("tcp", "tcp6", "udp", "udp6"), (60, 20, 15, 5))[0], 100000 + i
+        six = proto.endswith("6"); addr = (lambda: "".join(hex4(rng) for _ in range(4))) if six else (lambda: hex4(rng))
+        remote = addr() if proto.startswith("tcp") else "0" * (32 if six else 8)
+        state = rng.choice(("01", "01", "01", "06", "08", "0A")) if proto.startswith("tcp") else "07"
+        rport = 0 if state == "0A" or proto.startswith("udp") else rng.randrange(1, 65536)
+        tables[proto].append(f"{len(tables[proto]):4d}: {addr()}:{rng.randrange(1, 65536):04X} {remote}:{rport:04X} {state} 00000000:00000000 00:00000000 00000000  1000        0 {inode} 1 0000000000000000 20 4 30 10 -1")
+        if rng.random() < 0.95:  # alguns sockets ficam sem dono visível, como os de outros namespaces
+            pid = rng.choice(pids); os.symlink(f"socket:[{inode}]", os.path.join(root, str(pid), "fd", str(owners[pid]))); owners[pid] += 1
+    header = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+    for proto, lines in tables.items(): write(os.path.join(root, "net", proto), header + "".join(line + "\n" for line in lines))
+
+def make_dpkg(root, rng, n, paths_per_package=20):
+    # status com n pacotes (descrições longas de várias linhas, alguns removidos) e info/<pacote>.list.
+    os.makedirs(os.path.join(root, "info")); stanzas = []
+    for i in range(n):
+        name = f"{rng.choice(WORDS).lower()}-{rng.choice(WORDS).lower()}{i}"; status = "deinstall ok config-files" if rng.random() < 0.03 else "install ok installed"
+        body = "\n".join(" " + " ".join(rng.choices(WORDS, k=12)) for _ in range(rng.randrange(1, 6)))
+        stanzas.append(f"Package: {name}\nStatus: {status}\nPriority: optional\nSection: libs\nInstalled-Size: {rng.randrange(10, 50000)}\n"
+                       f"Maintainer: Debian <debian@lists.debian.org>\nArchitecture: amd64\nVersion: {rng.randrange(10)}.{rng.randrange(50)}-{rng.randrange(9)}\n"
+                       f"Depends: libc6 (>= 2.36)\nDescription: {' '.join(rng.choices(WORDS, k=5))}\n{body}\n")
+        write(os.path.join(root, "info", f"{name}.list"), "".join(f"/usr/lib/{name}/{rng.choice(WORDS)}{j}.so\n" for j in range(paths_per_package)))
+    write(os.path.join(root, "status"), "\n".join(stanzas))
+
+def make_systemctl(root, rng, n):
+    # Um "systemctl" que só imprime a listagem gravada: em JSON com --output=json, senão em texto (com "●" nas unidades com falha).
+    lines, units = [f"  {'UNIT':<50} LOAD      ACTIVE   SUB     DESCRIPTION"], []
+    for i in range(n):
+        active, sub = rng.choice((("active", "running"), ("active", "exited"), ("inactive", "dead"), ("failed", "failed")))
+        unit, description = f"{rng.choice(WORDS).lower()}-{i}.service", " ".join(rng.choices(WORDS, k=4))
+        lines.append(f"{'●' if active == 'failed' else ' '} {unit:<50} {'loaded':<9} {active:<8} {sub:<7} {description}")
+        units.append({"unit": unit, "load": "loaded", "active": active, "sub": sub, "description": description})
+    lines += ["", "LOAD   = Reflects whether the unit definition was properly loaded.", "ACTIVE = The high-level unit activation state, i.e. generalization of SUB.",
+              "SUB    = The low-level unit activation state, values depend on unit type.", "", f"{n} loaded units listed.", "To show all installed unit files use 'systemctl list-unit-files'."]
+    write(os.path.join(root, "units.txt"), "\n".join(lines) + "\n"); write(os.path.join(root, "units.json"), json.dumps(units))
+    script = os.path.join(root, "systemctl")
+    write(script, '#!/bin/sh\nfor arg; do [ "$arg" = "--output=json" ] && exec cat "$(dirname "$0")/units.json"; done\nexec cat "$(dirname "$0")/units.txt"\n'); os.chmod(script, 0o755)
+
+def fixture(base, name, build, *args, seed=1):
+    root = os.path.join(base, name)
+    if not complete(root):
+        shutil.rmtree(root, ignore_errors=True); started = time.perf_counter(); print(f"gerando {name}...", end=" ", flush=True, file=sys.stderr)
+        os.makedirs(root, exist_ok=True); build(root, random.Random(seed), *args); write(os.path.join(root, ".completo"), FIXTURES_VERSION)
+        print(f"{time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return root
+
+# ===================================================================
+# VISÃO SEM TK
+# ===================================================================
+class FakeTreeview:
+    # Treeview sem Tk: mantém a ordem dos filhos e conta as operações que virariam comandos Tcl.
+    def __init__(self): self.children, self.ops = [], 0
+    def delete(self, *iids): self.ops += 1; gone = set(iids); self.children = [i for i in self.children if i not in gone]
+    def detach(self, *iids): self.delete(*iids)
+    def index(self, iid): self.ops += 1; return self.children.index(iid)
+    def move(self, iid, parent, index): self.ops += 1; self.children.remove(iid) if iid in self.children else None; self.children.insert(index, iid)
+    def insert(self, parent, index, iid, values): self.ops += 1; self.children.insert(index, iid); return iid
+    def item(self, iid, values=None): self.ops += 1
+    def exists(self, iid): self.ops += 1; return str(iid) in self.children
+    def selection(self): self.ops += 1; return ()
+    def selection_set(self, iid): self.ops += 1
+
+class Var:
+    def __init__(self, value): self.value = value
+    def get(self): return self.value
+    def set(self, value): self.value = value
+
+class Widget:
+    def config(self, **kwargs): pass
+    def set(self, *args): pass
+
+class HeadlessView:
+    # Os métodos de renderização da CortexEdition sobre variáveis e Treeviews falsos: mesmo código, sem janela.
+    sort_processes, filter_process_list, render_process_window = CortexEdition.sort_processes, CortexEdition.filter_process_list, CortexEdition.render_process_window
+    filter_package_list, render_services, render_network = CortexEdition.filter_package_list, CortexEdition.render_services, CortexEdition.render_network
+
+    def __init__(self):
+        self.settings = json.loads(json.dumps(DEFAULT_SETTINGS))
+        self.search_var, self.search_field, self.search_regex, self.proc_tree_mode, self.pkg_search_var, self.net_view_var = Var(""), Var("Nome"), Var(False), Var(False), Var(""), Var("Por Estado")
+        self.process_count_label = self.proc_scroll = self.net_count_label = self.svc_status_label = Widget()
+        self.tree_procs, self.tree_pkg, self.tree_svc, self.tree_net, self.tree_net_agg = (FakeTreeview() for _ in range(5))
+        self.proc_rows, self.pkg_rows, self.svc_rows, self.net_rows, self.net_agg_rows = (TreeReconciler(t) for t in (self.tree_procs, self.tree_pkg, self.tree_svc, self.tree_net, self.tree_net_agg))
+        self.proc_table, self.proc_order, self.proc_view, self.proc_collapsed = ProcessTable(), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), set()
+        self.proc_top, self.proc_visible_rows, self.selected_pid, self.pkg_index, self.pkg_collector, self.svc_seq = 0, 50, None, None, None, None
+
+    def tk_ops(self): return sum(t.ops for t in (self.tree_procs, self.tree_pkg, self.tree_svc, self.tree_net, self.tree_net_agg))
+
+class FakeSystemdBus:
+    # Barramento falso para o ServiceCollector: as unidades da fixture e rajadas de eventos empurradas pela bancada.
+    def __init__(self, services): self.services, self.pending = list(services), Queue()
+    def list_units(self): return list(self.services)
+    def close(self): pass
+
+    def next_events(self, timeout):
+        try: return self.pending.get(timeout=timeout)
+        except Empty: return []
+
+class LoadedCollector:
+    # Só o latest() que filter_package_list consulta para saber se o índice já carregou.
+    def __init__(self, data): self._latest = Snapshot(1, time.time(), data)
+    def latest(self): return self._latest
+
+# ===================================================================
+# MEDIÇÃO
+# ===================================================================
+def measure(name, func, items, repeat, setup=None, memory=True):
+    # repeat iterações cronometradas (setup() fora do tempo) e mais uma sob tracemalloc só para o pico de memória.
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        started = time.perf_counter(); func(); times.append(time.perf_counter() - started)
+    peak = None
+    if memory:
+        if setup: setup()
+        tracemalloc.start(); func(); peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    p50, p99 = (float(np.percentile(times, q)) for q in (50, 99))
+    result = {"items": items, "iterations": repeat, "p50_s": p50, "p99_s": p99, "mean_s": float(np.mean(times)), "throughput": items / p50 if p50 else None, "peak_bytes": peak}
+    print(f"  {name:<28}{items:>9}{cortex.format_latency(p50):>12}{cortex.format_latency(p99):>12}{result['throughput'] or 0:>14,.0f}/s{format_bytes(peak):>12}", file=sys.stderr)
+    return result
+
+def format_bytes(n): return "-" if n is None else f"{n / 1024**2:.1f} MB" if n >= 1024**2 else f"{n / 1024:.1f} KB"
+
+def bench_processes(base, sizes, repeat, memory):
+    results = {}
+    for n in sizes:
+        psutil.PROCFS_PATH = fixture(base, f"proc-{n}", make_proc, n)
+        try:
+            # Frio: objetos Process novos (primeira coleta); estável: o cache do process_iter e o histórico já preenchidos.
+            state = {}
+            def cold(): psutil.process_iter.cache_clear(); state["collector"] = ProcessCollector(None)
+            results[f"processos.frio/{n}"] = measure(f"processos.frio/{n}", lambda: state["collector"].get_process_data(), n, repeat, cold, memory)
+            collector = ProcessCollector(None); collector.get_process_data()
+            results[f"processos/{n}"] = measure(f"processos/{n}", lambda: state.__setitem__("table", collector.get_process_data()), n, repeat, None, memory)
+        finally: psutil.PROCFS_PATH = "/proc"; psutil.process_iter.cache_clear()
+        view = HeadlessView(); view.proc_table = table = state["table"]; searches = iter(["py", "python3", "ng", "", "sshd", "java", "x"] * (repeat + 2))
+        def fresh(): table._lower = table._rank = table._tree = None
+        results[f"tabela.ordenar/{n}"] = measure(f"tabela.ordenar/{n}", lambda: view.sort_processes("cpu", True), n, repeat, fresh, memory)
+        def type_ahead(): view.search_var.set(next(searches)); view.filter_process_list()
+        results[f"tabela.filtrar/{n}"] = measure(f"tabela.filtrar/{n}", type_ahead, n, repeat, None, memory)
+        view.proc_tree_mode.set(True); view.search_var.set("")
+        results[f"tabela.arvore/{n}"] = measure(f"tabela.arvore/{n}", view.filter_process_list, n, repeat, fresh, memory)
+        print(f"  {'':<28}operações no Treeview: {view.tk_ops()}", file=sys.stderr)
+    return results
+
+def bench_network(base, sockets, repeat, memory):
+    root, results = fixture(base, f"net-{sockets}", make_proc, 2000, sockets), {}; state = {}
+    def cold(): state["engine"] = NetworkEngine(root)
+    results[f"rede.frio/{sockets}"] = measure(f"rede.frio/{sockets}", lambda: state["engine"].collect(), sockets, repeat, cold, memory)
+    engine = NetworkEngine(root); engine.collect()
+    results[f"rede/{sockets}"] = measure(f"rede/{sockets}", lambda: state.__setitem__("data", engine.collect()), sockets, repeat, None, memory)
+    view = HeadlessView(); views = iter(["Por Estado", "Por Host Remoto"] * (repeat + 2))
+    def render(): view.net_view_var.set(next(views)); view.render_network(state["data"])
+    results[f"rede.render/{sockets}"] = measure(f"rede.render/{sockets}", render, min(sockets, int(view.settings['net_max_rows'])), repeat, None, memory)
+    return results
+
+def bench_packages(base, packages, repeat, memory):
+    index, results = PackageIndex(fixture(base, f"dpkg-{packages}", make_dpkg, packages)), {}
+    results[f"dpkg.parse/{packages}"] = measure(f"dpkg.parse/{packages}", index.parse_status, packages, repeat, None, memory)
+    def no_cache(*names):
+        def setup():
+            index.signature = index.paths_signature = None
+            for name in names:
+                try: os.remove(os.path.join(cortex.CACHE_DIR, name))
+                except FileNotFoundError: pass
+        return setup
+    results[f"dpkg.carregar.frio/{packages}"] = measure(f"dpkg.carregar.frio/{packages}", index.load, packages, repeat, no_cache("dpkg_status.json"), memory)
+    results[f"dpkg.carregar.cache/{packages}"] = measure(f"dpkg.carregar.cache/{packages}", index.load, packages, repeat, no_cache(), memory)
+    results[f"dpkg.caminhos/{packages}"] = measure(f"dpkg.caminhos/{packages}", index.load_paths, packages, repeat, no_cache("dpkg_files.json"), memory)
+    view = HeadlessView(); view.pkg_index, view.pkg_collector = index, LoadedCollector(tuple(index.packages)); queries = iter(["", "py", "pyth", "python mod", "lib", "xyzzy"] * (repeat + 2))
+    def type_ahead(): view.pkg_search_var.set(next(queries)); view.filter_package_list()
+    results[f"dpkg.buscar/{packages}"] = measure(f"dpkg.buscar/{packages}", type_ahead, packages, repeat, None, memory)
+    return results
+
+def bench_services(base, units, repeat, memory):
+    root, results = fixture(base, f"systemctl-{units}", make_systemctl, units), {}
+    with open(os.path.join(root, "units.txt")) as f: text = f.read()
+    collector, view, state = ServiceCollector(command=(os.path.join(root, "systemctl"),), bus=None), HeadlessView(), {}
+    results[f"systemctl.texto/{units}"] = measure(f"systemctl.texto/{units}", lambda: ServiceCollector.parse_units(text), units, repeat, None, memory)
+    results[f"systemctl.json/{units}"] = measure(f"systemctl.json/{units}", lambda: state.__setitem__("services", collector.list_units()), units, repeat, None, memory)
+    full = ServiceUpdate({s.unit: s for s in state["services"]}, None, 0, "")
+    def clear(): view.svc_rows.clear(); view.svc_seq = None
+    results[f"systemctl.render/{units}"] = measure(f"systemctl.render/{units}", lambda: view.render_services(full), units, repeat, clear, memory)
+    # Sinais: 1% das unidades muda de estado numa rajada; mede do sinal ao snapshot publicado e às linhas atualizadas.
+    bus = FakeSystemdBus(state["services"]); collector = ServiceCollector(bus=lambda: bus); collector.start(); collector.wake()
+    while collector.latest().data is None: time.sleep(0.001)
+    view, names, rng, ticks, burst = HeadlessView(), sorted(full.units), random.Random(2), itertools.count(), max(1, units // 100)
+    view.render_services(collector.latest().data)
+    def signals():
+        seq, tick = collector.latest().seq, next(ticks)
+        bus.pending.put([("changed", name, {"sub": f"running-{tick}"}) for name in rng.sample(names, burst)])
+        while collector.latest().seq == seq: time.sleep(0.0002)
+        view.render_services(collector.latest().data)
+    results[f"systemctl.sinais/{units}"] = measure(f"systemctl.sinais/{units}", signals, burst, repeat, None, memory)
+    collector.stop(); return results
+
+# ===================================================================
+# BASE DE COMPARAÇÃO
+# ===================================================================
+def compare(results, baseline, tolerance):
+    # p50 e pico de memória contra a base; acima de (1 + tolerância) conta como regressão.
+    regressions = []
+    print(f"\nComparação com a base de {baseline['meta'].get('date', '?')} (tolerância {tolerance:.0%}):", file=sys.stderr)
+    for name, new in results.items():
+        old = baseline["results"].get(name)
+        if not old: print(f"  {name:<28}(sem base)", file=sys.stderr); continue
+        ratios = {"p50": new["p50_s"] / old["p50_s"] if old["p50_s"] else 1.0}
+        if new["peak_bytes"] and old.get("peak_bytes"): ratios["memória"] = new["peak_bytes"] / old["peak_bytes"]
+        worse = [metric for metric, ratio in ratios.items() if ratio > 1 + tolerance]
+        if worse: regressions.append(name)
+        print(f"  {name:<28}" + "  ".join(f"{metric} {ratio - 1:+.0%}" for metric, ratio in ratios.items()) + ("  REGRESSÃO" if worse else ""), file=sys.stderr)
+    return regressions
+
+COMPONENTS = {"processos": lambda a, base, memory: bench_processes(base, a.sizes, a.repeat, memory), "rede": lambda a, base, memory: bench_network(base, a.sockets, a.repeat, memory),
+              "dpkg": lambda a, base, memory: bench_packages(base, a.packages, a.repeat, memory), "systemctl": lambda a, base, memory: bench_services(base, a.units, a.repeat, memory)}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bancada de desempenho do Cortex com fixtures sintéticas")
+    parser.add_argument("--only", default=",".join(COMPONENTS), help=f"componentes a medir (padrão: {','.join(COMPONENTS)})")
+    parser.add_argument("--sizes", default="1000,10000,100000", type=lambda s: [int(x) for x in s.split(",") if x], help="quantidades de processos no /proc falso")
+    parser.add_argument("--sockets", default=100000, type=int, help="sockets em /proc/net (padrão: 100000)")
+    parser.add_argument("--packages", default=20000, type=int, help="pacotes no status do dpkg (padrão: 20000)")
+    parser.add_argument("--units", default=5000, type=int, help="unidades na saída do systemctl (padrão: 5000)")
+    parser.add_argument("--repeat", default=5, type=int, help="iterações cronometradas por componente (padrão: 5)")
+    parser.add_argument("--no-memory", action="store_true", help="não mede o pico de memória (a iteração extra sob tracemalloc)")
+    parser.add_argument("--fixtures", metavar="DIR", help="gera/reutiliza as fixtures neste diretório em vez de um temporário")
+    parser.add_argument("--output", metavar="ARQUIVO", help="grava os resultados em JSON")
+    parser.add_argument("--baseline", metavar="ARQUIVO", default=os.path.join(cortex.CACHE_DIR, "bench", "baseline.json"), help="base para comparação (padrão: ~/.cache/cortex/bench/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="grava estes resultados como a nova base")
+    parser.add_argument("--tolerance", default=0.25, type=float, help="piora relativa tolerada antes de acusar regressão (padrão: 0.25)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv); names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in COMPONENTS]
+    if unknown: sys.exit(f"Componentes desconhecidos: {', '.join(unknown)}")
+    base = args.fixtures or tempfile.mkdtemp(prefix="cortex-bench-"); os.makedirs(base, exist_ok=True)
+    cache_dir, cortex.CACHE_DIR = cortex.CACHE_DIR, os.path.join(base, "cache")  # caches JSON do dpkg isolados do usuário
+    results = {}
+    try:
+        print(f"  {'componente':<28}{'itens':>9}{'p50':>12}{'p99':>12}{'vazão':>16}{'pico mem.':>12}", file=sys.stderr)
+        for name in names: results.update(COMPONENTS[name](args, base, not args.no_memory))
+    finally:
+        cortex.CACHE_DIR = cache_dir
+        if not args.fixtures: shutil.rmtree(base, ignore_errors=True)
+    report = {"meta": {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(), "psutil": psutil.__version__, "numpy": np.__version__,
+                       "machine": platform.machine(), "cpus": os.cpu_count(), "repeat": args.repeat}, "results": results}
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    regressions = []
+    try:
+        with open(args.baseline) as f: regressions = compare(results, json.load(f), args.tolerance)
+    except (OSError, ValueError, KeyError): print(f"\nSem base em {args.baseline} (use --save-baseline para gravar uma).", file=sys.stderr)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w') as f: json.dump(report, f, indent=2)
+        print(f"Base gravada em {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())